@@ -1,3 +1,4 @@
+import click
 import os
 from flask import Flask, jsonify, redirect
 from flask_smorest import Api
@@ -6,7 +7,14 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_uploads import configure_uploads, patch_request_class
 
-from db import db
+from db import (
+    db,
+    engine_options,
+    replica_binds,
+    init_sqlite,
+    begin_request_transaction,
+    end_request_transaction,
+)
 
 import models, config
 
@@ -18,14 +26,34 @@ from resources.payment_type import blp as PaymentTypeBlueprint
 from resources.product_category import blp as ProductCategoryBlueprint
 from resources.variation import blp as ProductVariationBlueprint
 from resources.image import blp as ImageBlueprint
-
-from utils.image_helper import IMAGE_SET
+from resources.product import blp as ProductBlueprint
+from resources.search import blp as SearchBlueprint
+from resources.catalog_import import blp as CatalogImportBlueprint
+from resources.export import blp as ExportBlueprint
+from resources.cart import blp as CartBlueprint
+from resources.order import blp as OrderBlueprint
+from resources.job import blp as JobBlueprint
+
+from utils.image_helper import IMAGE_SET, check_image_url_secret, configure_image_urls
+from utils.claims_cache import claims_cache
+from utils.token_blocklist import token_blocklist
+from utils.search import init_search
+from utils.facets import init_facets
+from utils.response_cache import configure_response_cache
+from utils.serialization import FastJSONProvider
+from utils.jobs import run_workers
+from utils.metrics import init_metrics
+from utils.security import PasswordHasherBusy, password_hasher
+from utils.helper import Response
 
 api_prefix = f"{config.API_PREFIX}/{config.API_VERSION}"
 
 def create_app():
     # Initialize Flask Application
     app = Flask(__name__)
+    if config.JSON_FAST_ENCODER:
+        app.json = FastJSONProvider(app)  # orjson when installed
+    app.json.sort_keys = config.JSON_SORT_KEYS
     CORS(app)
 
     app.config['JSON_SORT_KEYS'] = config.JSON_SORT_KEYS # Disable flask from sorting the response
@@ -39,8 +67,11 @@ def create_app():
     app.config['OPENAPI_SWAGGER_UI_URL'] = config.OPENAPI_SWAGGER_UI_URL # Swagger API cdn
     app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI # Connection String to your database
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = config.SQLALCHEMY_TRACK_MODIFICATIONS # Also no idea wtf this is
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config.SQLALCHEMY_DATABASE_URI) # Connection pool
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(config.SQLALCHEMY_REPLICA_URIS) # Read replicas
 
     db.init_app(app) # Initialize Database
+    init_sqlite(app) # WAL, pragmas and write queue when SQLITE_PERFORMANCE_MODE is on
     api = Api(app) # Link API
 
     migrate = Migrate(app, db) # Migrate Database
@@ -56,6 +87,9 @@ def create_app():
     # Configure ImageUploads
     patch_request_class(app, 10 * 1024 * 1024)  # 10MB max size upload
     configure_uploads(app, IMAGE_SET)  # Need to put this after the app.config
+    configure_image_urls(config.IMAGE_BASE_URL)  # resolve the image host once
+    check_image_url_secret(config.IMAGE_URL_SIGNING, config.IMAGE_URL_SECRET)
+    configure_response_cache()  # in-process LRU, or shared when RESPONSE_CACHE_URL is set
     
     # Randomly Generated SECRET KEY
     app.config['JWT_SECRET_KEY'] = "273400726116270771902746508700512837087"
@@ -65,21 +99,20 @@ def create_app():
     These methods use to modify the Error response about the Authorization
     """
 
-    # Check if the access token is in BLOCKLIST
-    # @jwt.token_in_blocklist_loader
-    # def check_if_token_in_blocklist(jwt_header, jwt_payload):
-    #     return models.TokenModel.query.filter_by(token=jwt_payload['jti']).first()
+    # Check if the token is in BLOCKLIST (in memory, see utils/token_blocklist.py)
+    @jwt.token_in_blocklist_loader
+    def check_if_token_in_blocklist(jwt_header, jwt_payload):
+        return token_blocklist.is_revoked(jwt_payload['jti'])
 
     # Return the response if the token has been revoked
-    # @jwt.revoked_token_loader
-    # def revoked_token_callback(jwt_header, jwt_payload):
-    #     return (
-    #         jsonify({
-    #             "description": "The access token has been revoked.",
-    #             "error": "token_revoked"
-    #         }),
-    #         401
-    #     )
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        res = {
+            "code": 401,
+            "status": "Unauthorized",
+            "message": "Token has been revoked.",
+        }
+        return (jsonify(res), 401)
 
     # @jwt.needs_fresh_token_loader
     # def token_not_fresh_callback(jwt_header, jwt_payload):
@@ -91,14 +124,18 @@ def create_app():
     #         401
     #     )
 
-    @jwt.additional_claims_loader
-    def add_claims_to_jwt(identity):
+    def load_claims(identity):
         # Do sth in database to verify whether the user is admin or not
         user = models.UserModel.find_by_id(id=identity)
         if user.role.name.lower() == "administrator":
             return {"is_admin": True}
 
         return {"is_admin": False}
+
+    @jwt.additional_claims_loader
+    def add_claims_to_jwt(identity):
+        # Claims are cached per user, see utils/claims_cache.py
+        return claims_cache.get(identity, load_claims)
     
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -113,6 +150,12 @@ def create_app():
     # def invalid_token_callback(error):
     #     return (jsonify({"message": "Signature verification failed.", "error": "invalid token."}), 401)
 
+    # Every endpoint hashing a password (register, user create/update...) under load
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(error):
+        res, code = Response.service_unavailable(message="Too many requests in progress. Please try again.")
+        return (jsonify(res.json), code)
+
     @jwt.unauthorized_loader
     def missing_token_callback(error):
         res = {
@@ -123,7 +166,16 @@ def create_app():
         return (jsonify(res), 401)
 
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)  # the primary, replicas get their tables from it
+    init_search(app)  # product search index, kept in sync on every flush
+    init_facets(app)  # variation facet counts, kept in sync on every flush
+
+    init_metrics(app)  # opt-in (METRICS_ENABLED), registered first to time the other hooks too
+
+    if config.UNIT_OF_WORK_PER_REQUEST:
+        # One transaction per request, committed only if the response is successful
+        app.before_request(begin_request_transaction)
+        app.after_request(end_request_transaction)
 
     api.register_blueprint(UserBlueprint, url_prefix=api_prefix) 
     api.register_blueprint(RoleBlueprint, url_prefix=api_prefix)
@@ -133,6 +185,50 @@ def create_app():
     api.register_blueprint(ProductVariationBlueprint, url_prefix=api_prefix)
     api.register_blueprint(PaymentTypeBlueprint, url_prefix=api_prefix)
     api.register_blueprint(ImageBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(ProductBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(SearchBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(CatalogImportBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(ExportBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(CartBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(OrderBlueprint, url_prefix=api_prefix)
+    api.register_blueprint(JobBlueprint, url_prefix=api_prefix)
+
+    @app.cli.command("carts-release")
+    def carts_release():
+        """Give back the stock reserved by carts idle for longer than CART_RESERVATION_TTL"""
+        released = models.ShoppingCart.release_expired()
+        print(f"Released the stock of {released} cart items.")
+
+    @app.cli.command("idempotency-purge")
+    def idempotency_purge():
+        """Delete the Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL"""
+        purged = models.IdempotencyKey.purge_expired()
+        db.session.commit()
+        print(f"Deleted {purged} expired idempotency keys.")
+
+    @app.cli.command("passwords-legacy")
+    def passwords_legacy():
+        """Count the passwords still stored in plain text (hashed when their user logs in)"""
+        passwords = db.session.query(models.UserModel.password).yield_per(1000)
+        legacy = sum(1 for (password,) in passwords if password_hasher.is_legacy(password))
+        print(f"{legacy} passwords stored in plain text.")
+        if not legacy:
+            print("PASSWORD_ACCEPT_PLAINTEXT can be turned off.")
+
+    @app.cli.command("tokens-purge")
+    def tokens_purge():
+        """Delete the revoked tokens that have expired"""
+        purged = models.TokenModel.purge_expired()
+        db.session.commit()
+        print(f"Deleted {purged} expired revoked tokens.")
+
+    @app.cli.command("jobs-worker")
+    @click.option("--processes", default=1, help="Worker processes.")
+    @click.option("--threads", default=1, help="Worker threads per process.")
+    def jobs_worker(processes, threads):
+        """Run background jobs until interrupted (set JOB_IN_PROCESS_WORKERS = 0 for the web processes)"""
+        print(f"Running jobs with {processes} processes x {threads} threads.")
+        run_workers(app, processes=processes, threads=threads)
 
     @app.route('/')
     def home():
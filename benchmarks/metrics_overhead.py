@@ -0,0 +1,82 @@
+"""
+Cost of the request instrumentation (utils/metrics.py) on a small list endpoint:
+a page of users read with one query and dumped with the response schema, without
+metrics, with METRICS_ENABLED and with every request profiled as well.
+
+Usage:
+    python benchmarks/metrics_overhead.py [requests] [page size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+import config
+from db import db
+from models import RoleModel, UserModel
+from schemas.response_schema import responseSchema
+from schemas.user_schema import PlainUserSchema
+from utils.helper import Response
+from utils.metrics import init_metrics, metrics
+
+def create(url: str, enabled: bool) -> Flask:
+    config.METRICS_ENABLED = enabled
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    init_metrics(app)
+    schema = responseSchema(PlainUserSchema, many=True)()
+
+    @app.get("/user")
+    def users():
+        rows = UserModel.query.order_by(UserModel.id).limit(page_size).all()
+        return schema.dump(Response(data=rows).json)
+
+    return app
+
+def bench(label: str, app: Flask, requests: int) -> None:
+    client = app.test_client()
+    client.get("/user")  # warm up
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/user")
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  {label:<24} median {timings[len(timings) // 2]:7.3f}ms  p99 {timings[int(len(timings) * 0.99)]:7.3f}ms")
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    config.PROFILE_DIR = tempfile.mkdtemp()
+
+    app = create(url, enabled=False)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(RoleModel), [{"name": "Customer"}])
+        db.session.execute(insert(UserModel), [
+            {
+                "first_name": f"First {index}",
+                "last_name": f"Last {index}",
+                "email_address": f"user{index}@example.com",
+                "phone_number": f"0{index:08d}",
+                "password": "x",
+                "role_id": 1,
+                "status": True,
+            }
+            for index in range(page_size)
+        ])
+        db.session.commit()
+
+    print(f"{requests} requests, {page_size} users per page")
+    bench("no metrics", app, requests)
+    bench("metrics", create(url, enabled=True), requests)
+    config.PROFILE_SAMPLE_RATE = 1.0
+    bench("metrics + cProfile", create(url, enabled=True), requests)
+    print(f"  {metrics.profiles} profiles written to {config.PROFILE_DIR}")
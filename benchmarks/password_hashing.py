@@ -0,0 +1,50 @@
+"""
+Micro-benchmark of password verification throughput per hashing cost.
+
+Usage:
+    python benchmarks/password_hashing.py [scheme] [rounds ...]
+    e.g: python benchmarks/password_hashing.py pbkdf2_sha256 10000 29000 100000
+"""
+import os
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.security import PasswordHasher
+import config
+
+DEFAULT_ROUNDS = {
+    "pbkdf2_sha256": [10000, 29000, 100000],
+    "bcrypt": [10, 12, 14],
+    "argon2": [1, 2, 4],
+}
+DURATION = 3  # seconds per cost setting
+CLIENTS = 16  # concurrent "requests" logging in
+
+def bench(scheme: str, rounds: int) -> float:
+    hasher = PasswordHasher(scheme=scheme, rounds=rounds)
+    hashed = hasher.hash("correct horse battery staple")
+    deadline = time.perf_counter() + DURATION
+
+    def client() -> int:
+        logins = 0
+        while time.perf_counter() < deadline:
+            valid, _ = hasher.verify("correct horse battery staple", hashed)
+            assert valid
+            logins += 1
+        return logins
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        total = sum(pool.map(lambda _: client(), range(CLIENTS)))
+    return total / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    scheme = sys.argv[1] if len(sys.argv) > 1 else config.PASSWORD_HASH_SCHEME
+    rounds_list = [int(rounds) for rounds in sys.argv[2:]] or DEFAULT_ROUNDS[scheme]
+    print(f"{scheme}, {config.PASSWORD_HASH_WORKERS} hasher workers, {CLIENTS} clients")
+    for rounds in rounds_list:
+        print(f"  rounds={rounds:<8} {bench(scheme, rounds):10.1f} logins/sec")
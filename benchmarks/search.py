@@ -0,0 +1,99 @@
+"""
+Product search latency on a synthetic catalog, with the SQLite FTS5 backend and
+the in-memory inverted index.
+
+Usage:
+    python benchmarks/search.py [products] [queries]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+from db import db
+from models import Product, ProductItem, ProductCategory
+from utils.search import Fts5Backend, InvertedIndexBackend, tokenize
+
+ADJECTIVES = ["classic", "slim", "vintage", "organic", "light", "heavy", "premium", "basic", "sport", "casual"]
+COLORS = ["red", "blue", "green", "black", "white", "grey", "navy", "olive", "pink", "yellow"]
+NOUNS = ["shirt", "shoe", "jacket", "hoodie", "sock", "cap", "scarf", "glove", "jean", "sweater"]
+WORDS = [f"w{index}" for index in range(2000)]  # long tail of description words
+CATEGORIES = 50
+CHUNK = 10000
+
+def populate(products: int) -> None:
+    rng = random.Random(42)
+    db.session.execute(insert(ProductCategory), [{"name": f"Category {index}"} for index in range(CATEGORIES)])
+    for start in range(0, products, CHUNK):
+        ids = range(start + 1, min(start + CHUNK, products) + 1)
+        db.session.execute(insert(Product), [
+            {
+                "id": id,
+                "category_id": rng.randint(1, CATEGORIES),
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(COLORS)} {rng.choice(NOUNS)}",
+                "description": " ".join(rng.choices(WORDS, k=8)),
+            }
+            for id in ids
+        ])
+        db.session.execute(insert(ProductItem), [
+            {"product_id": id, "sku": f"SKU{id:07d}", "price": 10.0} for id in ids
+        ])
+    db.session.commit()
+
+def make_queries(count: int) -> list:
+    rng = random.Random(7)
+    queries = []
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            queries.append(f"{rng.choice(COLORS)} {rng.choice(NOUNS)}")  # common words
+        elif kind == 1:
+            queries.append(rng.choice(NOUNS)[:3])  # prefix
+        elif kind == 2:
+            queries.append(rng.choice(WORDS))  # rare word
+        else:
+            queries.append(f"SKU{rng.randint(1, 999):03d}")  # sku prefix
+    return queries
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def bench(backend, queries: list) -> None:
+    start = time.perf_counter()
+    with db.engine.begin() as connection:
+        backend.create(connection)
+        backend.rebuild(connection)
+    print(f"  {backend.name:<7} index built in {time.perf_counter() - start:8.1f}s")
+
+    for label, category_ids in (("all", None), ("category", (1, 2, 3))):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            backend.search(tokenize(query), category_ids, 20, 0)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(
+            f"  {backend.name:<7} {label:<9} p50 {percentile(latencies, 0.5):8.2f}ms"
+            f"  p95 {percentile(latencies, 0.95):8.2f}ms  p99 {percentile(latencies, 0.99):8.2f}ms"
+        )
+
+if __name__ == "__main__":
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = make_queries(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        populate(products)
+        print(f"{products} products ({time.perf_counter() - start:.1f}s to generate)")
+        bench(Fts5Backend(), queries)
+        bench(InvertedIndexBackend(ttl=None), queries)
@@ -0,0 +1,96 @@
+"""
+Time spent turning a page of rows into the JSON body of a response: marshmallow's dump +
+the json module (what the endpoints did before), the compiled dumpers + orjson, and the
+column only query (find_page_rows) + compiled dumpers + orjson.
+
+Usage:
+    python benchmarks/serialization.py [page size] [repeats]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert
+
+import config
+from db import db
+from models import Product, ProductCategory, ProductItem, RoleModel, UserModel
+from schemas.product_schema import ProductListSchema
+from schemas.response_schema import responseSchema
+from schemas.user_schema import PlainUserSchema
+from utils.helper import Response
+from utils.serialization import dumps
+
+def populate(rows: int) -> None:
+    db.session.execute(insert(RoleModel), [{"name": "Customer"}])
+    db.session.execute(insert(UserModel), [
+        {
+            "first_name": f"First {index}",
+            "last_name": f"Last {index}",
+            "email_address": f"user{index}@example.com",
+            "phone_number": f"0{index:08d}",
+            "password": "x" * 60,
+            "role_id": 1,
+            "status": True,
+        }
+        for index in range(rows)
+    ])
+    db.session.execute(insert(ProductCategory), [{"name": f"Category {index}"} for index in range(10)])
+    db.session.execute(insert(Product), [
+        {"category_id": index % 10 + 1, "name": f"Product {index}", "description": "Some description"}
+        for index in range(rows)
+    ])
+    db.session.execute(insert(ProductItem), [
+        {"product_id": index // 3 + 1, "sku": f"SKU{index:07d}", "price": 9.99}
+        for index in range(rows * 3)
+    ])
+    db.session.commit()
+
+def timed(label: str, repeats: int, render) -> None:
+    render()  # warm up (compiled dumpers, statement cache)
+    timings = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        body = render()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  {label:<32} median {timings[len(timings) // 2]:8.2f}ms  ({len(body) / 1024:.0f} KiB)")
+
+def marshmallow_dump(schema, rows) -> str:
+    config.FAST_SERIALIZATION = False
+    try:
+        return json.dumps(schema.dump(Response.page(rows)))
+    finally:
+        config.FAST_SERIALIZATION = True
+
+if __name__ == "__main__":
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    config.MAX_PAGE_SIZE = max(config.MAX_PAGE_SIZE, page_size)
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        populate(page_size)
+
+        users = responseSchema(PlainUserSchema, many=True, paginated=True)()
+        print(f"users, {page_size} per page")
+        timed("marshmallow + json", repeats, lambda: marshmallow_dump(users, UserModel.find_page(limit=page_size)[0]))
+        timed("compiled + orjson", repeats, lambda: dumps(users.dump(Response.page(UserModel.find_page(limit=page_size)[0]))))
+        timed("rows + compiled + orjson", repeats, lambda: dumps(users.dump(Response.page(
+            UserModel.find_page_rows(PlainUserSchema, limit=page_size)[0]
+        ))))
+
+        products = responseSchema(ProductListSchema, many=True, paginated=True)()
+        print(f"products with category and items, {page_size} per page")
+        page = lambda: Product.find_page(limit=page_size, schema=ProductListSchema)[0]
+        timed("marshmallow + json", repeats, lambda: marshmallow_dump(products, page()))
+        timed("compiled + orjson", repeats, lambda: dumps(products.dump(Response.page(page()))))
@@ -0,0 +1,135 @@
+"""
+Writes/sec on SQLite under concurrent load, with the default settings and with
+SQLITE_PERFORMANCE_MODE (pragmas + write queue): on a raw engine, then through the app's
+session and request hooks, with and without UNIT_OF_WORK_PER_REQUEST.
+
+The write queue (like SQLite's own write lock) is held from the first write of a transaction
+until it ends. In a unit of work that is the rest of the request: whatever it does after its
+first write (more reads, serializing the response) is serialized with the other writers.
+[work ms] stands in for that part of the request.
+
+Usage:
+    python benchmarks/sqlite_writes.py [threads] [writes per thread] [work ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+import config
+import db as db_module
+from db import (
+    RoutingSession,
+    WriteQueue,
+    apply_sqlite_pragmas,
+    begin_request_transaction,
+    db,
+    end_request_transaction,
+    init_sqlite,
+)
+from models import CountryModel
+
+def bench(performance_mode: bool, threads: int, writes: int) -> tuple:
+    folder = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(folder, 'bench.db')}")
+    queue = None
+    if performance_mode:
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        queue = WriteQueue()
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name VARCHAR(80))"))
+
+    errors = []
+
+    def writer(worker: int) -> None:
+        for index in range(writes):
+            if queue is not None:
+                queue.acquire()
+            try:
+                # one commit per request, like save_to_db()
+                with engine.begin() as connection:
+                    connection.execute(text("INSERT INTO item (name) VALUES (:name)"), {"name": f"{worker}-{index}"})
+            except OperationalError:  # database is locked
+                errors.append(worker)
+            finally:
+                if queue is not None:
+                    queue.release()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(worker,)) for worker in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    committed = threads * writes - len(errors)
+    return committed / elapsed, len(errors)
+
+def bench_app(unit_of_work: bool, threads: int, writes: int, work: float) -> tuple:
+    """Requests writing one row with save_to_db(), then spending `work` seconds (reads, serialization)"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app.config["SQLALCHEMY_SESSION_OPTIONS"] = {"class_": RoutingSession}
+    db.init_app(app)
+    db_module.write_queue = None
+    init_sqlite(app)
+    with app.app_context():
+        db.create_all()
+    if unit_of_work:
+        app.before_request(begin_request_transaction)
+        app.after_request(end_request_transaction)
+
+    @app.post("/country/<name>")
+    def add_country(name: str):
+        CountryModel(name).save_to_db()
+        time.sleep(work)
+        return {"name": name}, 201
+
+    errors = []
+
+    def writer(worker: int) -> None:
+        client = app.test_client()
+        for index in range(writes):
+            try:
+                if client.post(f"/country/{worker}-{index}").status_code != 201:
+                    errors.append(worker)
+            except OperationalError:  # database is locked
+                errors.append(worker)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(worker,)) for worker in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    committed = threads * writes - len(errors)
+    return committed / elapsed, len(errors)
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    work = (float(sys.argv[3]) if len(sys.argv) > 3 else 2) / 1000
+    print(f"{threads} threads x {writes} writes")
+    for label, performance_mode in (("default", False), ("performance mode", True)):
+        rate, errors = bench(performance_mode, threads, writes)
+        print(f"  {label:<17} {rate:10.1f} writes/sec  {errors} failed")
+
+    config.SQLITE_PERFORMANCE_MODE = True
+    print(f"app session, performance mode, {work * 1000:g} ms of work after the write")
+    for label, unit_of_work in (("commit on save", False), ("unit of work", True)):
+        rate, errors = bench_app(unit_of_work, threads, writes, work)
+        print(f"  {label:<17} {rate:10.1f} requests/sec  {errors} failed")
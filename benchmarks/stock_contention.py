@@ -0,0 +1,139 @@
+"""
+Flash sale on one product item: many threads add it to their cart and check out at once.
+Compares the conditional UPDATE of ProductItem.reserve() with a read-modify-write of the
+stock (what an ORM `item.qty_in_stock -= 1` does), and checks that nothing is oversold.
+
+Usage:
+    python benchmarks/stock_contention.py [threads] [buyers per thread] [stock] [database url]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+
+import config
+from db import db, init_sqlite, RoutingSession
+from models import (
+    OrderLine,
+    Product,
+    ProductCategory,
+    ProductItem,
+    RoleModel,
+    ShippingMethod,
+    ShopOrder,
+    ShoppingCart,
+    ShoppingCartItem,
+    UserModel,
+)
+from models.shopping_cart import CartChanged, OutOfStock
+
+RETRIES = 20  # database is locked / deadlock
+
+def populate(buyers: int, stock: int) -> int:
+    db.session.execute(insert(RoleModel), [{"name": "Customer"}])
+    db.session.execute(insert(UserModel), [
+        {
+            "first_name": "Buyer",
+            "last_name": str(index),
+            "email_address": f"buyer{index}@example.com",
+            "phone_number": str(index),
+            "password": "x",
+            "role_id": 1,
+            "status": True,
+        }
+        for index in range(buyers)
+    ])
+    db.session.execute(insert(ShippingMethod), [{"name": "Standard", "price": 0}])
+    db.session.execute(insert(ProductCategory), [{"name": "Sale"}])
+    db.session.execute(insert(Product), [{"category_id": 1, "name": "Limited sneaker"}])
+    item_id = db.session.execute(
+        insert(ProductItem).returning(ProductItem.id),
+        [{"product_id": 1, "sku": "FLASH", "price": 99.0, "qty_in_stock": stock}],
+    ).scalar()
+    db.session.commit()
+    return item_id
+
+def naive_add(user_id: int, item_id: int) -> ShoppingCart:
+    """Read the stock, check it, write it back: two buyers can read the same quantity"""
+    item = db.session.get(ProductItem, item_id)
+    if item.qty_in_stock < 1:
+        raise OutOfStock()
+    cart = ShoppingCart.get_or_create(user_id=user_id)
+    item.qty_in_stock = item.qty_in_stock - 1
+    db.session.add(ShoppingCartItem(cart_id=cart.id, product_item_id=item_id, qty=1))
+    db.session.flush()
+    return cart
+
+def buy(user_id: int, item_id: int, naive: bool) -> str:
+    for _ in range(RETRIES):
+        try:
+            if naive:
+                cart = naive_add(user_id, item_id)
+            else:
+                cart = ShoppingCart.get_or_create(user_id=user_id)
+                cart.add_item(item_id, 1)
+            order = ShopOrder(user_id=user_id, payment_method_id=1, shipping_address_id=1, shipping_method_id=1)
+            order.add_lines(cart.take_items(), 0)
+            db.session.add(order)
+            db.session.commit()
+            return "sold"
+        except OutOfStock:
+            db.session.rollback()
+            return "sold out"
+        except (CartChanged, OperationalError):
+            db.session.rollback()
+    return "failed"
+
+def bench(url: str, naive: bool, threads: int, buyers: int, stock: int) -> None:
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_SESSION_OPTIONS"] = {"class_": RoutingSession}
+    db.init_app(app)
+    init_sqlite(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        item_id = populate(threads * buyers, stock)
+
+    results = []
+
+    def worker(index: int) -> None:
+        for user_id in range(index * buyers + 1, (index + 1) * buyers + 1):
+            with app.app_context():
+                results.append(buy(user_id, item_id, naive))
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        left = db.session.get(ProductItem, item_id).qty_in_stock
+        units = db.session.scalar(select(func.coalesce(func.sum(OrderLine.qty), 0)))
+    sold = results.count("sold")
+    label = "read-modify-write" if naive else "conditional UPDATE"
+    print(
+        f"  {label:<19} {len(results) / elapsed:8.0f} attempts/s  orders {sold:5}  sold out {results.count('sold out'):5}"
+        f"  failed {results.count('failed'):3}  stock left {left:4}  oversold {max(0, units - stock):4}"
+    )
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    buyers = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    stock = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    url = sys.argv[4] if len(sys.argv) > 4 else f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    config.SQLITE_PERFORMANCE_MODE = True  # single writer queue + WAL, see benchmarks/sqlite_writes.py
+
+    print(f"{threads} threads x {buyers} buyers, {stock} units in stock")
+    for naive in (True, False):
+        bench(url, naive, threads, buyers, stock)
@@ -1,6 +1,20 @@
 import os
 
 UPLOADED_IMAGES_DEST = os.path.join('static', 'images')
+# Resized copies generated for every upload: variant -> max width/height in px
+IMAGE_DERIVATIVES = {"thumbnail": 150, "medium": 600, "large": 1200}
+IMAGE_COMPACT_FORMAT = "webp"  # also written for each variant
+IMAGE_COMPACT_QUALITY = 80
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600  # content addressed images never change
+IMAGE_CACHE_MAX_AGE_MUTABLE = 3600  # images that can be replaced under the same name
+IMAGE_ETAG_CACHE_SIZE = 10000  # ETags kept in memory
+# Public URL of a static file server / CDN serving UPLOADED_IMAGES_DEST/product_images,
+# image URLs point to this API when it is not set
+IMAGE_BASE_URL = os.environ.get("IMAGE_BASE_URL")
+IMAGE_URL_SIGNING = False  # add an expiring signature to image URLs and require it to serve images
+IMAGE_URL_SECRET = os.environ.get("IMAGE_URL_SECRET")  # required with IMAGE_URL_SIGNING, 32+ random characters
+IMAGE_URL_TTL = 3600  # seconds a signed image URL stays valid
+IMAGE_URL_BATCH_SIZE = 100  # max filenames per /image/urls request
 
 PROPAGATE_EXCEPTIONS = True
 JSON_SORT_KEYS = False
@@ -15,8 +29,112 @@ OPENAPI_SWAGGER_UI_URL = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
 OPENAPI_REDOC_PATH = '/redoc'
 OPENAPI_REDOC_URL = 'https://cdn.jsdelivr.net/npm/redoc@next/bundles/redoc.standalone.js'
 
-SQLALCHEMY_DATABASE_URI = "sqlite:///data.db"
+SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///data.db")
+# Comma separated URLs of read replicas, reads go to them unless the session has written
+SQLALCHEMY_REPLICA_URIS = [url for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url]
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+# Connection pool of database servers (not used for SQLite)
+SQLALCHEMY_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 10))
+SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 20))
+SQLALCHEMY_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+SQLALCHEMY_POOL_RECYCLE = 1800  # seconds before a connection is replaced
+SQLALCHEMY_POOL_PRE_PING = True  # check connections before using them
+
+# Opt-in tuning for single node deployments on SQLite (see benchmarks/sqlite_writes.py)
+SQLITE_PERFORMANCE_MODE = os.environ.get("SQLITE_PERFORMANCE_MODE", "0") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative = KiB
+    "busy_timeout": 5000,  # ms, waits for writers of other processes
+}
+SQLITE_WRITE_TIMEOUT = 10  # seconds to wait for the write queue
+
+# Commit once at the end of each request instead of on every save_to_db()/delete_from_db()
+# With SQLITE_PERFORMANCE_MODE the write queue is then held from a request's first write
+# until its response is built, so that part of every writing request runs one at a time
+UNIT_OF_WORK_PER_REQUEST = True
+
+# Bulk catalog import (see resources/catalog_import.py)
+IMPORT_CHUNK_SIZE = 1000  # rows validated and inserted together, each chunk is committed on its own
+IMPORT_MAX_ERRORS = 1000  # row errors reported back, the rest are only counted
+
+# Bulk export (see resources/export.py)
+EXPORT_CHUNK_SIZE = 1000  # rows fetched per round-trip and encoded together
+EXPORT_GZIP_LEVEL = 6  # 1 (fastest) to 9 (smallest)
+
+# Product search (see utils/search.py and benchmarks/search.py)
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "auto")  # "fts5" (SQLite), "memory" or "auto"
+SEARCH_FIELD_WEIGHTS = {"name": 5.0, "description": 1.0, "skus": 8.0}
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_INDEX_TTL = None  # seconds before the in-memory index is rebuilt, set it when running several processes
+
+# Whole response cache of the read-mostly reference endpoints (see utils/response_cache.py)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL")  # e.g: redis://localhost:6379/0, shared by every process
+RESPONSE_CACHE_TTL = 300  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = 1024  # in-process LRU when RESPONSE_CACHE_URL is not set
+
+# Serialization (see benchmarks/serialization.py)
+FAST_SERIALIZATION = True  # compiled dumpers for the response envelope instead of marshmallow's dump
+JSON_FAST_ENCODER = True  # write JSON with orjson when it is installed
+
+# Shopping cart and orders
+CART_RESERVATION_TTL = 30 * 60  # seconds a cart keeps its stock reserved without being touched
+CART_MAX_ITEM_QTY = 100  # units of one product item per cart
+
+# Idempotency-Key header on POST endpoints (see utils/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a stored response is replayed to retries
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_PURGE_EVERY = 1000  # delete the expired keys after this many new ones (per process)
+
+# Background jobs (see utils/jobs.py), run by `flask jobs-worker` or by threads of the web process
+JOB_IN_PROCESS_WORKERS = 2  # threads started by a web process on its first job, 0 when jobs-worker runs
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10  # seconds before the first retry, doubled on every attempt
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_TIMEOUT = 15 * 60  # seconds after which a running job is taken again (its worker died)
+JOB_POLL_INTERVAL = 1.0  # seconds between polls of an idle worker
+JOB_BATCH_SIZE = 10  # jobs claimed at once by a worker
+JOB_MAX_ERROR_LENGTH = 4000  # end of the traceback kept on the job
+
+# Revoked tokens (see utils/token_blocklist.py)
+TOKEN_BLOCKLIST_SYNC_INTERVAL = 1.0  # seconds a logout done in another process may take to be seen here
+TOKEN_BLOCKLIST_SYNC_OVERLAP = 100  # last ids read again on every sync (revocations committed out of order)
+TOKEN_BLOCKLIST_PURGE_EVERY = 1000  # delete the expired tokens after this many revocations (per process)
+
+# Opt-in request metrics and profiling (see utils/metrics.py and benchmarks/metrics_overhead.py)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+METRICS_PATH = "/metrics"  # Prometheus text format, per process
+# Comma separated addresses allowed to read METRICS_PATH (the Prometheus server). This is the address of
+# the client connected to this process: behind a reverse proxy on the same host it's always 127.0.0.1,
+# set METRICS_TOKEN then (or don't route METRICS_PATH through the proxy)
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # if set, METRICS_PATH also requires "Authorization: Bearer <token>"
+METRICS_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+METRICS_QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)  # SQL queries per request, to spot N+1 queries
+METRICS_SERVER_TIMING = False  # Server-Timing header (total, db, serialization) on every response
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))  # share of requests run under cProfile
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")  # their .prof files, open with pstats or snakeviz
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 500  # rows fetched per round-trip when streaming a list
+
+CLAIMS_CACHE_TTL = 300  # seconds to keep the JWT claims of a user in memory
+CATEGORY_TREE_TTL = 300  # seconds before the cached category tree is rebuilt
+
+# Password hashing (see benchmarks/password_hashing.py to pick the cost)
+PASSWORD_HASH_SCHEME = "pbkdf2_sha256"  # or "bcrypt" / "argon2" if their backend is installed
+PASSWORD_HASH_ROUNDS = 29000
+PASSWORD_HASH_WORKERS = 4  # threads hashing passwords per process
+PASSWORD_HASH_MAX_PENDING = 64  # hash operations allowed to wait for a worker
+PASSWORD_HASH_TIMEOUT = 10  # seconds
+# Passwords stored in plain text before hashing was introduced still log in (and get hashed).
+# Set to False once `flask passwords-legacy` reports none left.
+PASSWORD_ACCEPT_PLAINTEXT = True
 
 DEBUG = True
 HOST = "0.0.0.0"
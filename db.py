@@ -1,3 +1,332 @@
+import random
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+from flask import jsonify
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.model import Model
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.sql import Select
+from typing import Callable, List, Optional, Tuple
+
+import config
+from utils.loading import column_names, loader_options
+
+REPLICA_BIND_PREFIX = "replica_"
+
+def engine_options(url: str) -> dict:
+    """Connection pool settings for a database server (SQLite keeps SQLAlchemy's defaults)"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": config.SQLALCHEMY_POOL_SIZE,
+        "max_overflow": config.SQLALCHEMY_MAX_OVERFLOW,
+        "pool_timeout": config.SQLALCHEMY_POOL_TIMEOUT,
+        "pool_recycle": config.SQLALCHEMY_POOL_RECYCLE,
+        "pool_pre_ping": config.SQLALCHEMY_POOL_PRE_PING,
+    }
+
+def replica_binds(urls: List[str]) -> dict:
+    """SQLALCHEMY_BINDS entries for the read replicas"""
+    return {
+        f"{REPLICA_BIND_PREFIX}{index}": {"url": url, **engine_options(url)}
+        for index, url in enumerate(urls)
+    }
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """Run config.SQLITE_PRAGMAS on a new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    for name, value in config.SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+class WriteQueue:
+    """
+    FIFO lock handing the database to one writing session at a time, in arrival order.
+    SQLite only allows one writer: waiting here is cheaper and fairer than spinning on
+    "database is locked" inside SQLite's busy handler.
+
+    A session holds it from its first write until its transaction ends, as SQLite holds
+    its own write lock. Under UNIT_OF_WORK_PER_REQUEST that is the rest of the request,
+    so everything a request does after its first write (reads, serializing the response)
+    waits on other writers: do the slow reads before the first write where possible.
+    See benchmarks/sqlite_writes.py.
+    """
+    def __init__(self) -> None:
+        self._mutex = threading.Lock()
+        self._waiters = deque()
+        self._busy = False
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._mutex:
+            if not self._busy and not self._waiters:
+                self._busy = True
+                return True
+            turn = threading.Event()
+            self._waiters.append(turn)
+        if turn.wait(timeout):
+            return True
+        with self._mutex:
+            if turn.is_set():  # handed over right after the timeout
+                return True
+            self._waiters.remove(turn)
+            return False
+
+    def release(self) -> None:
+        with self._mutex:
+            if self._waiters:
+                self._waiters.popleft().set()  # stays busy, owned by the next writer
+            else:
+                self._busy = False
+
+# Set by init_sqlite() when SQLITE_PERFORMANCE_MODE is on
+write_queue: Optional[WriteQueue] = None
+
+class RoutingSession(Session):
+    """
+    Send plain SELECTs to a read replica and everything else to the primary.
+    Once the session has written, it keeps reading from the primary so a request
+    always sees its own writes.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or (clause is not None and not isinstance(clause, Select)):
+                self.info["primary"] = True
+                self.info["written"] = True  # by the current transaction, see on_commit()
+                self._join_write_queue()
+            elif self._can_use_replica(clause):
+                replicas = [
+                    engine for key, engine in self._db.engines.items()
+                    if key is not None and key.startswith(REPLICA_BIND_PREFIX)
+                ]
+                if replicas:
+                    return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self) -> None:
+        if self.info.get("deferred"):
+            # Inside a unit of work: send the changes (ids, constraint errors) now, commit at the end
+            self.flush()
+            return
+        super().commit()
+
+    def _join_write_queue(self) -> None:
+        """Wait for our turn to write, held until the transaction ends"""
+        if write_queue is None or self.info.get("writing"):
+            return
+        if not write_queue.acquire(timeout=config.SQLITE_WRITE_TIMEOUT):
+            raise SQLAlchemyTimeoutError("Timed out waiting for the database write queue.")
+        self.info["writing"] = True
+
+    def _can_use_replica(self, clause) -> bool:
+        return (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None  # locking reads must hit the primary
+            and not self.info.get("primary")
+        )
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _leave_write_queue(session, transaction) -> None:
+    if transaction.parent is not None:
+        return
+    session.info.pop("written", None)
+    if session.info.pop("writing", False):
+        write_queue.release()
+
+@event.listens_for(RoutingSession, "after_commit")
+def _run_commit_callbacks(session) -> None:
+    for callback in session.info.pop("on_commit", []):
+        callback()
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_commit_callbacks(session) -> None:
+    session.info.pop("on_commit", None)
+
+def on_commit(callback: Callable[[], None]) -> None:
+    """
+    Run callback once the current changes are committed, right away if nothing is pending.
+    Pending are the ORM changes not flushed yet and the statements already sent (flushes,
+    session.execute() of an insert/update/delete) by the transaction.
+    Use it for side effects that must not see uncommitted data (cache invalidation, background work).
+    """
+    session = db.session()
+    if (
+        session.info.get("deferred")
+        or session.info.get("written")
+        or session.new
+        or session.dirty
+        or session.deleted
+    ):
+        session.info.setdefault("on_commit", []).append(callback)
+    else:
+        callback()
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: every save_to_db()/delete_from_db() in the block joins one transaction
+    committed when the block exits (rolled back on error). Nested blocks join the outer one.
+    Its reads go to the primary too, what they find is what the writes are based on.
+    """
+    session = db.session()
+    if session.info.get("deferred"):
+        yield session
+        return
+
+    session.info["primary"] = True
+    session.info["deferred"] = True
+    try:
+        yield session
+    except Exception:
+        session.info["deferred"] = False
+        session.rollback()
+        raise
+    else:
+        session.info["deferred"] = False
+        session.commit()
+    finally:
+        session.info["deferred"] = False
+
+def begin_request_transaction() -> None:
+    """Open the unit of work of a request (see UNIT_OF_WORK_PER_REQUEST)"""
+    db.session().info["deferred"] = True
+
+def leave_request_transaction() -> None:
+    """
+    Opt the current request out of its unit of work: its commits are real again.
+    For bulk operations that commit chunk by chunk (e.g: catalog import).
+    """
+    db.session().info["deferred"] = False
+
+def end_request_transaction(response):
+    """Commit the unit of work of a successful request, roll it back otherwise"""
+    session = db.session()
+    if not session.info.pop("deferred", False):
+        return response
+    if response.status_code >= 400 or not session.is_active:
+        # failed request, or the handler already handled a flush error (e.g: IntegrityError)
+        session.rollback()
+        return response
+    try:
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        res = {
+            "code": 500,
+            "status": "Internal Server Error",
+            "message": "An error occurred while saving changes.",
+        }
+        error_response = jsonify(res)
+        error_response.status_code = 500
+        return error_response
+    return response
+
+def increment(executor, table, key: dict, column: str, delta: int) -> None:
+    """
+    Add delta to `column` of the row of `table` matching key (a unique key), or insert the row
+    with column=delta if there is none, as one atomic upsert. An UPDATE then INSERT would let two
+    transactions both insert the first row, one of them failing on the unique key.
+    executor is a Session or a Connection (e.g: in a flush), nothing is committed.
+    """
+    bind = executor if hasattr(executor, "dialect") else executor.get_bind()
+    dialect = bind.dialect.name
+    values = {**key, column: delta}
+    incremented = table.c[column] + delta
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(values)
+        executor.execute(upsert.on_conflict_do_update(index_elements=list(key), set_={column: incremented}))
+        return
+    if dialect in ("mysql", "mariadb"):
+        executor.execute(mysql.insert(table).values(values).on_duplicate_key_update({column: incremented}))
+        return
+
+    # no upsert: insert in a savepoint, update if another transaction inserted first
+    where = [table.c[name] == value for name, value in key.items()]
+    if executor.execute(update(table).where(*where).values({column: incremented})).rowcount:
+        return
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(table).values(values))
+    except IntegrityError:
+        executor.execute(update(table).where(*where).values({column: incremented}))
+
+def init_sqlite(app) -> None:
+    """Opt-in SQLite tuning: pragmas on every connection and a single writer per process"""
+    global write_queue
+    if not config.SQLITE_PERFORMANCE_MODE:
+        return
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if engine.dialect.name == "sqlite"]
+    for engine in engines:
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    if engines and write_queue is None:
+        write_queue = WriteQueue()
+
+class BaseModel(Model):
+    """Behaviour shared by every model (available on db.Model)"""
+
+    @classmethod
+    def query_for(cls, schema=None):
+        """Query with the eager loading declared by the schema used to serialize the result"""
+        if schema is None:
+            return cls.query
+        return cls.query.options(*loader_options(cls, schema))
+
+    @classmethod
+    def find_page(
+        cls,
+        after_id: int = None,
+        limit: int = config.DEFAULT_PAGE_SIZE,
+        query=None,
+        schema=None,
+    ) -> Tuple[List["BaseModel"], Optional[int]]:
+        """
+        Keyset pagination on the primary key.
+        Return the rows after `after_id` and the id to continue from (None on the last page).
+        """
+        limit = min(limit, config.MAX_PAGE_SIZE)
+        query = cls.query_for(schema) if query is None else query
+        if after_id is not None:
+            query = query.filter(cls.id > after_id)
+
+        # fetch one extra row to know whether there is a next page
+        rows = query.order_by(cls.id).limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, rows[-1].id
+        return rows, None
+
+    @classmethod
+    def find_page_rows(
+        cls,
+        schema,
+        after_id: int = None,
+        limit: int = config.DEFAULT_PAGE_SIZE,
+        where: tuple = (),
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        Same as find_page() for a schema made only of columns (e.g: PlainCountrySchema):
+        selects just those columns and returns plain dicts, no ORM objects are built.
+        where: criteria the rows must match. Falls back to find_page() with FAST_SERIALIZATION off.
+        """
+        names = column_names(cls, schema)
+        if not config.FAST_SERIALIZATION or names is None or "id" not in names:
+            query = cls.query_for(schema).filter(*where) if where else None
+            return cls.find_page(after_id=after_id, limit=limit, query=query, schema=schema)
+
+        limit = min(limit, config.MAX_PAGE_SIZE)
+        statement = select(*(getattr(cls, name) for name in names)).where(*where)
+        if after_id is not None:
+            statement = statement.where(cls.id > after_id)
+        rows = db.session.execute(statement.order_by(cls.id).limit(limit + 1)).all()
+        rows = [dict(zip(names, row)) for row in rows]
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, rows[-1]["id"]
+        return rows, None
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy(model_class=BaseModel, session_options={"class_": RoutingSession})
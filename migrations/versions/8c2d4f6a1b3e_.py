@@ -0,0 +1,47 @@
+"""add materialized path to product_category
+
+Revision ID: 8c2d4f6a1b3e
+Revises: 5952bfda1ede
+Create Date: 2026-10-18 09:12:40.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d4f6a1b3e'
+down_revision = '5952bfda1ede'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_category', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_product_category_path'), ['path'], unique=False)
+
+    # Backfill the path of existing categories from their parents
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, parent_category_id FROM product_category")).fetchall()
+    parents = {row[0]: row[1] for row in rows}
+    paths = {}
+
+    def build_path(id):
+        if id not in paths:
+            parent_id = parents.get(id)
+            prefix = build_path(parent_id) if parent_id in parents else "/"
+            paths[id] = f"{prefix}{id}/"
+        return paths[id]
+
+    for id in parents:
+        connection.execute(
+            sa.text("UPDATE product_category SET path = :path WHERE id = :id"),
+            {"path": build_path(id), "id": id},
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('product_category', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_category_path'))
+        batch_op.drop_column('path')
@@ -0,0 +1,36 @@
+"""composite indexes for product and variation filtering
+
+Revision ID: b3e6a1c9d274
+Revises: f7b9e2c4d810
+Create Date: 2026-10-18 14:05:37.118260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e6a1c9d274'
+down_revision = 'f7b9e2c4d810'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_product_variation_line_item', 'product_variation', ['variation_line_id', 'product_item_id'], unique=False)
+    op.create_index('ix_product_variation_item_line', 'product_variation', ['product_item_id', 'variation_line_id'], unique=False)
+    op.create_index('ix_variation_line_variation_name', 'variation_line', ['variation_id', 'name'], unique=False)
+    op.create_index('ix_variation_category_name', 'variation', ['category_id', 'name'], unique=False)
+    op.create_index('ix_product_category_id', 'product', ['category_id', 'id'], unique=False)
+    op.create_index('ix_product_item_product_id', 'product_item', ['product_id', 'id'], unique=False)
+    op.create_index(op.f('ix_image_product_item_id'), 'image', ['product_item_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_image_product_item_id'), table_name='image')
+    op.drop_index('ix_product_item_product_id', table_name='product_item')
+    op.drop_index('ix_product_category_id', table_name='product')
+    op.drop_index('ix_variation_category_name', table_name='variation')
+    op.drop_index('ix_variation_line_variation_name', table_name='variation_line')
+    op.drop_index('ix_product_variation_item_line', table_name='product_variation')
+    op.drop_index('ix_product_variation_line_item', table_name='product_variation')
@@ -0,0 +1,40 @@
+"""add variation_facet counts
+
+Revision ID: c52f8d0e7a16
+Revises: b3e6a1c9d274
+Create Date: 2026-10-18 15:12:08.533904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52f8d0e7a16'
+down_revision = 'b3e6a1c9d274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('variation_facet',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('variation_line_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['product_category.id'], ),
+    sa.ForeignKeyConstraint(['variation_line_id'], ['variation_line.id'], ),
+    sa.PrimaryKeyConstraint('category_id', 'variation_line_id')
+    )
+    # counts of the existing catalog
+    op.execute(
+        "INSERT INTO variation_facet (category_id, variation_line_id, count) "
+        "SELECT product.category_id, product_variation.variation_line_id, count(*) "
+        "FROM product_variation "
+        "JOIN product_item ON product_variation.product_item_id = product_item.id "
+        "JOIN product ON product_item.product_id = product.id "
+        "GROUP BY product.category_id, product_variation.variation_line_id"
+    )
+
+
+def downgrade():
+    op.drop_table('variation_facet')
@@ -0,0 +1,26 @@
+"""add variant to image_line
+
+Revision ID: d41e7a09c5f2
+Revises: 8c2d4f6a1b3e
+Create Date: 2026-10-18 10:03:12.204716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e7a09c5f2'
+down_revision = '8c2d4f6a1b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image_line', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variant', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('image_line', schema=None) as batch_op:
+        batch_op.drop_column('variant')
@@ -0,0 +1,86 @@
+"""add stock, shopping cart and orders
+
+Revision ID: d9f3a2b7c614
+Revises: c52f8d0e7a16
+Create Date: 2026-10-18 18:20:41.102937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f3a2b7c614'
+down_revision = 'c52f8d0e7a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('qty_in_stock', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_check_constraint('ck_product_item_qty_in_stock', 'qty_in_stock >= 0')
+
+    op.create_table('shopping_cart',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['site_user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_shopping_cart_updated_at'), 'shopping_cart', ['updated_at'], unique=False)
+    op.create_table('shopping_cart_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cart_id', sa.Integer(), nullable=False),
+    sa.Column('product_item_id', sa.Integer(), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['cart_id'], ['shopping_cart.id'], ),
+    sa.ForeignKeyConstraint(['product_item_id'], ['product_item.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cart_id', 'product_item_id', name='uq_shopping_cart_item')
+    )
+    op.create_index(op.f('ix_shopping_cart_item_product_item_id'), 'shopping_cart_item', ['product_item_id'], unique=False)
+    op.create_table('shop_order',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_date', sa.DateTime(), nullable=False),
+    sa.Column('payment_method_id', sa.Integer(), nullable=False),
+    sa.Column('shipping_address_id', sa.Integer(), nullable=False),
+    sa.Column('shipping_method_id', sa.Integer(), nullable=False),
+    sa.Column('order_total', sa.Float(), nullable=False),
+    sa.Column('order_status', sa.String(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['payment_method_id'], ['user_payment_method.id'], ),
+    sa.ForeignKeyConstraint(['shipping_address_id'], ['address.id'], ),
+    sa.ForeignKeyConstraint(['shipping_method_id'], ['shipping_method.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['site_user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_shop_order_user_id', 'shop_order', ['user_id', 'id'], unique=False)
+    op.create_table('order_line',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_item_id', sa.Integer(), nullable=False),
+    sa.Column('qty', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['shop_order.id'], ),
+    sa.ForeignKeyConstraint(['product_item_id'], ['product_item.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_line_order_id'), 'order_line', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_line_product_item_id'), 'order_line', ['product_item_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_order_line_product_item_id'), table_name='order_line')
+    op.drop_index(op.f('ix_order_line_order_id'), table_name='order_line')
+    op.drop_table('order_line')
+    op.drop_index('ix_shop_order_user_id', table_name='shop_order')
+    op.drop_table('shop_order')
+    op.drop_index(op.f('ix_shopping_cart_item_product_item_id'), table_name='shopping_cart_item')
+    op.drop_table('shopping_cart_item')
+    op.drop_index(op.f('ix_shopping_cart_updated_at'), table_name='shopping_cart')
+    op.drop_table('shopping_cart')
+    with op.batch_alter_table('product_item', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_product_item_qty_in_stock', type_='check')
+        batch_op.drop_column('qty_in_stock')
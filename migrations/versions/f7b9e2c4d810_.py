@@ -0,0 +1,30 @@
+"""add image_blob for content addressed images
+
+Revision ID: f7b9e2c4d810
+Revises: d41e7a09c5f2
+Create Date: 2026-10-18 11:26:51.730492
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b9e2c4d810'
+down_revision = 'd41e7a09c5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_blob',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=80), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('filename')
+    )
+
+
+def downgrade():
+    op.drop_table('image_blob')
@@ -9,6 +9,15 @@ from models.product import Product
 from models.product_item import ProductItem
 from models.image import Image
 from models.image_line import ImageLine
+from models.image_blob import ImageBlob
 from models.variation import Variation
 from models.variation_line import VariationLine
-from models.shipping_method import ShippingMethod
\ No newline at end of file
+from models.shipping_method import ShippingMethod
+from models.variation_facet import VariationFacet
+from models.shopping_cart import ShoppingCart
+from models.shopping_cart_item import ShoppingCartItem
+from models.shop_order import ShopOrder
+from models.order_line import OrderLine
+from models.idempotency_key import IdempotencyKey
+from models.job import Job
+from models.token import TokenModel
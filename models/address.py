@@ -37,12 +37,12 @@ class AddressModel(db.Model):
         self.country_id = country_id
 
     @classmethod
-    def find_all(cls) -> List['AddressModel']:
-        return cls.query.all()
+    def find_all(cls, schema=None) -> List['AddressModel']:
+        return cls.query_for(schema).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "AddressModel":
-        return cls.query.get_or_404(id)
+    def find_by_id(cls, id: int, schema=None) -> "AddressModel":
+        return cls.query_for(schema).get_or_404(id)
 
     def save_to_db(self) -> None:
         db.session.add(self)
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from typing import Optional
+
+import config
+from db import db
+
+class IdempotencyKey(db.Model):
+    """Result of a POST sent with an Idempotency-Key header, replayed to the retries of the client"""
+    __tablename__ = "idempotency_key"
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of user + method + path + header value
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of the body
+    status_code = db.Column(db.Integer)  # None while the first request is still running
+    mimetype = db.Column(db.String(80))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __init__(self, key: str, fingerprint: str) -> None:
+        self.key = key
+        self.fingerprint = fingerprint
+        self.created_at = datetime.utcnow()
+
+    @property
+    def expired(self) -> bool:
+        return self.created_at < datetime.utcnow() - timedelta(seconds=config.IDEMPOTENCY_KEY_TTL)
+
+    @classmethod
+    def find_by_key(cls, key: str) -> Optional["IdempotencyKey"]:
+        return db.session.get(cls, key)
+
+    @classmethod
+    def purge_expired(cls, ttl: int = config.IDEMPOTENCY_KEY_TTL) -> int:
+        """Delete the keys older than ttl seconds, return how many"""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+        return db.session.execute(
+            delete(cls).where(cls.created_at < cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def save_to_db(self) -> None:
+        db.session.add(self)
+        db.session.commit()
+
+    def delete_from_db(self) -> None:
+        db.session.delete(self)
+        db.session.commit()
@@ -5,7 +5,7 @@ class Image(db.Model):
     __tablename__ = "image"
 
     id = db.Column(db.Integer, primary_key=True)
-    product_item_id = db.Column(db.Integer, db.ForeignKey("product_item.id"), nullable=False)
+    product_item_id = db.Column(db.Integer, db.ForeignKey("product_item.id"), nullable=False, index=True)
     name = db.Column(db.String(80), nullable=False)
 
     product_item = db.relationship(
@@ -16,6 +16,7 @@ class Image(db.Model):
     image_lines = db.relationship(
         "ImageLine",
         back_populates="image",
+        cascade="all, delete-orphan",
     )
 
     def __init__(
@@ -34,6 +35,10 @@ class Image(db.Model):
     def find_by_id(cls, id: int) -> "Image":
         return cls.query.get(id)
 
+    @classmethod
+    def find_by_name(cls, name: str) -> "Image":
+        return cls.query.filter_by(name=name).first()
+
     def save_to_db(self) -> None:
         db.session.add(self)
         db.session.commit()
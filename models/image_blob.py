@@ -0,0 +1,52 @@
+from sqlalchemy import delete, update
+
+from db import db, increment
+
+class ImageBlob(db.Model):
+    """Content addressed image file shared by every upload of the same content"""
+    __tablename__ = "image_blob"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(80), unique=True, nullable=False)  # "<sha256>.<extension>"
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.ref_count = 0
+
+    @classmethod
+    def find_by_filename(cls, filename: str) -> "ImageBlob":
+        return cls.query.filter_by(filename=filename).first()
+
+    @classmethod
+    def acquire(cls, filename: str, connection=None) -> None:
+        """
+        Add a reference to the file, registering it on first use.
+        With a connection (during a flush) nothing is committed.
+        """
+        # one upsert: concurrent first uploads of the same content neither fail nor lose references
+        executor = connection if connection is not None else db.session
+        increment(executor, cls.__table__, {"filename": filename}, "ref_count", 1)
+        if connection is None:
+            db.session.commit()
+
+    @classmethod
+    def release(cls, filename: str, connection=None) -> bool:
+        """
+        Remove a reference to the file and return True if it was the last one (the row is gone then).
+        With a connection (during a flush) nothing is committed.
+        """
+        executor = connection if connection is not None else db.session
+        table = cls.__table__
+        executor.execute(
+            update(table)
+            .where(table.c.filename == filename, table.c.ref_count > 0)
+            .values(ref_count=table.c.ref_count - 1)
+        )
+        # only if nobody took a new reference in the meantime
+        unused = executor.execute(
+            delete(table).where(table.c.filename == filename, table.c.ref_count == 0)
+        ).rowcount > 0
+        if connection is None:
+            db.session.commit()
+        return unused
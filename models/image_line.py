@@ -7,6 +7,7 @@ class ImageLine(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     image_id = db.Column(db.Integer, db.ForeignKey("image.id"), nullable=False)
     image_path = db.Column(db.String(255), nullable=False)
+    variant = db.Column(db.String(40), nullable=True)  # e.g: "thumbnail", see config.IMAGE_DERIVATIVES
 
     image = db.relationship(
         "Image",
@@ -17,9 +18,11 @@ class ImageLine(db.Model):
         self,
         image_id: int,
         image_path: str,
+        variant: str = None,
     ) -> None:
         self.image_id = image_id
         self.image_path = image_path
+        self.variant = variant
 
     @classmethod
     def find_all(cls) -> List["ImageLine"]:
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+from typing import List, Optional
+
+import config
+from db import db
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+JOB_LOST = "The worker running the job stopped (or it ran for longer than JOB_TIMEOUT)."
+
+class Job(db.Model):
+    """Background job, see utils/jobs.py"""
+    __tablename__ = "job"
+    # what the workers poll: next queued job to run
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=JOB_QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)
+    locked_by = db.Column(db.String(80))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    user_id = db.Column(db.Integer, db.ForeignKey("site_user.id"), index=True)  # who enqueued it, if anyone
+    created_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+
+    def __init__(
+        self,
+        name: str,
+        payload: dict,
+        max_attempts: int = config.JOB_MAX_ATTEMPTS,
+        run_at: datetime = None,
+        user_id: int = None,
+    ) -> None:
+        self.name = name
+        self.payload = payload
+        self.status = JOB_QUEUED
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.created_at = datetime.utcnow()
+        self.run_at = run_at or self.created_at
+        self.user_id = user_id
+
+    @classmethod
+    def find_by_id(cls, id: int) -> Optional["Job"]:
+        return cls.query.get(id)
+
+    @classmethod
+    def filter_query(cls, query, status: str = None, name: str = None):
+        if status is not None:
+            query = query.filter(cls.status == status)
+        if name is not None:
+            query = query.filter(cls.name == name)
+        return query
+
+    @classmethod
+    def claim(cls, worker: str, limit: int = 1) -> List[int]:
+        """
+        Take up to limit jobs that are due, for this worker. Jobs left running by a worker
+        that died (locked for longer than JOB_TIMEOUT) are taken again while they have attempts
+        left, and failed otherwise: a job that kills its worker isn't retried forever.
+        Each job is taken with a conditional UPDATE: two workers never get the same one.
+        """
+        now = datetime.utcnow()
+        stale = (cls.status == JOB_RUNNING) & (cls.locked_at < now - timedelta(seconds=config.JOB_TIMEOUT))
+        db.session.execute(
+            update(cls)
+            .where(stale, cls.attempts >= cls.max_attempts)
+            .values(status=JOB_FAILED, finished_at=now, locked_by=None, last_error=JOB_LOST)
+            .execution_options(synchronize_session=False)
+        )
+        due = or_(
+            (cls.status == JOB_QUEUED) & (cls.run_at <= now),
+            stale & (cls.attempts < cls.max_attempts),
+        )
+        ids = db.session.scalars(select(cls.id).where(due).order_by(cls.run_at, cls.id).limit(limit)).all()
+        claimed = []
+        for id in ids:
+            taken = db.session.execute(
+                update(cls)
+                .where(cls.id == id, due)
+                .values(status=JOB_RUNNING, locked_by=worker, locked_at=now, attempts=cls.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if taken:
+                claimed.append(id)
+        db.session.commit()
+        return claimed
+
+    def finish(self) -> None:
+        self.status = JOB_DONE
+        self.finished_at = datetime.utcnow()
+        self.last_error = None
+        self.locked_by = None
+        db.session.commit()
+
+    def fail(self, error: str) -> None:
+        """Record the error, queue the job again with an exponential backoff until max_attempts"""
+        self.last_error = error[-config.JOB_MAX_ERROR_LENGTH:]
+        self.locked_by = None
+        if self.attempts < self.max_attempts:
+            delay = min(config.JOB_RETRY_BACKOFF * 2 ** (self.attempts - 1), config.JOB_RETRY_BACKOFF_MAX)
+            self.status = JOB_QUEUED
+            self.run_at = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            self.status = JOB_FAILED
+            self.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def retry(self) -> None:
+        """Queue a failed job again, with a fresh set of attempts"""
+        self.status = JOB_QUEUED
+        self.attempts = 0
+        self.run_at = datetime.utcnow()
+        self.finished_at = None
+
+    def save_to_db(self) -> None:
+        db.session.add(self)
+        db.session.commit()
+
+    def delete_from_db(self) -> None:
+        db.session.delete(self)
+        db.session.commit()
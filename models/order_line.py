@@ -0,0 +1,23 @@
+from db import db
+
+class OrderLine(db.Model):
+    __tablename__ = "order_line"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("shop_order.id"), nullable=False, index=True)
+    product_item_id = db.Column(db.Integer, db.ForeignKey("product_item.id"), nullable=False, index=True)
+    qty = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False)  # unit price when the order was placed
+
+    order = db.relationship("ShopOrder", back_populates="lines")
+    product_item = db.relationship("ProductItem")
+
+    def __init__(
+        self,
+        product_item_id: int,
+        qty: int,
+        price: float,
+    ) -> None:
+        self.product_item_id = product_item_id
+        self.qty = qty
+        self.price = price
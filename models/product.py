@@ -1,8 +1,11 @@
 from db import db
-from typing import List
+from sqlalchemy import select
+from typing import Iterable, List
 
 class Product(db.Model):
     __tablename__ = "product"
+    # products of a category in id order (keyset pagination)
+    __table_args__ = (db.Index("ix_product_category_id", "category_id", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("product_category.id"), nullable=False)
@@ -30,12 +33,29 @@ class Product(db.Model):
         self.description = description
 
     @classmethod
-    def find_all(cls) -> List["Product"]:
-        return cls.query.all()
+    def find_all(cls, schema=None) -> List["Product"]:
+        return cls.query_for(schema).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "Product":
-        return cls.query.get(id)
+    def find_by_id(cls, id: int, schema=None) -> "Product":
+        return cls.query_for(schema).get(id)
+
+    @classmethod
+    def filter_query(
+        cls,
+        query,
+        category_ids: Iterable[int] = None,
+        variation_groups: Iterable[List[int]] = (),
+    ):
+        """Narrow a Product query to the products having at least one item matching the variations"""
+        from models.product_item import ProductItem
+
+        if category_ids is not None:
+            query = query.filter(cls.category_id.in_(category_ids))
+        if variation_groups:
+            items = ProductItem.filter_query(select(ProductItem.product_id), variation_groups=variation_groups)
+            query = query.filter(cls.id.in_(items))
+        return query
 
     def save_to_db(self) -> None:
         db.session.add(self)
@@ -43,4 +63,4 @@ class Product(db.Model):
 
     def delete_from_db(self) -> None:
         db.session.delete(self)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
@@ -1,12 +1,16 @@
 from db import db
 from typing import List
 
+import config
+
 class ProductCategory(db.Model):
     __tablename__ = "product_category"
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     parent_category_id = db.Column(db.Integer, db.ForeignKey("product_category.id"), nullable=True)
+    # materialized path of ids from the root, e.g: "/1/4/9/"
+    path = db.Column(db.String(255), nullable=True, index=True)
 
     # self joined table relationship
     sub_categories = db.relationship(
@@ -37,15 +41,44 @@ class ProductCategory(db.Model):
         self.parent_category_id = parent_category_id
 
     @classmethod
-    def find_all(cls) -> List["ProductCategory"]:
-        return cls.query.filter_by(parent=None).all()
+    def find_all(cls, schema=None) -> List["ProductCategory"]:
+        return cls.query_for(schema).filter_by(parent=None).all()
+
+    @classmethod
+    def find_page(cls, after_id: int = None, limit: int = config.DEFAULT_PAGE_SIZE, query=None, schema=None):
+        # Only top level categories are listed, sub categories are nested in them
+        query = cls.query_for(schema).filter_by(parent=None) if query is None else query
+        return super().find_page(after_id=after_id, limit=limit, query=query)
+
+    @classmethod
+    def find_page_rows(cls, schema, after_id: int = None, limit: int = config.DEFAULT_PAGE_SIZE, where: tuple = ()):
+        return super().find_page_rows(
+            schema, after_id=after_id, limit=limit, where=(cls.parent_category_id.is_(None), *where)
+        )
 
     @classmethod
-    def find_by_id(cls, id: int) -> "ProductCategory":
-        return cls.query.get(id)
+    def find_by_id(cls, id: int, schema=None) -> "ProductCategory":
+        return cls.query_for(schema).get(id)
+
+    def find_descendants(self) -> List["ProductCategory"]:
+        """Return every category below this one using the materialized path"""
+        return ProductCategory.query.filter(
+            ProductCategory.path.startswith(self.path),
+            ProductCategory.id != self.id,
+        ).order_by(ProductCategory.path).all()
+
+    def build_path(self) -> str:
+        if self.parent_category_id is None:
+            return f"/{self.id}/"
+        parent = ProductCategory.find_by_id(id=self.parent_category_id)
+        return f"{parent.path or parent.build_path()}{self.id}/"
 
     def save_to_db(self) -> None:
         db.session.add(self)
+        if self.path is None:
+            # The id is needed to build the path
+            db.session.flush()
+            self.path = self.build_path()
         db.session.commit()
 
     def delete_from_db(self) -> None:
@@ -1,22 +1,39 @@
 from db import db
-from typing import List
+from sqlalchemy import select, update
+from typing import Iterable, List, Optional
+
+from models.variation_line import product_variation
 
 class ProductItem(db.Model):
     __tablename__ = "product_item"
+    # items of a product in id order (keyset pagination)
+    __table_args__ = (
+        db.Index("ix_product_item_product_id", "product_id", "id"),
+        db.CheckConstraint("qty_in_stock >= 0", name="ck_product_item_qty_in_stock"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
     sku = db.Column(db.String(20))
     price = db.Column(db.Float, nullable=False)
+    qty_in_stock = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     product = db.relationship(
         "Product",
         back_populates="product_items",
     )
 
+    # deleted with the item, which gives their files' references back (see utils/image_helper.py)
     image = db.relationship(
         "Image",
-        back_populates="product_item"
+        back_populates="product_item",
+        cascade="all, delete-orphan",
+    )
+
+    variation_lines = db.relationship(
+        "VariationLine",
+        secondary=product_variation,
+        order_by="VariationLine.variation_id",
     )
 
     def __init__(
@@ -24,18 +41,90 @@ class ProductItem(db.Model):
         product_id: int,
         price: float,
         sku: str = None,
+        qty_in_stock: int = 0,
     ) -> None:
         self.product_id = product_id
         self.sku = sku
         self.price = price
+        self.qty_in_stock = qty_in_stock
+
+    @classmethod
+    def find_all(cls, schema=None) -> List["ProductItem"]:
+        return cls.query_for(schema).all()
+
+    @classmethod
+    def find_by_id(cls, id: int, schema=None) -> "ProductItem":
+        return cls.query_for(schema).get(id)
+
+    @classmethod
+    def filter_query(
+        cls,
+        query,
+        product_id: int = None,
+        category_ids: Iterable[int] = None,
+        variation_groups: Iterable[List[int]] = (),
+    ):
+        """
+        Narrow a ProductItem query.
+        variation_groups: lists of variation line ids, an item must have one line of every group
+        e.g: [[size M ids], [color red ids]] -> size=M AND color=red
+        """
+        from models.product import Product
+
+        if product_id is not None:
+            query = query.filter(cls.product_id == product_id)
+        if category_ids is not None:
+            query = query.filter(
+                cls.product_id.in_(select(Product.id).where(Product.category_id.in_(category_ids)))
+            )
+        for line_ids in variation_groups:
+            # one lookup on (variation_line_id, product_item_id) per group
+            query = query.filter(
+                cls.id.in_(
+                    select(product_variation.c.product_item_id)
+                    .where(product_variation.c.variation_line_id.in_(line_ids))
+                )
+            )
+        return query
 
     @classmethod
-    def find_all(cls) -> List["ProductItem"]:
-        return cls.query.all()
+    def reserve(cls, id: int, qty: int) -> Optional[int]:
+        """
+        Take qty units out of the stock of an item, return what is left (None when there isn't enough).
+        One conditional UPDATE instead of read-modify-write: concurrent buyers of the same item
+        never see a stale quantity and the row is only locked for the statement.
+        """
+        return db.session.execute(
+            update(cls)
+            .where(cls.id == id, cls.qty_in_stock >= qty)
+            .values(qty_in_stock=cls.qty_in_stock - qty)
+            .returning(cls.qty_in_stock)
+            .execution_options(synchronize_session="fetch")
+        ).scalar()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "ProductItem":
-        return cls.query.get(id)
+    def restock(cls, id: int, qty: int) -> Optional[int]:
+        """
+        Put qty units back into the stock (delivery, released reservation), negative to take them out.
+        Return the new stock, None when it would go below 0.
+        """
+        return db.session.execute(
+            update(cls)
+            .where(cls.id == id, cls.qty_in_stock + qty >= 0)
+            .values(qty_in_stock=cls.qty_in_stock + qty)
+            .returning(cls.qty_in_stock)
+            .execution_options(synchronize_session="fetch")
+        ).scalar()
+
+    def is_referenced(self) -> bool:
+        """Whether shopping carts or orders still point to this item (it can't be deleted then)"""
+        from models.order_line import OrderLine
+        from models.shopping_cart_item import ShoppingCartItem
+
+        return any(
+            db.session.execute(select(model.id).where(model.product_item_id == self.id).limit(1)).first() is not None
+            for model in (ShoppingCartItem, OrderLine)
+        )
 
     def save_to_db(self) -> None:
         db.session.add(self)
@@ -43,4 +132,4 @@ class ProductItem(db.Model):
 
     def delete_from_db(self) -> None:
         db.session.delete(self)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
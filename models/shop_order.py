@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import update
+from typing import List
+
+from db import db
+from models.order_line import OrderLine
+from models.product_item import ProductItem
+
+ORDER_PENDING = "pending"
+ORDER_CANCELLED = "cancelled"
+
+class ShopOrder(db.Model):
+    __tablename__ = "shop_order"
+    __table_args__ = (db.Index("ix_shop_order_user_id", "user_id", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("site_user.id"), nullable=False)
+    order_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payment_method_id = db.Column(db.Integer, db.ForeignKey("user_payment_method.id"), nullable=False)
+    shipping_address_id = db.Column(db.Integer, db.ForeignKey("address.id"), nullable=False)
+    shipping_method_id = db.Column(db.Integer, db.ForeignKey("shipping_method.id"), nullable=False)
+    order_total = db.Column(db.Float, nullable=False)
+    order_status = db.Column(db.String(20), nullable=False, default=ORDER_PENDING)
+
+    lines = db.relationship(
+        "OrderLine",
+        back_populates="order",
+        cascade="all, delete-orphan",
+        order_by="OrderLine.id",
+    )
+    shipping_method = db.relationship("ShippingMethod")
+
+    def __init__(
+        self,
+        user_id: int,
+        payment_method_id: int,
+        shipping_address_id: int,
+        shipping_method_id: int,
+        order_total: float = 0,
+    ) -> None:
+        self.user_id = user_id
+        self.payment_method_id = payment_method_id
+        self.shipping_address_id = shipping_address_id
+        self.shipping_method_id = shipping_method_id
+        self.order_total = order_total
+        self.order_status = ORDER_PENDING
+
+    @classmethod
+    def find_by_id(cls, id: int, schema=None) -> "ShopOrder":
+        return cls.query_for(schema).get(id)
+
+    @classmethod
+    def filter_query(cls, query, user_id: int = None):
+        if user_id is not None:
+            query = query.filter(cls.user_id == user_id)
+        return query
+
+    def add_lines(self, items: List[tuple], shipping_price: float) -> None:
+        """Lines from (product item id, qty, unit price), the stock is already reserved"""
+        self.lines = [OrderLine(product_item_id=id, qty=qty, price=price) for id, qty, price in items]
+        self.order_total = round(sum(qty * price for _, qty, price in items) + shipping_price, 2)
+
+    def cancel(self) -> bool:
+        """Cancel a pending order and give its stock back, False when it isn't pending anymore"""
+        # conditional on the status: two cancels can't both release the stock
+        cancelled = db.session.execute(
+            update(ShopOrder)
+            .where(ShopOrder.id == self.id, ShopOrder.order_status == ORDER_PENDING)
+            .values(order_status=ORDER_CANCELLED)
+            .execution_options(synchronize_session="fetch")
+        ).rowcount
+        if not cancelled:
+            return False
+        for line in self.lines:
+            ProductItem.restock(line.product_item_id, line.qty)
+        return True
+
+    def save_to_db(self) -> None:
+        db.session.add(self)
+        db.session.commit()
+
+    def delete_from_db(self) -> None:
+        db.session.delete(self)
+        db.session.commit()
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, tuple_, update
+from typing import Optional
+
+import config
+from db import db
+from models.product_item import ProductItem
+from models.shopping_cart_item import ShoppingCartItem
+
+class CartError(Exception):
+    """Change of a cart that can't be made, the transaction has to be rolled back"""
+
+class OutOfStock(CartError):
+    pass
+
+class CartChanged(CartError):
+    """The cart was changed by another request since it was read"""
+
+class ShoppingCart(db.Model):
+    """
+    A cart holds the stock of its items: adding to the cart reserves the units,
+    checkout turns the reservation into an order, carts left alone for longer than
+    CART_RESERVATION_TTL give it back (see release_expired()).
+    """
+    __tablename__ = "shopping_cart"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("site_user.id"), unique=True, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    items = db.relationship(
+        "ShoppingCartItem",
+        back_populates="cart",
+        order_by="ShoppingCartItem.id",
+    )
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+
+    @classmethod
+    def find_by_user(cls, user_id: int, schema=None) -> Optional["ShoppingCart"]:
+        return cls.query_for(schema).filter_by(user_id=user_id).first()
+
+    @classmethod
+    def get_or_create(cls, user_id: int) -> "ShoppingCart":
+        cart = cls.find_by_user(user_id=user_id)
+        if cart is None:
+            cart = cls(user_id=user_id)
+            db.session.add(cart)
+            db.session.flush()
+        return cart
+
+    @property
+    def total(self) -> float:
+        return round(sum(item.qty * item.product_item.price for item in self.items), 2)
+
+    def find_item(self, product_item_id: int) -> Optional[ShoppingCartItem]:
+        return ShoppingCartItem.query.filter_by(cart_id=self.id, product_item_id=product_item_id).first()
+
+    def add_item(self, product_item_id: int, qty: int) -> int:
+        """Reserve qty units of a product item and put them in the cart, return the stock left"""
+        left = ProductItem.reserve(product_item_id, qty)
+        if left is None:
+            raise OutOfStock()
+        added = db.session.execute(
+            update(ShoppingCartItem)
+            .where(ShoppingCartItem.cart_id == self.id, ShoppingCartItem.product_item_id == product_item_id)
+            .values(qty=ShoppingCartItem.qty + qty)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not added:
+            db.session.add(ShoppingCartItem(cart_id=self.id, product_item_id=product_item_id, qty=qty))
+        self._touch()
+        return left
+
+    def set_item_qty(self, item: ShoppingCartItem, qty: int) -> None:
+        """Change the quantity of an item (0 removes it), reserving or releasing the difference"""
+        delta = qty - item.qty
+        if delta > 0 and ProductItem.reserve(item.product_item_id, delta) is None:
+            raise OutOfStock()
+
+        # optimistic: only if nobody changed the quantity since we read it
+        where = (ShoppingCartItem.id == item.id, ShoppingCartItem.qty == item.qty)
+        statement = update(ShoppingCartItem).where(*where).values(qty=qty) if qty else delete(ShoppingCartItem).where(*where)
+        if db.session.execute(statement.execution_options(synchronize_session=False)).rowcount != 1:
+            raise CartChanged()
+
+        if delta < 0:
+            ProductItem.restock(item.product_item_id, -delta)
+        self._touch()
+
+    def take_items(self) -> list:
+        """
+        Empty the cart for a checkout, return (product item id, qty, price) of what was in it.
+        The rows are deleted as they were read, so the same reservation can't be used twice
+        (concurrent checkout, expiry).
+        """
+        rows = db.session.execute(
+            select(ShoppingCartItem.id, ShoppingCartItem.qty, ProductItem.id, ProductItem.price)
+            .join(ProductItem, ShoppingCartItem.product_item_id == ProductItem.id)
+            .where(ShoppingCartItem.cart_id == self.id)
+            .order_by(ShoppingCartItem.id)
+        ).all()
+        if rows:
+            taken = db.session.execute(
+                delete(ShoppingCartItem)
+                .where(tuple_(ShoppingCartItem.id, ShoppingCartItem.qty).in_([(id, qty) for id, qty, _, _ in rows]))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if taken != len(rows):
+                raise CartChanged()
+            self._touch()
+        return [(product_item_id, qty, price) for _, qty, product_item_id, price in rows]
+
+    def _touch(self) -> None:
+        self.updated_at = datetime.utcnow()
+        db.session.flush()
+        db.session.expire_all()  # the items were changed with UPDATE/DELETE statements
+
+    @classmethod
+    def release_expired(cls, ttl: int = config.CART_RESERVATION_TTL) -> int:
+        """Empty the carts idle for longer than ttl seconds and give their stock back, return the number of items"""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+        expired = select(cls.id).where(cls.updated_at < cutoff)
+        rows = db.session.execute(
+            select(ShoppingCartItem.id, ShoppingCartItem.product_item_id, ShoppingCartItem.qty)
+            .where(ShoppingCartItem.cart_id.in_(expired))
+        ).all()
+
+        released = 0
+        for id, product_item_id, qty in rows:
+            # skipped if the cart was used or checked out meanwhile
+            deleted = db.session.execute(
+                delete(ShoppingCartItem)
+                .where(ShoppingCartItem.id == id, ShoppingCartItem.qty == qty, ShoppingCartItem.cart_id.in_(expired))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if deleted:
+                ProductItem.restock(product_item_id, qty)
+                released += 1
+        db.session.commit()
+        return released
+
+    def save_to_db(self) -> None:
+        db.session.add(self)
+        db.session.commit()
+
+    def delete_from_db(self) -> None:
+        db.session.delete(self)
+        db.session.commit()
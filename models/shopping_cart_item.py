@@ -0,0 +1,24 @@
+from db import db
+
+class ShoppingCartItem(db.Model):
+    __tablename__ = "shopping_cart_item"
+    # one row per product item in a cart, quantities are added up
+    __table_args__ = (db.UniqueConstraint("cart_id", "product_item_id", name="uq_shopping_cart_item"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    cart_id = db.Column(db.Integer, db.ForeignKey("shopping_cart.id"), nullable=False)
+    product_item_id = db.Column(db.Integer, db.ForeignKey("product_item.id"), nullable=False, index=True)
+    qty = db.Column(db.Integer, nullable=False)
+
+    cart = db.relationship("ShoppingCart", back_populates="items")
+    product_item = db.relationship("ProductItem")
+
+    def __init__(
+        self,
+        cart_id: int,
+        product_item_id: int,
+        qty: int,
+    ) -> None:
+        self.cart_id = cart_id
+        self.product_item_id = product_item_id
+        self.qty = qty
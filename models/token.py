@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from typing import List, Tuple
+
+from db import db
+
+class TokenModel(db.Model):
+    """Revoked JWT (logout), blocked until it expires. Checked through utils/token_blocklist.py"""
+    __tablename__ = "revoked_token"
+    # ids must only grow, SQLite would otherwise give the id of a purged last row again
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)  # watermark of the in-memory blocklists
+    jti = db.Column(db.String(36), nullable=False, unique=True)
+    token_type = db.Column(db.String(10), nullable=False)  # access / refresh
+    user_id = db.Column(db.Integer, db.ForeignKey("site_user.id", ondelete="SET NULL"), index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __init__(self, jti: str, token_type: str, expires_at: datetime, user_id: int = None) -> None:
+        self.jti = jti
+        self.token_type = token_type
+        self.expires_at = expires_at
+        self.user_id = user_id
+        self.revoked_at = datetime.utcnow()
+
+    @classmethod
+    def find_by_jti(cls, jti: str) -> "TokenModel":
+        return cls.query.filter_by(jti=jti).first()
+
+    @classmethod
+    def find_since(cls, connection, after_id: int) -> List[Tuple[int, str, datetime]]:
+        """(id, jti, expires_at) of the tokens revoked after after_id that haven't expired yet"""
+        return connection.execute(
+            select(cls.id, cls.jti, cls.expires_at)
+            .where(cls.id > after_id, cls.expires_at > datetime.utcnow())
+            .order_by(cls.id)
+        ).all()
+
+    @classmethod
+    def purge_expired(cls, grace: int = 0) -> int:
+        """Delete the tokens expired for more than grace seconds (nobody can use them anymore), return how many"""
+        cutoff = datetime.utcnow() - timedelta(seconds=grace)
+        return db.session.execute(
+            delete(cls).where(cls.expires_at < cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def save_to_db(self) -> None:
+        db.session.add(self)
+        db.session.commit()
+
+    def delete_from_db(self) -> None:
+        db.session.delete(self)
+        db.session.commit()
@@ -1,6 +1,8 @@
 from db import db
 from typing import List
 
+from utils.security import password_hasher
+
 user_address = db.Table(
     "user_address",
     db.Column('user_id', db.Integer, db.ForeignKey("site_user.id"), nullable=False),
@@ -30,11 +32,11 @@ class UserModel(db.Model):
         back_populates="user",
     )
 
+    # not "dynamic" so that it can be eager loaded with selectinload
     addresses = db.relationship(
         "AddressModel", 
         secondary=user_address, 
         back_populates="users", 
-        lazy="dynamic",
         cascade="save-update, merge",
     )
 
@@ -52,17 +54,28 @@ class UserModel(db.Model):
         self.last_name = last_name
         self.email_address = email_address
         self.phone_number = phone_number
-        self.password = password
+        self.set_password(password)
         self.role_id = role_id
         self.status = status
 
     @classmethod
-    def find_all(cls) -> List["UserModel"]:
-        return cls.query.all()
+    def find_all(cls, schema=None) -> List["UserModel"]:
+        return cls.query_for(schema).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "UserModel":
-        return cls.query.get(id)
+    def find_by_id(cls, id: int, schema=None) -> "UserModel":
+        return cls.query_for(schema).get(id)
+
+    def set_password(self, password: str) -> None:
+        self.password = password_hasher.hash(password)
+
+    def check_password(self, password: str) -> bool:
+        """Verify the password and upgrade the stored hash if its parameters are outdated"""
+        valid, new_hash = password_hasher.verify(password, self.password)
+        if valid and new_hash:
+            self.password = new_hash
+            self.save_to_db()
+        return valid
 
     def save_to_db(self) -> None:
         db.session.add(self)
@@ -33,12 +33,12 @@ class UserPaymentMethodModel(db.Model):
         self.is_default = is_default
 
     @classmethod
-    def find_all(cls, user_id: int) -> List["UserPaymentMethodModel"]:
-        return cls.query.filter_by(user_id=user_id).all()
+    def find_all(cls, user_id: int, schema=None) -> List["UserPaymentMethodModel"]:
+        return cls.query_for(schema).filter_by(user_id=user_id).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "UserPaymentMethodModel":
-        return cls.query.get_or_404(id)
+    def find_by_id(cls, id: int, schema=None) -> "UserPaymentMethodModel":
+        return cls.query_for(schema).get_or_404(id)
 
     def save_to_db(self):
         db.session.add(self)
@@ -3,6 +3,7 @@ from typing import List
 
 class Variation(db.Model):
     __tablename__ = "variation"
+    __table_args__ = (db.Index("ix_variation_category_name", "category_id", "name"),)
 
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("product_category.id"), nullable=False)
@@ -27,12 +28,12 @@ class Variation(db.Model):
         self.name = name
 
     @classmethod
-    def find_all(cls) -> List["Variation"]:
-        return cls.query.all()
+    def find_all(cls, schema=None) -> List["Variation"]:
+        return cls.query_for(schema).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "Variation":
-        return cls.query.get(id)
+    def find_by_id(cls, id: int, schema=None) -> "Variation":
+        return cls.query_for(schema).get(id)
 
     def save_to_db(self) -> None:
         db.session.add(self)
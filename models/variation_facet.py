@@ -0,0 +1,36 @@
+from db import db
+from sqlalchemy import func, select
+from typing import Iterable, List
+
+class VariationFacet(db.Model):
+    """
+    Number of product items having a variation line, per category of their product.
+    Maintained incrementally by utils/facets.py, repaired with "flask facets-rebuild".
+    """
+    __tablename__ = "variation_facet"
+
+    category_id = db.Column(db.Integer, db.ForeignKey("product_category.id"), primary_key=True)
+    variation_line_id = db.Column(db.Integer, db.ForeignKey("variation_line.id"), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, category_id: int, variation_line_id: int, count: int = 0) -> None:
+        self.category_id = category_id
+        self.variation_line_id = variation_line_id
+        self.count = count
+
+    @classmethod
+    def find_by_categories(cls, category_ids: Iterable[int]) -> List[tuple]:
+        """(variation id, variation name, line id, line name, count) summed over the categories"""
+        from models.variation import Variation
+        from models.variation_line import VariationLine
+
+        total = func.sum(cls.count)
+        return db.session.execute(
+            select(Variation.id, Variation.name, VariationLine.id, VariationLine.name, total)
+            .join(VariationLine, cls.variation_line_id == VariationLine.id)
+            .join(Variation, VariationLine.variation_id == Variation.id)
+            .where(cls.category_id.in_(list(category_ids)))
+            .group_by(Variation.id, Variation.name, VariationLine.id, VariationLine.name)
+            .having(total > 0)
+            .order_by(Variation.name, total.desc(), VariationLine.name)
+        ).all()
@@ -1,14 +1,19 @@
 from db import db
-from typing import List
+from sqlalchemy import and_, or_, select
+from typing import Dict, List, Tuple
 
 product_variation = db.Table(
     "product_variation",
     db.Column("product_item_id", db.Integer, db.ForeignKey("product_item.id"), nullable=False),
-    db.Column("variation_line_id", db.Integer, db.ForeignKey("variation_line.id"), nullable=False)
+    db.Column("variation_line_id", db.Integer, db.ForeignKey("variation_line.id"), nullable=False),
+    # filtering items by variation value, and loading the variations of an item
+    db.Index("ix_product_variation_line_item", "variation_line_id", "product_item_id"),
+    db.Index("ix_product_variation_item_line", "product_item_id", "variation_line_id"),
 )
 
 class VariationLine(db.Model):
     __tablename__ = "variation_line"
+    __table_args__ = (db.Index("ix_variation_line_variation_name", "variation_id", "name"),)
 
     id = db.Column(db.Integer, primary_key=True)
     variation_id = db.Column(db.Integer, db.ForeignKey("variation.id"), nullable=False)
@@ -29,12 +34,31 @@ class VariationLine(db.Model):
         self.name = name
 
     @classmethod
-    def find_all(cls) -> List["VariationLine"]:
-        return cls.query.all()
+    def find_all(cls, schema=None) -> List["VariationLine"]:
+        return cls.query_for(schema).all()
 
     @classmethod
-    def find_by_id(cls, id: int) -> "VariationLine":
-        return cls.query.get(id)
+    def find_by_id(cls, id: int, schema=None) -> "VariationLine":
+        return cls.query_for(schema).get(id)
+
+    @classmethod
+    def ids_by_variation(cls, values: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+        """
+        Ids of the lines matching (variation name, value) pairs, grouped by variation name.
+        e.g: [("Size", "M"), ("Size", "L"), ("Color", "Red")] -> {"Size": [3, 4, 9], "Color": [12]}
+        A variation name exists once per category, so one pair can match several lines.
+        """
+        from models.variation import Variation
+
+        groups = {name: [] for name, _ in values}
+        rows = db.session.execute(
+            select(cls.id, Variation.name)
+            .join(Variation, cls.variation_id == Variation.id)
+            .where(or_(*(and_(Variation.name == name, cls.name == value) for name, value in values)))
+        )
+        for id, name in rows:
+            groups[name].append(id)
+        return groups
 
     def save_to_db(self) -> None:
         db.session.add(self)
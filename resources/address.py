@@ -5,6 +5,11 @@ from sqlalchemy.exc import SQLAlchemyError
 from models import AddressModel, CountryModel
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.address_schema import PlainAddressSchema, AddressSchema
+from schemas.pagination_schema import StreamingArgsSchema
+from utils.pagination import encode_cursor
+from utils.streaming import stream_json
+from utils.helper import Response
+from utils.idempotency import idempotent
 
 blp = Blueprint("Addresses", __name__, description="Operations on Addresses.")
 
@@ -20,14 +25,23 @@ DELETE_SUCCESS = "Address deleted successfully."
 
 @blp.route('/address')
 class AddressList(MethodView):
-    @blp.response(200, responseSchema(PlainAddressSchema, many=True))
+    @blp.arguments(StreamingArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainAddressSchema, many=True, paginated=True))
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Error"})
-    def get(self):
+    def get(self, args):
         """Get List of Addresses with associated Country"""
         #TODO: remove list of users also return in the response
+        if args['stream']:
+            query = AddressModel.query.order_by(AddressModel.id)
+            if args['after'] is not None:
+                query = query.filter(AddressModel.id > args['after'])
+            return stream_json(
+                query,
+                PlainAddressSchema,
+                Response(status="OK", message="Query was successful"),
+            )
         try:
-            # Equivalent to AddressModel.query.all() 
-            addresses = AddressModel.find_all()
+            addresses, next_id = AddressModel.find_page(after_id=args['after'], limit=args['limit'])
         except SQLAlchemyError:
             abort(500, message=SELECT_ERROR)
         else:
@@ -35,10 +49,12 @@ class AddressList(MethodView):
                 "code": 200,
                 "status": "OK",
                 "message": "Query was successful",
-                "data": addresses
+                "data": addresses,
+                "next_cursor": encode_cursor(next_id),
             }
             return res
 
+    @idempotent
     @blp.arguments(AddressSchema)
     @blp.response(201, responseSchema(PlainAddressSchema))
     @blp.alt_response(400, example={"code": 400, "message": INVALID_COUNTRY_ID, "status": "Bad Request"})
@@ -71,7 +87,7 @@ class AddressItem(MethodView):
     def get(self, address_id):
         """Get Address information based on address_id"""
         try:
-            address = AddressModel.find_by_id(id=address_id)
+            address = AddressModel.find_by_id(id=address_id, schema=AddressSchema)
         except SQLAlchemyError:
             abort(500, message=SELECT_ERROR)
         else:
@@ -0,0 +1,105 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from db import db
+from schemas.response_schema import responseSchema
+from schemas.cart_schema import CartSchema, CartItemSchema, CartItemQtySchema
+
+from models import ShoppingCart, ProductItem
+from models.shopping_cart import OutOfStock, CartChanged
+
+from utils.helper import Response
+from utils.idempotency import idempotent
+
+blp = Blueprint("Shopping Cart", __name__, description="Shopping Cart of the logged in User")
+
+INVALID_PRODUCT_ITEM_ID = "Invalid Product Item ID."
+NOT_IN_CART = "Product Item is not in the cart."
+OUT_OF_STOCK = "Not enough stock left for this Product Item."
+CART_CHANGED = "The cart was changed by another request, please try again."
+
+def current_cart(user_id) -> ShoppingCart:
+    """Cart of the user with its items loaded, an empty one (not saved) if there is none yet"""
+    cart = ShoppingCart.find_by_user(user_id=user_id, schema=CartSchema)
+    return cart if cart is not None else ShoppingCart(user_id=user_id)
+
+@blp.route('/cart')
+class CartController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(CartSchema))
+    def get(self):
+        """Return the Shopping Cart of logged in User"""
+        try:
+            return Response(data=current_cart(get_jwt_identity()))
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/cart/item')
+class CartItemController(MethodView):
+    @jwt_required()
+    @idempotent
+    @blp.arguments(CartItemSchema)
+    @blp.response(201, responseSchema(CartSchema))
+    def post(self, data):
+        """
+        Add a Product Item to the cart, the units are reserved until checkout
+        (or until the cart is left alone for CART_RESERVATION_TTL).
+        """
+        try:
+            user_id = get_jwt_identity()
+            if not ProductItem.find_by_id(id=data['product_item_id']):
+                return Response.not_found(message=INVALID_PRODUCT_ITEM_ID)
+
+            cart = ShoppingCart.get_or_create(user_id=user_id)
+            cart.add_item(data['product_item_id'], data['qty'])
+            cart.save_to_db()
+            return Response.created(data=current_cart(user_id), message="Product Item added to cart.")
+        except OutOfStock:
+            db.session.rollback()
+            return Response.conflict(message=OUT_OF_STOCK)
+        except (CartChanged, IntegrityError):
+            # e.g: the same user creating the cart from two requests at once
+            db.session.rollback()
+            return Response.conflict(message=CART_CHANGED)
+        except SQLAlchemyError:
+            db.session.rollback()
+            return Response.server_error()
+
+@blp.route('/cart/item/<int:product_item_id>')
+class CartItemDetailController(MethodView):
+    @jwt_required()
+    @blp.arguments(CartItemQtySchema)
+    @blp.response(200, responseSchema(CartSchema))
+    def put(self, data, product_item_id):
+        """Change the quantity of a Product Item in the cart (0 removes it)"""
+        return update_item(product_item_id, data['qty'])
+
+    @jwt_required()
+    @blp.response(200, responseSchema(CartSchema))
+    def delete(self, product_item_id):
+        """Remove a Product Item from the cart and release its stock"""
+        return update_item(product_item_id, 0)
+
+def update_item(product_item_id: int, qty: int):
+    try:
+        user_id = get_jwt_identity()
+        cart = ShoppingCart.find_by_user(user_id=user_id)
+        item = cart.find_item(product_item_id) if cart is not None else None
+        if item is None:
+            return Response.not_found(message=NOT_IN_CART)
+
+        cart.set_item_qty(item, qty)
+        cart.save_to_db()
+        return Response(data=current_cart(user_id), message="Cart updated.")
+    except OutOfStock:
+        db.session.rollback()
+        return Response.conflict(message=OUT_OF_STOCK)
+    except CartChanged:
+        db.session.rollback()
+        return Response.conflict(message=CART_CHANGED)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return Response.server_error()
@@ -0,0 +1,56 @@
+from flask import request
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import leave_request_transaction
+from schemas.catalog_import_schema import IMPORT_KINDS, ImportArgsSchema, ImportResultSchema
+from schemas.response_schema import responseSchema
+
+from utils.catalog_import import CatalogImporter, read_rows
+from utils.helper import Response
+
+blp = Blueprint("Catalog Import", __name__, description="Bulk import of catalog data")
+
+@blp.route('/import/<string:kind>')
+class CatalogImportController(MethodView):
+    @jwt_required()
+    @blp.arguments(ImportArgsSchema, location="query")
+    @blp.response(200, responseSchema(ImportResultSchema))
+    def post(self, args, kind):
+        """
+        Bulk import catalog rows from a JSON lines or CSV file.
+        kind: variation, variation_line, product, product_item or product_variation.
+        Send the file as multipart "file" or as the raw request body.
+        Foreign keys are given by name, e.g: {"category": "Shirts", "product": "Basic Tee", "sku": "TEE-01", "price": 9.5}
+        """
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            if kind not in IMPORT_KINDS:
+                return Response.not_found(message=f"Unknown import '{kind}', expected one of: {', '.join(IMPORT_KINDS)}.")
+
+            upload = request.files.get("file")
+            stream = upload.stream if upload else request.stream
+            format = args['format']
+            if format is None:
+                mimetype = upload.mimetype if upload else request.mimetype
+                filename = (upload.filename or "") if upload else ""
+                format = "csv" if mimetype == "text/csv" or filename.lower().endswith(".csv") else "jsonl"
+
+            # every chunk is committed on its own, a bad chunk doesn't undo the others
+            leave_request_transaction()
+            result = CatalogImporter(kind).run(read_rows(stream, format))
+            return Response(
+                data=result,
+                message=f"Imported {result['inserted']} of {result['total']} rows.",
+            )
+        except UnicodeDecodeError:
+            return Response.bad_request(message="The file must be UTF-8 encoded.")
+        except SQLAlchemyError:
+            return Response.server_error()
@@ -3,10 +3,13 @@ from flask_smorest import abort, Blueprint
 from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
+from db import on_commit
 from models import CountryModel
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.country_schema import CountrySchema
+from schemas.pagination_schema import PaginationArgsSchema
 from utils.helper import Response
+from utils.response_cache import response_cache
 
 blp = Blueprint("Country", __name__, description="Operations on Countries.")
 
@@ -23,13 +26,15 @@ DELETE_SUCCESS = "Country deleted successfully."
 @blp.route('/country')
 class CountryOperation(MethodView):
     @jwt_required()
-    @blp.response(200, responseSchema(CountrySchema, many=True))
+    @response_cache.cached("country")
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.response(200, responseSchema(CountrySchema, many=True, paginated=True))
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Error"})
-    def get(self):
+    def get(self, args):
         """Return List of Countries from database"""
         try:
-            countries = CountryModel.find_all()
-            return Response(data=countries)
+            countries, next_id = CountryModel.find_page_rows(CountrySchema, after_id=args['after'], limit=args['limit'])
+            return Response.page(countries, next_id)
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
 
@@ -48,6 +53,7 @@ class CountryOperation(MethodView):
                 return Response.bad_request(message="Country Name cannot be empty!")
             country = CountryModel(**country_data)
             country.save_to_db()
+            on_commit(lambda: response_cache.invalidate("country"))
             return Response(
                 code=201,
                 status="Created",
@@ -62,6 +68,7 @@ class CountryOperation(MethodView):
 @blp.route('/country/<int:country_id>')
 class CountryUpdate(MethodView):
     @jwt_required()
+    @response_cache.cached("country")
     @blp.response(200, responseSchema(CountrySchema))
     @blp.alt_response(404, example={"code": 404, "message": COUNTRY_NOT_FOUND, "status": "Not Found"})
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Errro"})
@@ -90,6 +97,7 @@ class CountryUpdate(MethodView):
 
             # If Found -> delete from db and return 200
             country.delete_from_db()
+            on_commit(lambda: response_cache.invalidate("country"))
             return Response(data=country, message=DELETE_SUCCESS)
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
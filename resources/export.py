@@ -0,0 +1,36 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from schemas.export_schema import ExportArgsSchema
+from schemas.response_schema import BaseResponseSchema
+
+from utils.export import EXPORT_DATASETS, stream_export
+from utils.helper import Response
+
+blp = Blueprint("Export", __name__, description="Bulk export of catalog and users")
+
+@blp.route('/export/<string:dataset>')
+class ExportController(MethodView):
+    @jwt_required()
+    @blp.arguments(ExportArgsSchema, location="query")
+    @blp.response(200, BaseResponseSchema)  # errors only, the file itself is streamed as is
+    def get(self, args, dataset):
+        """
+        Download a whole dataset as a CSV or NDJSON file, gzipped by default.
+        dataset: users, addresses or products (one row per product item, with its variations).
+        """
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            if dataset not in EXPORT_DATASETS:
+                return Response.not_found(message=f"Unknown export '{dataset}', expected one of: {', '.join(EXPORT_DATASETS)}.")
+
+            return stream_export(dataset, args['format'], gzip=args['gzip'])
+        except SQLAlchemyError:
+            return Response.server_error()
@@ -1,37 +1,62 @@
 from flask.views import MethodView
 from flask_smorest import abort, Blueprint
 from flask_uploads import UploadNotAllowed
-from flask import request, send_file
+from flask import make_response, request, send_file
+from sqlalchemy.exc import SQLAlchemyError
 
-from schemas.image_schema import ImageUploadSchema
+from models import ProductItem, ImageBlob, Image as ImageModel
+from schemas.image_schema import ImageUploadSchema, ImageUploadResultSchema, ImageVariantArgsSchema, ImageUrlBatchSchema
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from config import *
 
-from utils import image_helper
+from utils import image_helper, image_pipeline  # image_pipeline registers the image.derivatives job
 from utils.helper import Response
+from utils.jobs import enqueue
 
 import traceback
 import os
 
 image_schema = ImageUploadSchema()
-image_folder = "product_images"  # static/images/product_images
+image_folder = image_helper.PRODUCT_IMAGE_FOLDER
 
 blp = Blueprint("Image", __name__, description="Image Uploads")
 
 @blp.route('/upload-image')
 class ImageUpload(MethodView):
-    @blp.response(200, BaseResponseSchema)
+    @blp.response(200, responseSchema(ImageUploadResultSchema))
     def post(self):
         """
         Used to upload an image file.
         """
-        data = image_schema.load(request.files)  # {'image': FileStorage}
+        data = image_schema.load({**request.form.to_dict(), **request.files.to_dict()})  # {'image': FileStorage}
         # user_id = get_jwt_identity() # returns the user_id
 
         try:
-            image_path = image_helper.save_image(image=data['image'], folder=image_folder)
-            basename = image_helper.get_basename(image_path)
+            product_item_id = data.get('product_item_id')
+            if product_item_id is not None and not ProductItem.find_by_id(id=product_item_id):
+                return Response.not_found(message="Invalid Product Item ID.")
+
+            # stored once per content, under the sha256 of the file
+            basename, tmp_path = image_helper.write_temporary(image=data['image'], folder=image_folder)
+            image_id = None
+            try:
+                if product_item_id is not None:
+                    # the row takes its reference to the file before we look whether the file exists
+                    image = ImageModel(product_item_id=product_item_id, name=basename)
+                    image.save_to_db()
+                    image_id = image.id
+                created = image_helper.place_temporary(tmp_path, basename, folder=image_folder)
+            except BaseException:
+                image_helper.discard_temporary(tmp_path)
+                raise
+
+            # thumbnails and resized variants are generated by a background job (see /job/<id>)
+            job = None
+            if created or image_id is not None:
+                path = image_helper.get_path(filename=basename, folder=image_folder)
+                job = enqueue("image.derivatives", path=path, image_id=image_id)
             return Response(
+                data={"name": basename, "job_id": job.id if job is not None else None},
                 message=f"Image '{basename}' has been uploaded successfully."
             )
         except UploadNotAllowed:
@@ -39,6 +64,10 @@ class ImageUpload(MethodView):
             return Response.bad_request(
                 message=f"Image extension '{extension}' is not allowed."
             )
+        except SQLAlchemyError:
+            return Response.server_error(
+                message="Fail to save image."
+            )
         except Exception:
             return Response.server_error(
                 message="Fail to upload image."
@@ -60,14 +89,48 @@ class NetworkImage(MethodView):
             traceback.print_exc()
             return Response.server_error(message="Unable to get image.")
 
+@blp.route('/image/urls')
+class NetworkImageBatch(MethodView):
+    @blp.arguments(ImageUrlBatchSchema)
+    @blp.response(200, responseSchema(ImageUrlBatchSchema))
+    def post(self, data):
+        """Return the URLs of many images in one call"""
+        image_urls = {
+            filename: image_helper.get_image_url(filename=filename)
+            if image_helper.is_filename_safe(file=filename) else None
+            for filename in data['filenames']
+        }
+        return Response(data={"image_urls": image_urls})
+
 @blp.route('/image/<string:filename>')
 class Image(MethodView):
-    def get(self, filename: str):
+    @blp.arguments(ImageVariantArgsSchema, location="query")
+    def get(self, args, filename: str):
+        """Serve an image, or one of its resized variants with ?variant=thumbnail|medium|large&format=webp"""
         if not image_helper.is_filename_safe(file=filename):
             return {"message": "Illegal filename detected."}, 400
+
+        if IMAGE_URL_SIGNING and not image_helper.verify_image_signature(
+            filename, args.get('expires'), args.get('signature')
+        ):
+            return {"message": "Invalid or expired image signature."}, 403
         
         try:
-            return send_file(image_helper.get_path(filename=filename, folder=image_folder))
+            original = path = image_helper.get_path(filename=filename, folder=image_folder)
+            if 'variant' in args or 'format' in args:
+                path = image_helper.find_variant(path, args.get('variant'), args.get('format'))
+            fallback = args.get('variant') is not None and path == original
+
+            etag = image_helper.get_etag(path)
+            if request.if_none_match.contains(etag):
+                # Revalidation is answered from memory, the file is not read
+                response = make_response("", 304)
+                response.set_etag(etag)
+            else:
+                # conditional=True also handles If-Modified-Since and Range requests
+                response = send_file(path, etag=etag, conditional=True)
+            expires = args.get('expires') if IMAGE_URL_SIGNING else None
+            return image_helper.set_cache_headers(response, filename, fallback=fallback, expires=expires)
         except FileNotFoundError:
             traceback.print_exc()
             return {"message": "Image not found."}, 404
@@ -78,7 +141,23 @@ class Image(MethodView):
             return {"message": "Illegal filename detected."}, 400
         
         try:
-            os.remove(image_helper.get_path(filename=filename, folder=image_folder))
+            path = image_helper.get_path(filename=filename, folder=image_folder)
+            if image_helper.is_content_addressed(filename):
+                # the file is shared, it is only removed with its last reference
+                image = ImageModel.find_by_name(filename)
+                if image is not None:
+                    image.delete_from_db()  # gives its reference back (see image_helper)
+                elif ImageBlob.find_by_filename(filename) is not None:
+                    return {"message": "Image is used by product items."}, 409
+                elif os.path.isfile(path):
+                    image_helper.remove_image(path)  # uploaded without a product item
+                else:
+                    raise FileNotFoundError(path)
+            else:
+                os.remove(path)
+                image_helper.forget_etag(path)
+                image_helper.remove_variants(path)
+            return {"message": "Image deleted successfully."}, 200
         except FileNotFoundError:
             return {"message": "File Not Found."}, 404
         except Exception:
@@ -0,0 +1,71 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+from schemas.response_schema import responseSchema
+from schemas.job_schema import JobSchema, JobDetailSchema, JobArgsSchema
+
+from models import Job
+from models.job import JOB_FAILED
+
+from utils.helper import Response
+
+blp = Blueprint("Job", __name__, description="Status of Background Jobs")
+
+INVALID_JOB_ID = "Invalid Job ID."
+
+@blp.route('/job')
+class JobController(MethodView):
+    @jwt_required()
+    @blp.arguments(JobArgsSchema, location="query")
+    @blp.response(200, responseSchema(JobSchema, many=True, paginated=True))
+    def get(self, args):
+        """Return List of Background Jobs, filtered by status and name"""
+        try:
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+            query = Job.filter_query(Job.query, status=args.get('status'), name=args.get('name'))
+            jobs, next_id = Job.find_page(after_id=args['after'], limit=args['limit'], query=query)
+            return Response.page(jobs, next_id)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/job/<int:id>')
+class JobDetailController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(JobDetailSchema))
+    def get(self, id):
+        """Return the status of a Background Job (e.g: job_id of an image upload)"""
+        try:
+            job = Job.find_by_id(id=id)
+            if job is None or not (get_jwt()['is_admin'] or str(job.user_id) == str(get_jwt_identity())):
+                return Response.not_found(message=INVALID_JOB_ID)
+            return Response(data=job)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/job/<int:id>/retry')
+class JobRetryController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(JobDetailSchema))
+    def post(self, id):
+        """Run a failed Background Job again"""
+        try:
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+            job = Job.find_by_id(id=id)
+            if job is None:
+                return Response.not_found(message=INVALID_JOB_ID)
+            if job.status != JOB_FAILED:
+                return Response.conflict(message=f"Job is {job.status}, only failed Jobs can be retried.")
+            job.retry()
+            job.save_to_db()
+            return Response(data=job, message="Job queued again.")
+        except SQLAlchemyError:
+            db.session.rollback()
+            return Response.server_error()
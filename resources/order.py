@@ -0,0 +1,113 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+from schemas.response_schema import responseSchema
+from schemas.order_schema import OrderSchema, PlainOrderSchema, CheckoutSchema, OrderArgsSchema
+
+from models import ShopOrder, ShoppingCart, ShippingMethod, UserModel, UserPaymentMethodModel
+from models.shopping_cart import CartChanged
+
+from utils.helper import Response
+from utils.idempotency import idempotent
+
+blp = Blueprint("Order", __name__, description="Checkout and Orders")
+
+INVALID_ORDER_ID = "Invalid Order ID."
+CART_CHANGED = "The cart was changed by another request, please try again."
+
+@blp.route('/order')
+class OrderController(MethodView):
+    @jwt_required()
+    @blp.arguments(OrderArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainOrderSchema, many=True, paginated=True))
+    def get(self, args):
+        """Return the Orders of logged in User (every Order for an admin)"""
+        try:
+            cur_user = get_jwt()
+            user_id = args.get('user_id') if cur_user['is_admin'] else get_jwt_identity()
+            query = ShopOrder.filter_query(ShopOrder.query_for(PlainOrderSchema), user_id=user_id)
+            orders, next_id = ShopOrder.find_page(after_id=args['after'], limit=args['limit'], query=query)
+            return Response.page(orders, next_id)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+    @jwt_required()
+    @idempotent
+    @blp.arguments(CheckoutSchema)
+    @blp.response(201, responseSchema(OrderSchema))
+    def post(self, data):
+        """Checkout: turn the cart of logged in User into an Order, with the stock it reserved"""
+        try:
+            user = UserModel.find_by_id(id=get_jwt_identity())
+            if data['shipping_address_id'] not in {address.id for address in user.addresses}:
+                return Response.not_found(message="Invalid Shipping Address ID.")
+            payment_method = UserPaymentMethodModel.query.filter_by(id=data['payment_method_id'], user_id=user.id).first()
+            if payment_method is None:
+                return Response.not_found(message="Invalid Payment Method ID.")
+            shipping_method = ShippingMethod.find_by_id(id=data['shipping_method_id'])
+            if shipping_method is None:
+                return Response.not_found(message="Invalid Shipping Method ID.")
+
+            cart = ShoppingCart.find_by_user(user_id=user.id)
+            items = cart.take_items() if cart is not None else []
+            if not items:
+                return Response.bad_request(message="Cart is empty.")
+
+            order = ShopOrder(user_id=user.id, **data)
+            order.add_lines(items, shipping_method.price)
+            order.save_to_db()
+            return Response.created(
+                data=ShopOrder.find_by_id(id=order.id, schema=OrderSchema),
+                message="Order placed successfully.",
+            )
+        except CartChanged:
+            db.session.rollback()
+            return Response.conflict(message=CART_CHANGED)
+        except SQLAlchemyError:
+            db.session.rollback()
+            return Response.server_error()
+
+@blp.route('/order/<int:id>')
+class OrderDetailController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(OrderSchema))
+    def get(self, id):
+        """Return Order detail based on ID"""
+        try:
+            order = find_order(id)
+            if order is None:
+                return Response.not_found(message=INVALID_ORDER_ID)
+            return Response(data=order)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/order/<int:id>/cancel')
+class OrderCancelController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(OrderSchema))
+    def post(self, id):
+        """Cancel a pending Order, its stock goes back on sale"""
+        try:
+            order = find_order(id)
+            if order is None:
+                return Response.not_found(message=INVALID_ORDER_ID)
+            if not order.cancel():
+                return Response.conflict(message=f"Order is {order.order_status}, only pending Orders can be cancelled.")
+            order.save_to_db()
+            return Response(data=order, message="Order cancelled.")
+        except SQLAlchemyError:
+            db.session.rollback()
+            return Response.server_error()
+
+def find_order(id: int):
+    """Order of logged in User (any Order for an admin), None otherwise"""
+    order = ShopOrder.find_by_id(id=id, schema=OrderSchema)
+    if order is None:
+        return None
+    if not get_jwt()['is_admin'] and str(order.user_id) != str(get_jwt_identity()):
+        return None
+    return order
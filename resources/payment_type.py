@@ -2,9 +2,11 @@ from flask.views import MethodView
 from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
+from db import on_commit
 from models import PaymentTypeModel
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.payment_type_schema import PaymentTypeSchema
+from utils.response_cache import response_cache
 
 blp = Blueprint(
     "Payment Types",
@@ -21,6 +23,7 @@ INVALID_PAYMENT_TYPE = "Invalid PaymentType ID"
 
 @blp.route('/payment-type')
 class PaymentType(MethodView):
+    @response_cache.cached("payment_type")
     @blp.response(200, responseSchema(PaymentTypeSchema, many=True))
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Error"})
     def get(sefl):
@@ -50,6 +53,7 @@ class PaymentType(MethodView):
         except IntegrityError:
             abort(400, message=INTEGRITY_ERROR)
         else:
+            on_commit(lambda: response_cache.invalidate("payment_type"))
             res = {
                 "code": 201,
                 "status": "Created",
@@ -60,6 +64,7 @@ class PaymentType(MethodView):
 
 @blp.route('/payment-type/<int:payment_type_id>')
 class PaymentTypeDetail(MethodView):
+    @response_cache.cached("payment_type")
     @blp.response(200, responseSchema(PaymentTypeSchema))
     @blp.alt_response(404, example={"code": 404, "message": INVALID_PAYMENT_TYPE, "status": "Not Found"})
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Error"})
@@ -89,6 +94,7 @@ class PaymentTypeDetail(MethodView):
         except SQLAlchemyError:
             abort(500, message=DELETE_ERROR)
         else:
+            on_commit(lambda: response_cache.invalidate("payment_type"))
             res = {
                 "code": 200,
                 "status": "OK",
@@ -0,0 +1,254 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import get_jwt, jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from db import db
+
+from schemas.response_schema import responseSchema, BaseResponseSchema
+from schemas.product_schema import (
+    ProductSchema,
+    ProductListSchema,
+    ProductItemSchema,
+    ProductFilterArgsSchema,
+    ProductItemFilterArgsSchema,
+    ProductItemStockSchema,
+)
+
+from models import Product, ProductItem, VariationLine
+
+from utils.helper import Response
+from utils.category_tree import category_tree
+
+blp = Blueprint("Product", __name__, description="Operations on Products and Product Items")
+
+PRODUCT_ITEM_IN_USE = "Product Item is still in shopping carts or orders."
+
+class InvalidFilter(Exception):
+    pass
+
+def parse_filters(args: dict) -> dict:
+    """
+    Turn the query string filters into ids.
+    Return None when a filter can't match anything (unknown variation value).
+    """
+    filters = {}
+    if 'category_id' in args:
+        category_id = args['category_id']
+        if not category_tree.exists(category_id):
+            raise InvalidFilter("Invalid Product Category ID.")
+        filters['category_ids'] = (category_id,)
+        if args['recursive']:
+            filters['category_ids'] += category_tree.descendant_ids(category_id)
+
+    if args['variation']:
+        pairs = [tuple(value.split(":", 1)) for value in args['variation']]
+        groups = VariationLine.ids_by_variation(pairs)
+        if not all(groups.values()):
+            return None
+        filters['variation_groups'] = list(groups.values())
+    return filters
+
+@blp.route('/product')
+class ProductController(MethodView):
+    @jwt_required()
+    @blp.arguments(ProductFilterArgsSchema, location="query")
+    @blp.response(200, responseSchema(ProductListSchema, many=True, paginated=True))
+    def get(self, args):
+        """
+        Return List of Products with the price and SKU of their items.
+        Filter by category (sub categories included) and by variation values,
+        e.g: ?category_id=1&variation=Size:M&variation=Color:Red
+        """
+        try:
+            filters = parse_filters(args)
+            if filters is None:
+                return Response.page([])
+            query = Product.filter_query(Product.query_for(ProductListSchema), **filters)
+            products, next_id = Product.find_page(after_id=args['after'], limit=args['limit'], query=query)
+            return Response.page(products, next_id)
+        except InvalidFilter as error:
+            return Response.not_found(message=str(error))
+        except SQLAlchemyError:
+            return Response.server_error()
+
+    @jwt_required()
+    @blp.arguments(ProductSchema)
+    @blp.response(201, responseSchema(ProductSchema))
+    def post(self, data):
+        """Add new Product to a Product Category"""
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            if not category_tree.exists(data['category_id']):
+                return Response.not_found(message="Invalid Product Category ID.")
+
+            product = Product(**data)
+            product.save_to_db()
+            return Response.created(
+                data=product,
+                message="Successfully added Product.",
+            )
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product/<int:id>')
+class ProductDetailController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(ProductSchema))
+    def get(self, id):
+        """Return Product detail with its items, their variations and images"""
+        try:
+            product = Product.find_by_id(id=id, schema=ProductSchema)
+            if not product:
+                return Response.not_found(message="Invalid Product ID.")
+            return Response(data=product)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+    @jwt_required()
+    @blp.response(200, BaseResponseSchema)
+    def delete(self, id):
+        """Delete Product based on ID"""
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            product = Product.find_by_id(id=id)
+            if not product:
+                return Response.not_found(message="Invalid Product ID.")
+            if product.product_items:
+                return Response.bad_request(message="Product still has items.")
+
+            product.delete_from_db()
+            return Response(message="Successfully deleted Product.")
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product_item')
+class ProductItemController(MethodView):
+    @jwt_required()
+    @blp.arguments(ProductItemFilterArgsSchema, location="query")
+    @blp.response(200, responseSchema(ProductItemSchema, many=True, paginated=True))
+    def get(self, args):
+        """
+        Return List of Product Items with their variations and images.
+        Filter by product, category (sub categories included) and variation values,
+        e.g: ?product_id=1&variation=Size:M&variation=Color:Red
+        """
+        try:
+            filters = parse_filters(args)
+            if filters is None:
+                return Response.page([])
+            query = ProductItem.filter_query(
+                ProductItem.query_for(ProductItemSchema),
+                product_id=args.get('product_id'),
+                **filters,
+            )
+            items, next_id = ProductItem.find_page(after_id=args['after'], limit=args['limit'], query=query)
+            return Response.page(items, next_id)
+        except InvalidFilter as error:
+            return Response.not_found(message=str(error))
+        except SQLAlchemyError:
+            return Response.server_error()
+
+    @jwt_required()
+    @blp.arguments(ProductItemSchema)
+    @blp.response(201, responseSchema(ProductItemSchema))
+    def post(self, data):
+        """Add new Product Item (SKU) to a Product, with its variation values"""
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            if not Product.find_by_id(id=data['product_id']):
+                return Response.not_found(message="Invalid Product ID.")
+
+            line_ids = set(data.pop('variation_line_ids'))
+            variation_lines = VariationLine.query.filter(VariationLine.id.in_(line_ids)).all() if line_ids else []
+            if len(variation_lines) != len(line_ids):
+                return Response.not_found(message="Invalid Variation Line ID.")
+
+            product_item = ProductItem(**data)
+            product_item.variation_lines = variation_lines
+            product_item.save_to_db()
+            return Response.created(
+                data=product_item,
+                message="Successfully added Product Item.",
+            )
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product_item/<int:id>')
+class ProductItemDetailController(MethodView):
+    @jwt_required()
+    @blp.response(200, responseSchema(ProductItemSchema))
+    def get(self, id):
+        """Return Product Item detail based on ID"""
+        try:
+            product_item = ProductItem.find_by_id(id=id, schema=ProductItemSchema)
+            if not product_item:
+                return Response.not_found(message="Invalid Product Item ID.")
+            return Response(data=product_item)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+    @jwt_required()
+    @blp.response(200, BaseResponseSchema)
+    def delete(self, id):
+        """Delete Product Item based on ID"""
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            product_item = ProductItem.find_by_id(id=id)
+            if not product_item:
+                return Response.not_found(message="Invalid Product Item ID.")
+
+            # its images go with it, cart items and order lines must not be left dangling
+            if product_item.is_referenced():
+                return Response.conflict(message=PRODUCT_ITEM_IN_USE)
+
+            product_item.delete_from_db()
+            return Response(message="Successfully deleted Product Item.")
+        except IntegrityError:
+            # added to a cart or an order meanwhile
+            return Response.conflict(message=PRODUCT_ITEM_IN_USE)
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product_item/<int:id>/stock')
+class ProductItemStockController(MethodView):
+    @jwt_required()
+    @blp.arguments(ProductItemStockSchema)
+    @blp.response(200, responseSchema(ProductItemSchema))
+    def post(self, data, id):
+        """Add units to the stock of a Product Item (negative to take them out)"""
+        try:
+            # Check admin's privillege
+            cur_user = get_jwt()
+            if not cur_user['is_admin']:
+                return Response.access_denied()
+
+            if not ProductItem.find_by_id(id=id):
+                return Response.not_found(message="Invalid Product Item ID.")
+            # relative change in one statement, doesn't overwrite concurrent sales
+            if ProductItem.restock(id, data['change']) is None:
+                return Response.bad_request(message="Not enough stock to take out.")
+            db.session.commit()
+            return Response(
+                data=ProductItem.find_by_id(id=id, schema=ProductItemSchema),
+                message="Successfully updated stock.",
+            )
+        except SQLAlchemyError:
+            return Response.server_error()
@@ -5,23 +5,35 @@ from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 from schemas.response_schema import responseSchema, BaseResponseSchema
-from schemas.product_category_schema import ProductCategorySchema, PlainProductCategorySchema
+from schemas.product_category_schema import (
+    ProductCategorySchema,
+    PlainProductCategorySchema,
+    FacetSchema,
+    FacetArgsSchema,
+)
+from schemas.pagination_schema import PaginationArgsSchema
 
+from db import on_commit
 from models.product_category import ProductCategory as Category
+from models.variation_facet import VariationFacet
 
 from utils.helper import Response
+from utils.category_tree import category_tree
+from utils.response_cache import response_cache
 
 blp = Blueprint("Product Category", __name__, description="Operations on Product Category")
 
 @blp.route('/product_category')
 class ProductCategory(MethodView):
     @jwt_required()
-    @blp.response(200, responseSchema(PlainProductCategorySchema, many=True))
-    def get(self):
+    @response_cache.cached("product_category")
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainProductCategorySchema, many=True, paginated=True))
+    def get(self, args):
         """Return List of available Product Categories"""
         try:
-            product_categories = Category.find_all()
-            return Response(data=product_categories)
+            product_categories, next_id = Category.find_page_rows(PlainProductCategorySchema, after_id=args['after'], limit=args['limit'])
+            return Response.page(product_categories, next_id)
         except SQLAlchemyError:
             return Response.server_error()
 
@@ -45,6 +57,8 @@ class ProductCategory(MethodView):
 
             product_category = Category(**data)
             product_category.save_to_db()
+            on_commit(category_tree.invalidate)
+            on_commit(lambda: response_cache.invalidate("product_category"))
             return Response.created(
                 data=product_category,
                 message="Successfully added Product Category.",
@@ -57,11 +71,12 @@ class ProductCategory(MethodView):
 @blp.route('/product_category/<int:id>')
 class ProductCategoryDetail(MethodView):
     @jwt_required()
+    @response_cache.cached("product_category")
     @blp.response(200, responseSchema(ProductCategorySchema))
     def get(self, id):
         """Return Information of the Product Category based on ID"""
         try:
-            product_category = Category.find_by_id(id=id)
+            product_category = Category.find_by_id(id=id, schema=ProductCategorySchema)
             if not product_category:
                 return Response.not_found(message="Invalid Product Category ID.")
             return Response(data=product_category)
@@ -80,9 +95,62 @@ class ProductCategoryDetail(MethodView):
             if not product_category:
                 return Response.not_found("Invalid Product Category ID")
             product_category.delete_from_db()
+            on_commit(category_tree.invalidate)
+            on_commit(lambda: response_cache.invalidate("product_category"))
             return Response(
                 data=product_category,
                 message="Successfully deleted Product Category."
             )
         except SQLAlchemyError:
-            return Response.server_error()
\ No newline at end of file
+            return Response.server_error()
+
+@blp.route('/product_category/<int:id>/descendants')
+class ProductCategoryDescendants(MethodView):
+    @jwt_required()
+    @response_cache.cached("product_category")
+    @blp.response(200, responseSchema(PlainProductCategorySchema, many=True))
+    def get(self, id):
+        """Return every Product Category below the category based on ID"""
+        try:
+            if not category_tree.exists(id):
+                return Response.not_found(message="Invalid Product Category ID.")
+            return Response(data=category_tree.descendants(id))
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product_category/<int:id>/breadcrumb')
+class ProductCategoryBreadcrumb(MethodView):
+    @jwt_required()
+    @response_cache.cached("product_category")
+    @blp.response(200, responseSchema(PlainProductCategorySchema, many=True))
+    def get(self, id):
+        """Return Product Categories from the root down to the category based on ID"""
+        try:
+            if not category_tree.exists(id):
+                return Response.not_found(message="Invalid Product Category ID.")
+            return Response(data=category_tree.breadcrumb(id))
+        except SQLAlchemyError:
+            return Response.server_error()
+
+@blp.route('/product_category/<int:id>/facets')
+class ProductCategoryFacets(MethodView):
+    @jwt_required()
+    @blp.arguments(FacetArgsSchema, location="query")
+    @blp.response(200, responseSchema(FacetSchema, many=True))
+    def get(self, args, id):
+        """
+        Return the number of product items per variation value in the category,
+        e.g: Color: Red (120), Blue (87)
+        """
+        try:
+            if not category_tree.exists(id):
+                return Response.not_found(message="Invalid Product Category ID.")
+            category_ids = (id,) + (category_tree.descendant_ids(id) if args['recursive'] else ())
+
+            facets = {}
+            for variation_id, variation, line_id, line, count in VariationFacet.find_by_categories(category_ids):
+                facet = facets.setdefault(variation_id, {"variation_id": variation_id, "name": variation, "values": []})
+                facet["values"].append({"variation_line_id": line_id, "name": line, "count": count})
+            return Response(data=list(facets.values()))
+        except SQLAlchemyError:
+            return Response.server_error()
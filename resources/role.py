@@ -4,10 +4,13 @@ from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
+from db import on_commit
 from models import RoleModel
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.role_schema import RoleSchema
 from utils.helper import Response
+from utils.claims_cache import claims_cache
+from utils.response_cache import response_cache
 
 blp = Blueprint("Roles", __name__, description="Operations on Role.")
 
@@ -24,6 +27,7 @@ DELETE_SUCCESS = "Role has been deleted successfully."
 @blp.route('/role')
 class RoleOperation(MethodView):
     @jwt_required()
+    @response_cache.cached("role")
     @blp.response(200, responseSchema(RoleSchema, many=True))
     def get(self):
         """Return List of Roles existed in database"""
@@ -49,6 +53,7 @@ class RoleOperation(MethodView):
                 return Response.bad_request(message="Role name cannot be empty!")
             role = RoleModel(**role_data)
             role.save_to_db()
+            on_commit(lambda: response_cache.invalidate("role"))
             return Response(
                 code=201,
                 status="Created",
@@ -67,6 +72,7 @@ class RoleOperation(MethodView):
 @blp.route("/role/<int:role_id>")
 class RoleUpdate(MethodView):
     @jwt_required()
+    @response_cache.cached("role")
     @blp.response(200, responseSchema(RoleSchema))
     @blp.alt_response(404, example={"code": 404, "message": ROLE_NOT_FOUND, "status": "Not Found"})
     @blp.alt_response(500, example={"code": 500, "message": SELECT_ERROR, "status": "Internal Server Error"})
@@ -102,6 +108,9 @@ class RoleUpdate(MethodView):
                 )
             else:
                 role.delete_from_db()
+                # Cached claims are derived from role names
+                on_commit(claims_cache.clear)
+                on_commit(lambda: response_cache.invalidate("role"))
             return Response(data=role, message=DELETE_SUCCESS)
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
@@ -0,0 +1,56 @@
+from flask.views import MethodView
+from flask_smorest import Blueprint
+from flask_jwt_extended import jwt_required
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from schemas.response_schema import responseSchema
+from schemas.product_schema import ProductListSchema
+from schemas.search_schema import SearchArgsSchema, SearchResultSchema
+
+from models import Product
+
+from utils.helper import Response
+from utils.category_tree import category_tree
+from utils.search import search_index
+
+blp = Blueprint("Search", __name__, description="Product search")
+
+@blp.route('/search')
+class SearchController(MethodView):
+    @jwt_required()
+    @blp.arguments(SearchArgsSchema, location="query")
+    @blp.response(200, responseSchema(SearchResultSchema))
+    def get(self, args):
+        """
+        Search products by name, description and SKU, best matches first.
+        Returns the number of matches per category as facets.
+        """
+        try:
+            category_ids = None
+            if 'category_id' in args:
+                if not category_tree.exists(args['category_id']):
+                    return Response.not_found(message="Invalid Product Category ID.")
+                category_ids = (args['category_id'],) + category_tree.descendant_ids(args['category_id'])
+
+            ids, total, facets = search_index.search(
+                args['q'],
+                category_ids=category_ids,
+                limit=args['limit'],
+                offset=args['offset'],
+            )
+            products = {}
+            if ids:
+                query = Product.query_for(ProductListSchema).filter(Product.id.in_(ids))
+                products = {product.id: product for product in query}
+
+            return Response(data={
+                "total": total,
+                "products": [products[id] for id in ids if id in products],  # keep the ranking
+                "facets": [
+                    {"category_id": category_id, "name": (category_tree.get(category_id) or {}).get("name"), "count": count}
+                    for category_id, count in sorted(facets.items(), key=lambda facet: -facet[1])
+                ],
+            })
+        except SQLAlchemyError:
+            return Response.server_error()
@@ -12,14 +12,22 @@ from flask_jwt_extended import (
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.token_schema import AccessTokenSchema, RefreshTokenSchema
 from schemas.user_schema import *
+from schemas.pagination_schema import StreamingArgsSchema
 
+from db import on_commit
 from models import UserModel, AddressModel, UserPaymentMethodModel, RoleModel
 from utils.helper import Response
+from utils.claims_cache import claims_cache
+from utils.token_blocklist import token_blocklist
+from utils.streaming import stream_json
+from utils.security import PasswordHasherBusy
+from utils.idempotency import idempotent
 
 INTEGRITY_ERROR = "Email Address is already in used."
 USER_ADDRESS_INTEGRITY = "User is already linked to the corresponding address."
 
 INVALID_CREDENTIAL = "Invalid Credential"
+PASSWORD_HASHER_BUSY = "Too many login attempts in progress. Please try again."
 
 INSERT_ERROR = "An error occurred while creating user."
 UPDATE_ERROR = "An error occurred while updating user."
@@ -40,15 +48,21 @@ blp = Blueprint("Users", __name__, description="Operations on Users.")
 @blp.route('/user')
 class UserOperation(MethodView):
     @jwt_required()
-    @blp.response(200, responseSchema(PlainUserSchema, many=True))
-    def get(self):
+    @blp.arguments(StreamingArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainUserSchema, many=True, paginated=True))
+    def get(self, args):
         """Get List of registerd User from database"""
         try:
             cur_user = get_jwt()
             if not cur_user['is_admin']:
                 return Response.access_denied()
-            users = UserModel.find_all()
-            return Response(data=users)
+            if args['stream']:
+                query = UserModel.query.order_by(UserModel.id)
+                if args['after'] is not None:
+                    query = query.filter(UserModel.id > args['after'])
+                return stream_json(query, PlainUserSchema)
+            users, next_id = UserModel.find_page_rows(PlainUserSchema, after_id=args['after'], limit=args['limit'])
+            return Response.page(users, next_id)
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
 
@@ -112,13 +126,14 @@ class UserDetail(MethodView):
         """Get Information of logged in user."""
         try:
             user_id = get_jwt_identity()
-            user = UserModel.find_by_id(id=user_id)
+            user = UserModel.find_by_id(id=user_id, schema=UserSchema)
             return Response(data=user)
         except SQLAlchemyError:
             return Response.server_error()
 
 @blp.route('/user/register')
 class UserRegister(MethodView):
+    @idempotent
     @blp.arguments(UserSchema)
     @blp.response(201, responseSchema(PlainUserSchema))
     def post(self, user_data):
@@ -151,7 +166,7 @@ class UserUpdate(MethodView):
             cur_user = get_jwt()
             if not cur_user['is_admin']:
                 return Response.access_denied()
-            user = UserModel.find_by_id(id=user_id)
+            user = UserModel.find_by_id(id=user_id, schema=UserSchema)
             if not user:
                 return Response.not_found(message="Invalid User ID")
             else:
@@ -162,7 +177,7 @@ class UserUpdate(MethodView):
     @jwt_required()
     @blp.arguments(UpdateUserSchema)
     @blp.response(200, responseSchema(PlainUserSchema))
-    def put(self, user_id, user_data):
+    def put(self, user_data, user_id):
         """Update User Information Based on UserID"""
         try:
             cur_user = get_jwt()
@@ -174,10 +189,11 @@ class UserUpdate(MethodView):
             user.first_name = user_data['first_name']
             user.last_name = user_data['last_name']
             user.phone_number = user_data['phone_number']
-            user.password = user_data['password']
+            user.set_password(user_data['password'])
             user.role_id = user_data['role_id']
             user.status = user_data['status']
             user.save_to_db()
+            on_commit(lambda: claims_cache.invalidate(user_id))
             return Response(
                 data=user,
                 message="Successfully Updated User Information."
@@ -199,6 +215,7 @@ class UserUpdate(MethodView):
             if user.role.name.lower() == "administrator":
                 return Response.bad_request(message="Cannot delete user with role as 'Administrator'")
             user.delete_from_db()
+            on_commit(lambda: claims_cache.invalidate(user_id))
             return Response(data=user, message=DELETE_COMPLETE.format(user=user.email_address))
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
@@ -225,6 +242,7 @@ class UserUpdateRole(MethodView):
             
             user.role_id = role_id
             user.save_to_db()
+            on_commit(lambda: claims_cache.invalidate(user_id))
             return Response(message=f"User {user.email_address} has been assigned as {role.name}.")
         except SQLAlchemyError:
             return Response.server_error()
@@ -246,15 +264,17 @@ class UserUpdatePassword(MethodView):
             user = UserModel.find_by_id(id=user_id)
             if not user:
                 return Response.not_found(message=INVALID_USER_ID)
-            if user.password != user_data['old_password']:
+            if not user.check_password(user_data['old_password']):
                 abort(400, message=INVALID_CREDENTIAL)
             else:
-                user.password = user_data['new_password']
+                user.set_password(user_data['new_password'])
                 try:
                     user.save_to_db()
                     return Response(message=PASSWORD_UPDATE_COMPLETE.format(user=user.email_address)).without_data()
                 except SQLAlchemyError as error:
                     return Response.server_error(message=error)
+        except PasswordHasherBusy:
+            return Response.service_unavailable(message=PASSWORD_HASHER_BUSY)
         except Exception as error:
             return Response.server_error(message=error)
 
@@ -268,7 +288,7 @@ class UserPaymentMethod(MethodView):
             cur_user = get_jwt()
             if not cur_user['is_admin']:
                 return Response.access_denied()
-            payment_methods = UserPaymentMethodModel.find_all(user_id=user_id)
+            payment_methods = UserPaymentMethodModel.find_all(user_id=user_id, schema=UserPaymentMethodSchema)
             return Response(data=payment_methods)
         except SQLAlchemyError as error:
             return Response.server_error(message=str(error))
@@ -340,7 +360,7 @@ class UserResetPassword(MethodView):
         if user is None:
             abort(404, message=USER_NOT_EXIST.format(email=user_data['email']))
         else:
-            user.password = user_data['new_password']
+            user.set_password(user_data['new_password'])
             try:
                 user.save_to_db()
             except SQLAlchemyError:
@@ -364,7 +384,7 @@ class UserLogin(MethodView):
                     message=INVALID_USER,
                 )
             else:
-                if user.password != login_data['password']:
+                if not user.check_password(login_data['password']):
                     return Response(
                         code=401,
                         status="Unauthorized",
@@ -378,14 +398,22 @@ class UserLogin(MethodView):
                         "refresh_token": refresh_token
                     }
                     return Response(data=res, message="Logged in successful.")
+        except PasswordHasherBusy:
+            return Response.service_unavailable(message=PASSWORD_HASHER_BUSY)
         except SQLAlchemyError as e:
             return Response.server_error(message=str(e))
 
 @blp.route('/logout')
 class UserLogout(MethodView):
-    @blp.response(200, responseSchema(UserSchema))
+    @jwt_required(verify_type=False)
+    @blp.response(200, BaseResponseSchema)
     def post(self):
-        return Response.unimplemented()
+        """Revoke the token sent (access or refresh token), send both to log out everywhere"""
+        try:
+            token_blocklist.revoke(get_jwt())
+            return Response(message="Logged out successfully.")
+        except SQLAlchemyError as error:
+            return Response.server_error(message=str(error))
 
 @blp.route('/refresh')
 class UserRefreshToken(MethodView):
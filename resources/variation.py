@@ -4,6 +4,8 @@ from flask_jwt_extended import get_jwt, jwt_required
 
 from sqlalchemy.exc import SQLAlchemyError
 
+from db import on_commit
+
 from schemas.response_schema import responseSchema, BaseResponseSchema
 from schemas.variation_schema import (
     PlainVariationSchema,
@@ -12,26 +14,33 @@ from schemas.variation_schema import (
     VariationLineSchema
 )
 
+from schemas.pagination_schema import PaginationArgsSchema
+
 from models.variation import Variation
 from models.variation_line import VariationLine
 
 from utils.helper import Response
+from utils.response_cache import response_cache
+from utils.idempotency import idempotent
 
 blp = Blueprint("Product Variations", __name__, description="Operations on Product Variations")
 
 @blp.route('/variation')
 class ProductVariationController(MethodView):
     @jwt_required()
-    @blp.response(200, responseSchema(PlainVariationSchema, many=True))
-    def get(self):
+    @response_cache.cached("variation")
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainVariationSchema, many=True, paginated=True))
+    def get(self, args):
         """Return List of available Product Variations"""
         try:
-            variations = Variation.find_all()
-            return Response(data=variations)
+            variations, next_id = Variation.find_page_rows(PlainVariationSchema, after_id=args['after'], limit=args['limit'])
+            return Response.page(variations, next_id)
         except SQLAlchemyError:
             return Response.server_error()
     
     @jwt_required()
+    @idempotent
     @blp.arguments(VariationSchema)
     @blp.response(201, responseSchema(VariationSchema))
     def post(self, data):
@@ -43,6 +52,7 @@ class ProductVariationController(MethodView):
                 return Response.access_denied()
             variation = Variation(**data)
             variation.save_to_db()
+            on_commit(lambda: response_cache.invalidate("variation"))
             return Response.created(
                 data=variation,
                 message="Successfully added Product Variation.",
@@ -53,11 +63,12 @@ class ProductVariationController(MethodView):
 @blp.route('/variation/<int:id>')
 class ProductVairationDetailController(MethodView):
     @jwt_required()
+    @response_cache.cached("variation")
     @blp.response(200, responseSchema(VariationSchema))
     def get(self, id):
         """Return Product Variation detail based on ID"""
         try:
-            variation = Variation.find_by_id(id=id)
+            variation = Variation.find_by_id(id=id, schema=VariationSchema)
             if not variation:
                 return Response.not_found()
             return Response(data=variation)
@@ -79,6 +90,7 @@ class ProductVairationDetailController(MethodView):
                 return Response.not_found()
             
             variation.delete_from_db()
+            on_commit(lambda: response_cache.invalidate("variation"))
             return Response(message="Successfully deleted Product Variation.")
         except SQLAlchemyError:
             return Response.server_error()
@@ -86,16 +98,19 @@ class ProductVairationDetailController(MethodView):
 @blp.route('/variation_line')
 class ProductVariationLineController(MethodView):
     @jwt_required()
-    @blp.response(200, responseSchema(PlainVariationLineSchema, many=True))
-    def get(self):
+    @response_cache.cached("variation")
+    @blp.arguments(PaginationArgsSchema, location="query")
+    @blp.response(200, responseSchema(PlainVariationLineSchema, many=True, paginated=True))
+    def get(self, args):
         """Return List of Available Variation Lines"""
         try:
-            variation_lines = VariationLine.find_all()
-            return Response(data=variation_lines)
+            variation_lines, next_id = VariationLine.find_page_rows(PlainVariationLineSchema, after_id=args['after'], limit=args['limit'])
+            return Response.page(variation_lines, next_id)
         except SQLAlchemyError:
             return Response.server_error()
     
     @jwt_required()
+    @idempotent
     @blp.arguments(VariationLineSchema)
     @blp.response(201, responseSchema(VariationLineSchema))
     def post(self, data):
@@ -113,6 +128,7 @@ class ProductVariationLineController(MethodView):
             
             variation_line = VariationLine(**data)
             variation_line.save_to_db()
+            on_commit(lambda: response_cache.invalidate("variation"))
             return Response.created(
                 data=variation_line,
                 message="Successfully added Variation Line",
@@ -123,11 +139,12 @@ class ProductVariationLineController(MethodView):
 @blp.route('/variation_line/<int:id>')
 class ProductVariationLineDetailController(MethodView):
     @jwt_required()
+    @response_cache.cached("variation")
     @blp.response(200, responseSchema(VariationLineSchema))
     def get(self, id):
         """Get Variation Line detail based on ID"""
         try:
-            variation_line = VariationLine.find_by_id(id=id)
+            variation_line = VariationLine.find_by_id(id=id, schema=VariationLineSchema)
             if not variation_line:
                 return Response.not_found(message="Invalid Variation Line ID")
             return Response(variation_line)
@@ -149,6 +166,7 @@ class ProductVariationLineDetailController(MethodView):
                 return Response.not_found(message="Invalid Variation Line ID")
             
             variation_line.delete_from_db()
+            on_commit(lambda: response_cache.invalidate("variation"))
             return Response(
                 data=variation_line,
                 message="Successfully deleted Variation Line."
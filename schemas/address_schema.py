@@ -9,5 +9,7 @@ class PlainAddressSchema(Schema):
     postal_code = fields.Str(required=True, allow_none=True)
 
 class AddressSchema(PlainAddressSchema):
+    eager_loads = (("country", "joined"),)
+
     country_id = fields.Int(required=True, allow_none=False, load_only=True)
     country = fields.Nested(CountrySchema(), dump_only=True)
@@ -0,0 +1,26 @@
+from marshmallow import Schema, fields, validate
+
+from .product_schema import PlainProductItemSchema
+
+import config
+
+class CartItemSchema(Schema):
+    id = fields.Int(dump_only=True)
+    product_item_id = fields.Int(required=True, allow_none=False)
+    qty = fields.Int(required=True, validate=validate.Range(min=1, max=config.CART_MAX_ITEM_QTY))
+    product_item = fields.Nested(PlainProductItemSchema(), dump_only=True)
+
+class CartItemQtySchema(Schema):
+    # 0 removes the item from the cart
+    qty = fields.Int(required=True, validate=validate.Range(min=0, max=config.CART_MAX_ITEM_QTY))
+
+class CartSchema(Schema):
+    eager_loads = (
+        ("items", "selectin"),
+        ("items.product_item", "joined"),
+    )
+
+    id = fields.Int(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+    items = fields.Nested(CartItemSchema(many=True), dump_only=True)
+    total = fields.Float(dump_only=True)
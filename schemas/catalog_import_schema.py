@@ -0,0 +1,50 @@
+from marshmallow import Schema, fields, validate, EXCLUDE
+
+IMPORT_KINDS = ("variation", "variation_line", "product", "product_item", "product_variation")
+IMPORT_FORMATS = ("jsonl", "csv")
+
+class ImportRowSchema(Schema):
+    # rows come from supplier files, ignore the columns we don't know
+    class Meta:
+        unknown = EXCLUDE
+
+class VariationImportSchema(ImportRowSchema):
+    category = fields.Str(required=True, allow_none=False)
+    name = fields.Str(required=True, allow_none=False, validate=validate.Length(max=80))
+
+class VariationLineImportSchema(ImportRowSchema):
+    category = fields.Str(required=True, allow_none=False)
+    variation = fields.Str(required=True, allow_none=False)
+    name = fields.Str(required=True, allow_none=False, validate=validate.Length(max=80))
+
+class ProductImportSchema(ImportRowSchema):
+    category = fields.Str(required=True, allow_none=False)
+    name = fields.Str(required=True, allow_none=False, validate=validate.Length(max=80))
+    description = fields.Str(allow_none=True, validate=validate.Length(max=255))
+
+class ProductItemImportSchema(ImportRowSchema):
+    category = fields.Str(required=True, allow_none=False)
+    product = fields.Str(required=True, allow_none=False)
+    sku = fields.Str(required=True, allow_none=False, validate=validate.Length(max=20))
+    price = fields.Float(required=True, allow_none=False, validate=validate.Range(min=0))
+    qty_in_stock = fields.Int(load_default=0, validate=validate.Range(min=0))
+
+class ProductVariationImportSchema(ImportRowSchema):
+    sku = fields.Str(required=True, allow_none=False)
+    variation = fields.Str(required=True, allow_none=False)
+    value = fields.Str(required=True, allow_none=False)
+
+class ImportArgsSchema(Schema):
+    # defaults to the Content-Type of the upload (text/csv or anything else for JSON lines)
+    format = fields.Str(load_default=None, validate=validate.OneOf(IMPORT_FORMATS))
+
+class ImportRowErrorSchema(Schema):
+    row = fields.Int(dump_only=True)
+    errors = fields.Raw(dump_only=True)
+
+class ImportResultSchema(Schema):
+    kind = fields.Str(dump_only=True)
+    total = fields.Int(dump_only=True)
+    inserted = fields.Int(dump_only=True)
+    failed = fields.Int(dump_only=True)
+    errors = fields.Nested(ImportRowErrorSchema(many=True), dump_only=True)
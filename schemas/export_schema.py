@@ -0,0 +1,7 @@
+from marshmallow import Schema, fields, validate
+
+from utils.export import EXPORT_FORMATS
+
+class ExportArgsSchema(Schema):
+    format = fields.Str(load_default="csv", validate=validate.OneOf(EXPORT_FORMATS))
+    gzip = fields.Bool(load_default=True)
@@ -1,6 +1,8 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 from werkzeug.datastructures import FileStorage
 
+from config import IMAGE_DERIVATIVES, IMAGE_COMPACT_FORMAT, IMAGE_URL_BATCH_SIZE
+
 class FileStorageField(fields.Field):
     default_error_messages = {
         "invalid": "Not a valid image."
@@ -17,4 +19,26 @@ class FileStorageField(fields.Field):
 
 class ImageUploadSchema(Schema):
     image = FileStorageField(required=True, load_only=True)
-    image_url = fields.Str(dump_only=True)
\ No newline at end of file
+    product_item_id = fields.Int(load_only=True)
+    image_url = fields.Str(dump_only=True)
+
+class ImageUploadResultSchema(Schema):
+    name = fields.Str(dump_only=True)
+    job_id = fields.Int(allow_none=True, dump_only=True)  # job generating the resized variants
+
+class ImageVariantArgsSchema(Schema):
+    variant = fields.Str(validate=validate.OneOf(list(IMAGE_DERIVATIVES)))
+    format = fields.Str(validate=validate.OneOf([IMAGE_COMPACT_FORMAT]))
+    # signed URLs, see config.IMAGE_URL_SIGNING
+    expires = fields.Int()
+    signature = fields.Str()
+
+class ImageUrlBatchSchema(Schema):
+    filenames = fields.List(
+        fields.Str(),
+        required=True,
+        load_only=True,
+        validate=validate.Length(min=1, max=IMAGE_URL_BATCH_SIZE),
+    )
+    # filename -> url, null for illegal filenames
+    image_urls = fields.Dict(keys=fields.Str(), values=fields.Str(allow_none=True), dump_only=True)
\ No newline at end of file
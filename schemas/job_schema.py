@@ -0,0 +1,24 @@
+from marshmallow import Schema, fields, validate
+
+from .pagination_schema import PaginationArgsSchema
+
+from models.job import JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+class JobSchema(Schema):
+    id = fields.Int(dump_only=True)
+    name = fields.Str(dump_only=True)
+    status = fields.Str(dump_only=True)
+    attempts = fields.Int(dump_only=True)
+    max_attempts = fields.Int(dump_only=True)
+    run_at = fields.DateTime(dump_only=True)  # next attempt when queued
+    last_error = fields.Str(allow_none=True, dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    finished_at = fields.DateTime(allow_none=True, dump_only=True)
+
+class JobDetailSchema(JobSchema):
+    payload = fields.Raw(dump_only=True)
+    locked_by = fields.Str(allow_none=True, dump_only=True)
+
+class JobArgsSchema(PaginationArgsSchema):
+    status = fields.Str(validate=validate.OneOf([JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED]))
+    name = fields.Str()
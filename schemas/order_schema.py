@@ -0,0 +1,37 @@
+from marshmallow import Schema, fields
+
+from .pagination_schema import PaginationArgsSchema
+from .product_schema import PlainProductItemSchema
+
+class OrderLineSchema(Schema):
+    id = fields.Int(dump_only=True)
+    product_item_id = fields.Int(dump_only=True)
+    qty = fields.Int(dump_only=True)
+    price = fields.Float(dump_only=True)
+    product_item = fields.Nested(PlainProductItemSchema(only=("id", "sku")), dump_only=True)
+
+class PlainOrderSchema(Schema):
+    id = fields.Int(dump_only=True)
+    order_date = fields.DateTime(dump_only=True)
+    order_total = fields.Float(dump_only=True)
+    order_status = fields.Str(dump_only=True)
+
+class OrderSchema(PlainOrderSchema):
+    eager_loads = (
+        ("lines", "selectin"),
+        ("lines.product_item", "joined"),
+    )
+
+    payment_method_id = fields.Int(dump_only=True)
+    shipping_address_id = fields.Int(dump_only=True)
+    shipping_method_id = fields.Int(dump_only=True)
+    lines = fields.Nested(OrderLineSchema(many=True), dump_only=True)
+
+class CheckoutSchema(Schema):
+    payment_method_id = fields.Int(required=True, allow_none=False)
+    shipping_address_id = fields.Int(required=True, allow_none=False)
+    shipping_method_id = fields.Int(required=True, allow_none=False)
+
+class OrderArgsSchema(PaginationArgsSchema):
+    # admins see every order, or the ones of one user
+    user_id = fields.Int()
@@ -0,0 +1,28 @@
+from marshmallow import Schema, fields, validate
+
+from utils.pagination import decode_cursor
+import config
+
+class CursorField(fields.Field):
+    default_error_messages = {
+        "invalid": "Not a valid cursor."
+    }
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if value is None or value == "":
+            return None
+        try:
+            return decode_cursor(value)
+        except ValueError:
+            raise self.make_error("invalid")
+
+class PaginationArgsSchema(Schema):
+    after = CursorField(load_default=None)
+    limit = fields.Int(
+        load_default=config.DEFAULT_PAGE_SIZE,
+        validate=validate.Range(min=1, max=config.MAX_PAGE_SIZE),
+    )
+
+class StreamingArgsSchema(PaginationArgsSchema):
+    # stream every row after the cursor instead of returning one page
+    stream = fields.Bool(load_default=False)
@@ -5,5 +5,21 @@ class PlainProductCategorySchema(Schema):
     parent_category_id = fields.Int(load_only=True)
     name = fields.Str(required=True, allow_none=False)
 
+class FacetValueSchema(Schema):
+    variation_line_id = fields.Int(dump_only=True)
+    name = fields.Str(dump_only=True)
+    count = fields.Int(dump_only=True)
+
+class FacetSchema(Schema):
+    variation_id = fields.Int(dump_only=True)
+    name = fields.Str(dump_only=True)
+    values = fields.Nested(FacetValueSchema(many=True), dump_only=True)
+
+class FacetArgsSchema(Schema):
+    # include the product items of the sub categories
+    recursive = fields.Bool(load_default=True)
+
 class ProductCategorySchema(PlainProductCategorySchema):
+    eager_loads = (("sub_categories", "selectin"),)
+
     sub_categories = fields.Nested(PlainProductCategorySchema(many=True), dump_only=True)
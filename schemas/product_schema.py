@@ -0,0 +1,83 @@
+from marshmallow import Schema, fields, validate
+
+from .pagination_schema import PaginationArgsSchema
+from .product_category_schema import PlainProductCategorySchema
+from .variation_schema import PlainVariationSchema, PlainVariationLineSchema
+
+from utils.image_helper import get_image_url
+
+class PlainProductSchema(Schema):
+    id = fields.Int(required=True, allow_none=False, dump_only=True)
+    name = fields.Str(required=True, allow_none=False, validate=validate.Length(max=80))
+    description = fields.Str(allow_none=True, validate=validate.Length(max=255))
+
+class PlainProductItemSchema(Schema):
+    id = fields.Int(required=True, allow_none=False, dump_only=True)
+    sku = fields.Str(allow_none=True, validate=validate.Length(max=20))
+    price = fields.Float(required=True, allow_none=False, validate=validate.Range(min=0))
+    qty_in_stock = fields.Int(load_default=0, validate=validate.Range(min=0))
+
+class ProductItemImageSchema(Schema):
+    id = fields.Int(dump_only=True)
+    name = fields.Str(dump_only=True)
+    image_url = fields.Function(lambda image: get_image_url(image.name), dump_only=True)
+
+class ProductItemVariationSchema(PlainVariationLineSchema):
+    variation = fields.Nested(PlainVariationSchema(), dump_only=True)
+
+class ProductItemSchema(PlainProductItemSchema):
+    eager_loads = (
+        ("product", "joined"),
+        ("image", "selectin"),
+        ("variation_lines", "selectin"),
+        ("variation_lines.variation", "joined"),
+    )
+
+    product_id = fields.Int(required=True, allow_none=False, load_only=True)
+    variation_line_ids = fields.List(fields.Int(), load_only=True, load_default=[])
+    product = fields.Nested(PlainProductSchema(), dump_only=True)
+    variation_lines = fields.Nested(ProductItemVariationSchema(many=True), dump_only=True)
+    image = fields.Nested(ProductItemImageSchema(many=True), dump_only=True)
+
+class ProductItemStockSchema(Schema):
+    change = fields.Int(required=True, allow_none=False)
+
+class ProductDetailItemSchema(PlainProductItemSchema):
+    variation_lines = fields.Nested(ProductItemVariationSchema(many=True), dump_only=True)
+    image = fields.Nested(ProductItemImageSchema(many=True), dump_only=True)
+
+class ProductSchema(PlainProductSchema):
+    eager_loads = (
+        ("category", "joined"),
+        ("product_items", "selectin"),
+        ("product_items.image", "selectin"),
+        ("product_items.variation_lines", "selectin"),
+        ("product_items.variation_lines.variation", "joined"),
+    )
+
+    category_id = fields.Int(required=True, allow_none=False, load_only=True)
+    category = fields.Nested(PlainProductCategorySchema(), dump_only=True)
+    product_items = fields.Nested(ProductDetailItemSchema(many=True), dump_only=True)
+
+class ProductListSchema(PlainProductSchema):
+    eager_loads = (
+        ("category", "joined"),
+        ("product_items", "selectin"),
+    )
+
+    category = fields.Nested(PlainProductCategorySchema(), dump_only=True)
+    # prices and SKUs only, images and variations are on the detail endpoint
+    product_items = fields.Nested(PlainProductItemSchema(many=True), dump_only=True)
+
+class ProductFilterArgsSchema(PaginationArgsSchema):
+    category_id = fields.Int()
+    # include the products of the sub categories
+    recursive = fields.Bool(load_default=True)
+    # "<variation>:<value>", repeat to combine, e.g: ?variation=Size:M&variation=Color:Red
+    variation = fields.List(
+        fields.Str(validate=validate.Regexp(r"^[^:]+:.+$", error="Expected '<variation>:<value>'.")),
+        load_default=[],
+    )
+
+class ProductItemFilterArgsSchema(ProductFilterArgsSchema):
+    product_id = fields.Int()
@@ -1,13 +1,35 @@
+import time
+
 from marshmallow import fields, Schema
 from .base_schema import BaseSchema
 
-def responseSchema(parent_schema: Schema = None, many: bool = False):
+from utils.serialization import fast_dump
+from utils.metrics import observe_serialization
+import config
+
+def responseSchema(parent_schema: Schema = None, many: bool = False, paginated: bool = False):
     class ResponseSchema(BaseResponseSchema):
         data = fields.Nested(parent_schema, many=many, allow_none=True, dump_only=True)
-    
+
+    if paginated:
+        class PaginatedResponseSchema(ResponseSchema):
+            next_cursor = fields.Str(allow_none=True, dump_only=True)
+
+        return PaginatedResponseSchema
+
     return ResponseSchema
 
 class BaseResponseSchema(BaseSchema):
     code = fields.Int(required=True, allow_none=False, dump_only=True)
     status = fields.Str(required=True, allow_none=False, dump_only=True)
-    message = fields.Str(dump_only=True)
\ No newline at end of file
+    message = fields.Str(dump_only=True)
+
+    def dump(self, obj, *, many=None):
+        start = time.perf_counter()
+        # compiled dumper instead of marshmallow's field by field dump (see utils/serialization.py)
+        if config.FAST_SERIALIZATION:
+            data = fast_dump(self, obj, many=many)
+        else:
+            data = super().dump(obj, many=many)
+        observe_serialization(start)
+        return data
@@ -0,0 +1,25 @@
+from marshmallow import Schema, fields, validate
+
+from .product_schema import ProductListSchema
+import config
+
+class SearchArgsSchema(Schema):
+    # words of the query are ANDed, each one also matches as a prefix ("sh" -> "shirt")
+    q = fields.Str(required=True, allow_none=False, validate=validate.Length(min=1, max=200))
+    category_id = fields.Int()
+    limit = fields.Int(
+        load_default=config.SEARCH_DEFAULT_LIMIT,
+        validate=validate.Range(min=1, max=config.SEARCH_MAX_LIMIT),
+    )
+    offset = fields.Int(load_default=0, validate=validate.Range(min=0))
+
+class SearchFacetSchema(Schema):
+    category_id = fields.Int(dump_only=True)
+    name = fields.Str(dump_only=True)
+    count = fields.Int(dump_only=True)
+
+class SearchResultSchema(Schema):
+    total = fields.Int(dump_only=True)
+    products = fields.Nested(ProductListSchema(many=True), dump_only=True)
+    # matches per category, for the whole query (category_id filter ignored)
+    facets = fields.Nested(SearchFacetSchema(many=True), dump_only=True)
@@ -37,6 +37,13 @@ class PlainUserPaymentMethodSchema(BaseSchema):
     is_default = fields.Boolean(required=True, dump_only=True)
 
 class UserSchema(PlainUserSchema):
+    eager_loads = (
+        ("role", "joined"),
+        ("addresses", "selectin"),
+        ("addresses.country", "joined"),
+        ("payment_methods", "selectin"),
+    )
+
     role_id = fields.Int(load_only=True)
     role = fields.Nested(RoleSchema(), dump_only=True)
     addresses = fields.List(fields.Nested(AddressSchema()), dump_only=True)
@@ -50,6 +57,11 @@ class UpdatePasswordSchema(BaseSchema):
     message = fields.Str(required=True, allow_none=False, dump_only=True)
 
 class UserPaymentMethodSchema(PlainUserPaymentMethodSchema):
+    eager_loads = (
+        ("user", "joined"),
+        ("payment_type", "joined"),
+    )
+
     user = fields.Nested(PlainUserSchema(), dump_only=True)
     payment_type = fields.Nested(PaymentTypeSchema(), dump_only=True)
 
@@ -10,11 +10,18 @@ class PlainVariationLineSchema(Schema):
     name = fields.Str(required=True, allow_none=False)
 
 class VariationSchema(PlainVariationSchema):
+    eager_loads = (
+        ("category", "joined"),
+        ("variation_lines", "selectin"),
+    )
+
     category_id = fields.Int(required=True, allow_none=False, load_only=True)
     category = fields.Nested(PlainProductCategorySchema, dump_only=True)
     variation_lines = fields.Nested(PlainVariationLineSchema(many=True), dump_only=True)
 
 
 class VariationLineSchema(PlainVariationLineSchema):
+    eager_loads = (("variation", "joined"),)
+
     variation_id = fields.Int(required=True, allow_none=False, load_only=True)
     variation = fields.Nested(PlainVariationSchema(), dump_only=True)
\ No newline at end of file
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+import config
+
+config.PASSWORD_HASH_ROUNDS = 1000  # before utils.security builds its hasher
+config.JOB_IN_PROCESS_WORKERS = 0  # jobs are run by the tests that want them
+
+from app import api_prefix, create_app
+from db import db
+from models import RoleModel, UserModel
+from utils.category_tree import category_tree
+from utils.claims_cache import claims_cache
+from utils.response_cache import MemoryBackend, response_cache
+from utils.token_blocklist import token_blocklist
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Application on a fresh SQLite database, with the process level caches emptied"""
+    monkeypatch.setattr(config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(config, "UPLOADED_IMAGES_DEST", str(tmp_path / "images"))
+    claims_cache.clear()
+    category_tree.invalidate()
+    token_blocklist.clear()
+    response_cache.configure(MemoryBackend())
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.session.add_all([RoleModel("Administrator"), RoleModel("Customer")])
+        db.session.commit()
+        db.session.add_all([
+            UserModel("Admin", "User", "admin@example.com", "000", "password", role_id=1),
+            UserModel("Some", "Customer", "customer@example.com", "001", "password", role_id=2),
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def api():
+    return api_prefix
+
+def _login(client, email: str) -> dict:
+    res = client.post(f"{api_prefix}/login", json={"email": email, "password": "password"})
+    assert res.status_code == 200, res.get_json()
+    return {"Authorization": f"Bearer {res.get_json()['data']['access_token']}"}
+
+@pytest.fixture
+def admin(client):
+    """Authorization header of the administrator"""
+    return _login(client, "admin@example.com")
+
+@pytest.fixture
+def customer(client):
+    """Authorization header of a customer"""
+    return _login(client, "customer@example.com")
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.count += 1
+
+@pytest.fixture
+def count_queries(app):
+    """count_queries(fn) -> number of SQL statements run by fn()"""
+    def count(fn) -> int:
+        counter = QueryCounter()
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", counter)
+        try:
+            fn()
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", counter)
+        return counter.count
+    return count
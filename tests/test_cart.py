@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from db import db
+from models import (
+    AddressModel,
+    CountryModel,
+    PaymentTypeModel,
+    Product,
+    ProductCategory,
+    ProductItem,
+    ShippingMethod,
+    ShoppingCart,
+    ShoppingCartItem,
+    UserModel,
+    UserPaymentMethodModel,
+)
+from models.shopping_cart import CartChanged, OutOfStock
+
+CUSTOMER_ID = 2
+
+def add_items(app, *stocks: int) -> None:
+    with app.app_context():
+        db.session.add(ProductCategory("Shoes"))
+        db.session.commit()
+        db.session.add(Product(1, "Sneaker"))
+        db.session.commit()
+        db.session.add_all([ProductItem(1, 10.0, qty_in_stock=stock) for stock in stocks])
+        db.session.commit()
+
+def stock(app, item_id: int = 1) -> int:
+    with app.app_context():
+        return db.session.get(ProductItem, item_id).qty_in_stock
+
+def cart_qty(app, user_id: int = CUSTOMER_ID) -> dict:
+    with app.app_context():
+        rows = db.session.execute(
+            select(ShoppingCartItem.product_item_id, ShoppingCartItem.qty)
+            .join(ShoppingCart, ShoppingCartItem.cart_id == ShoppingCart.id)
+            .where(ShoppingCart.user_id == user_id)
+        ).all()
+        return dict(rows)
+
+def add_to_cart(client, api, headers, item_id: int, qty: int):
+    return client.post(f"{api}/cart/item", json={"product_item_id": item_id, "qty": qty}, headers=headers)
+
+def checkout(client, api, headers):
+    with client.application.app_context():
+        db.session.add_all([CountryModel("Cambodia"), PaymentTypeModel("Card"), ShippingMethod("Standard", 2.5)])
+        db.session.commit()
+        db.session.add(UserPaymentMethodModel(CUSTOMER_ID, 1, "Visa", "4111111111111111", "12/30"))
+        user = db.session.get(UserModel, CUSTOMER_ID)
+        user.addresses.append(AddressModel("1", "Street", "Phnom Penh", "PP", "12000", 1))
+        db.session.commit()
+    body = {"payment_method_id": 1, "shipping_address_id": 1, "shipping_method_id": 1}
+    return client.post(f"{api}/order", json=body, headers=headers)
+
+def test_out_of_stock(app, client, api, customer):
+    add_items(app, 2)
+    assert add_to_cart(client, api, customer, 1, 2).status_code == 201
+    res = add_to_cart(client, api, customer, 1, 1)
+    assert res.status_code == 409
+    assert stock(app) == 0
+    assert cart_qty(app) == {1: 2}
+
+def test_change_quantity(app, client, api, customer):
+    add_items(app, 5)
+    assert add_to_cart(client, api, customer, 1, 4).status_code == 201
+    assert stock(app) == 1
+
+    res = client.put(f"{api}/cart/item/1", json={"qty": 1}, headers=customer)
+    assert res.status_code == 200, res.get_json()
+    assert stock(app) == 4
+    assert client.put(f"{api}/cart/item/1", json={"qty": 6}, headers=customer).status_code == 409
+    assert stock(app) == 4
+    assert client.delete(f"{api}/cart/item/1", headers=customer).status_code == 200
+    assert stock(app) == 5
+    assert cart_qty(app) == {}
+
+def test_checkout_and_cancel(app, client, api, customer):
+    add_items(app, 5, 5)
+    assert add_to_cart(client, api, customer, 1, 2).status_code == 201
+    assert add_to_cart(client, api, customer, 2, 1).status_code == 201
+
+    res = checkout(client, api, customer)
+    assert res.status_code == 201, res.get_json()
+    order = res.get_json()["data"]
+    assert [(line["product_item_id"], line["qty"]) for line in order["lines"]] == [(1, 2), (2, 1)]
+    assert order["order_total"] == 32.5
+    assert cart_qty(app) == {}
+    assert (stock(app, 1), stock(app, 2)) == (3, 4)  # the reservation became the order
+
+    res = client.post(f"{api}/order/{order['id']}/cancel", headers=customer)
+    assert res.status_code == 200
+    assert (stock(app, 1), stock(app, 2)) == (5, 5)
+    res = client.post(f"{api}/order/{order['id']}/cancel", headers=customer)
+    assert res.status_code == 409
+    assert (stock(app, 1), stock(app, 2)) == (5, 5)
+
+def test_release_expired(app, client, api, admin, customer):
+    add_items(app, 5)
+    assert add_to_cart(client, api, customer, 1, 2).status_code == 201
+    assert add_to_cart(client, api, admin, 1, 1).status_code == 201
+    with app.app_context():
+        cart = ShoppingCart.find_by_user(user_id=CUSTOMER_ID)
+        cart.updated_at = datetime.utcnow() - timedelta(hours=2)
+        db.session.commit()
+        assert ShoppingCart.release_expired(ttl=3600) == 1
+    assert stock(app) == 4
+    assert cart_qty(app) == {}
+    assert cart_qty(app, user_id=1) == {1: 1}
+
+def test_nothing_oversold(app):
+    buyers, units = 8, 3
+    add_items(app, units)
+    with app.app_context():
+        db.session.add_all([
+            UserModel("Buyer", str(index), f"buyer{index}@example.com", str(100 + index), "password", role_id=2)
+            for index in range(buyers)
+        ])
+        db.session.commit()
+        user_ids = [user.id for user in UserModel.query.filter(UserModel.first_name == "Buyer")]
+
+    results = []
+
+    def buy(user_id: int) -> None:
+        with app.app_context():
+            for _ in range(50):
+                try:
+                    cart = ShoppingCart.get_or_create(user_id=user_id)
+                    cart.add_item(1, 1)
+                    db.session.commit()
+                    results.append("sold")
+                    return
+                except OutOfStock:
+                    db.session.rollback()
+                    results.append("sold out")
+                    return
+                except (CartChanged, OperationalError):  # database is locked
+                    db.session.rollback()
+            results.append("failed")
+
+    threads = [threading.Thread(target=buy, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ["sold"] * units + ["sold out"] * (buyers - units)
+    assert stock(app) == 0
+    with app.app_context():
+        assert db.session.scalar(select(func.sum(ShoppingCartItem.qty))) == units
@@ -0,0 +1,130 @@
+"""
+Every kind is imported from a file mixing valid rows, rows failing the schema,
+unknown foreign keys and duplicates (in the file and already in the database).
+"""
+import io
+import json
+
+import pytest
+
+from db import db
+from models import ProductCategory, Variation, VariationFacet
+from utils.search import search_index
+
+@pytest.fixture
+def categories(app):
+    with app.app_context():
+        db.session.add_all([ProductCategory("Shirts"), ProductCategory("Shoes")])
+        db.session.commit()
+
+@pytest.fixture
+def run_import(client, api, admin):
+    def run(kind: str, rows: list) -> dict:
+        lines = [row if isinstance(row, str) else json.dumps(row) for row in rows]
+        body = io.BytesIO("\n".join(lines).encode("utf-8"))
+        res = client.post(f"{api}/import/{kind}", data=body, headers=admin)
+        assert res.status_code == 200, res.get_json()
+        return res.get_json()["data"]
+    return run
+
+def assert_result(result: dict, total: int, inserted: int, failed_rows: list) -> None:
+    assert (result["total"], result["inserted"], result["failed"]) == (total, inserted, len(failed_rows))
+    assert [error["row"] for error in result["errors"]] == failed_rows
+
+def add_variations(run_import) -> None:
+    assert run_import("variation", [{"category": "Shirts", "name": "Size"}])["inserted"] == 1
+    lines = [{"category": "Shirts", "variation": "Size", "name": name} for name in ("S", "M")]
+    assert run_import("variation_line", lines)["inserted"] == 2
+
+def add_products(run_import) -> None:
+    products = [{"category": "Shirts", "name": "Basic Tee", "description": "Cotton"}]
+    assert run_import("product", products)["inserted"] == 1
+    items = [{"category": "Shirts", "product": "Basic Tee", "sku": sku, "price": 9.5} for sku in ("TEE-S", "TEE-M")]
+    assert run_import("product_item", items)["inserted"] == 2
+
+def test_variation(app, categories, run_import):
+    result = run_import("variation", [
+        {"category": "Shirts", "name": "Size"},
+        {"category": "Shirts"},  # no name
+        {"category": "Hats", "name": "Size"},
+        {"category": "Shirts", "name": "Size"},  # twice in the file
+        "not json",
+        {"category": "Shoes", "name": "Size", "supplier": "ignored"},
+    ])
+    assert_result(result, total=6, inserted=2, failed_rows=[2, 3, 4, 5])
+    assert result["errors"][0]["errors"] == {"name": ["Missing data for required field."]}
+    assert result["errors"][1]["errors"] == {"_row": ["Unknown category 'Hats'."]}
+    assert result["errors"][2]["errors"] == {"_row": ["Already exists."]}
+
+    with app.app_context():
+        assert [(row.category_id, row.name) for row in Variation.query.order_by(Variation.id)] == [(1, "Size"), (2, "Size")]
+
+    # already in the database
+    assert_result(run_import("variation", [{"category": "Shirts", "name": "Size"}]), total=1, inserted=0, failed_rows=[1])
+
+def test_variation_line(categories, run_import):
+    assert run_import("variation", [{"category": "Shirts", "name": "Size"}])["inserted"] == 1
+    result = run_import("variation_line", [
+        {"category": "Shirts", "variation": "Size", "name": "S"},
+        {"category": "Shirts", "variation": "Size", "name": "x" * 81},  # too long
+        {"category": "Shirts", "variation": "Color", "name": "Red"},
+        {"category": "Shoes", "variation": "Size", "name": "S"},  # Size is a variation of Shirts
+        {"category": "Shirts", "variation": "Size", "name": "S"},
+        {"category": "Shirts", "variation": "Size", "name": "M"},
+    ])
+    assert_result(result, total=6, inserted=2, failed_rows=[2, 3, 4, 5])
+    assert result["errors"][1]["errors"] == {"_row": ["Unknown variation 'Color' in category 'Shirts'."]}
+
+def test_product(app, categories, run_import):
+    result = run_import("product", [
+        {"category": "Shirts", "name": "Basic Tee", "description": "Soft cotton"},
+        {"category": "Shirts", "name": "Polo", "description": "x" * 256},
+        {"category": "Hats", "name": "Cap"},
+        {"category": "Shirts", "name": "Basic Tee"},
+        {"category": "Shoes", "name": "Runner"},
+    ])
+    assert_result(result, total=5, inserted=2, failed_rows=[2, 3, 4])
+    with app.app_context():
+        ids, total, facets = search_index.search("cotton")
+        assert total == 1 and facets == {1: 1}
+        assert search_index.search("runner")[1] == 1
+        assert search_index.search("polo")[1] == 0
+
+def test_product_item(app, categories, run_import):
+    assert run_import("product", [{"category": "Shirts", "name": "Basic Tee"}])["inserted"] == 1
+    result = run_import("product_item", [
+        {"category": "Shirts", "product": "Basic Tee", "sku": "TEE-S", "price": 9.5, "qty_in_stock": 3},
+        {"category": "Shirts", "product": "Basic Tee", "sku": "TEE-X", "price": -1},
+        {"category": "Shirts", "product": "Polo", "sku": "POLO-S", "price": 20},
+        {"category": "Shirts", "product": "Basic Tee", "sku": "TEE-S", "price": 9.5},
+        {"category": "Shirts", "product": "Basic Tee", "sku": "TEE-M", "price": "9.5"},
+    ])
+    assert_result(result, total=5, inserted=2, failed_rows=[2, 3, 4])
+    assert "price" in result["errors"][0]["errors"]
+    with app.app_context():
+        # the skus are part of the product's search document
+        ids, total, _ = search_index.search("tee-m")
+        assert (ids, total) == ([1], 1)
+
+def test_product_variation(app, categories, run_import):
+    add_variations(run_import)
+    add_products(run_import)
+    result = run_import("product_variation", [
+        {"sku": "TEE-S", "variation": "Size", "value": "S"},
+        {"sku": "TEE-S", "variation": "Size"},  # no value
+        {"sku": "POLO-S", "variation": "Size", "value": "S"},
+        {"sku": "TEE-M", "variation": "Size", "value": "XL"},
+        {"sku": "TEE-S", "variation": "Size", "value": "S"},
+        {"sku": "TEE-M", "variation": "Size", "value": "S"},
+        {"sku": "TEE-M", "variation": "Size", "value": "M"},
+    ])
+    assert_result(result, total=7, inserted=3, failed_rows=[2, 3, 4, 5])
+    with app.app_context():
+        counts = {facet.variation_line_id: facet.count for facet in VariationFacet.query.filter_by(category_id=1)}
+        assert counts == {1: 2, 2: 1}
+
+def test_csv(categories, client, api, admin):
+    body = io.BytesIO(b"category,name\nShirts,Size\nShirts,\nShoes,Size\n")
+    res = client.post(f"{api}/import/variation?format=csv", data=body, headers=admin)
+    result = res.get_json()["data"]
+    assert_result(result, total=3, inserted=2, failed_rows=[2])
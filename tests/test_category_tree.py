@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import insert
+
+import config
+from db import db
+from models import ProductCategory
+from utils.category_tree import category_tree
+
+def add_category_elsewhere(app, name: str, parent_id: int = None) -> int:
+    """Insert a category the way another process would: without invalidating this process's tree"""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            return connection.execute(
+                insert(ProductCategory).values(name=name, parent_category_id=parent_id).returning(ProductCategory.id)
+            ).scalar()
+
+def test_category_created_by_another_process(app, client, api, admin):
+    shirts = add_category_elsewhere(app, "Shirts")
+    with app.app_context():
+        assert category_tree.exists(shirts)  # snapshot taken now
+
+    polos = add_category_elsewhere(app, "Polos", parent_id=shirts)
+    res = client.post(f"{api}/product", json={"name": "Polo", "category_id": polos}, headers=admin)
+    assert res.status_code == 201, res.get_json()
+
+    res = client.get(f"{api}/product_category/{polos}/breadcrumb", headers=admin)
+    assert [category["name"] for category in res.get_json()["data"]] == ["Shirts", "Polos"]
+
+def test_unknown_category(app, client, api, admin):
+    res = client.post(f"{api}/product", json={"name": "Polo", "category_id": 42}, headers=admin)
+    assert res.status_code == 404
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_list_top_level_categories(app, client, api, admin, monkeypatch, fast):
+    monkeypatch.setattr(config, "FAST_SERIALIZATION", fast)
+    monkeypatch.setattr(config, "RESPONSE_CACHE_ENABLED", False)
+    shirts = add_category_elsewhere(app, "Shirts")
+    add_category_elsewhere(app, "Polos", parent_id=shirts)
+    add_category_elsewhere(app, "Shoes")
+
+    res = client.get(f"{api}/product_category", headers=admin)
+    assert [category["name"] for category in res.get_json()["data"]] == ["Shirts", "Shoes"]
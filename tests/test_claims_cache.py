@@ -0,0 +1,108 @@
+import pytest
+
+from db import db, on_commit, transaction
+from models import UserModel
+from utils import claims_cache as claims_cache_module
+from utils.claims_cache import ClaimsCache, claims_cache
+
+class Loader:
+    def __init__(self, is_admin: bool = False) -> None:
+        self.is_admin = is_admin
+        self.calls = 0
+
+    def __call__(self, user_id) -> dict:
+        self.calls += 1
+        return {"is_admin": self.is_admin}
+
+def login(client, api, email: str) -> dict:
+    res = client.post(f"{api}/login", json={"email": email, "password": "password"})
+    assert res.status_code == 200, res.get_json()
+    return {"Authorization": f"Bearer {res.get_json()['data']['access_token']}"}
+
+def test_hits_misses_and_size():
+    cache = ClaimsCache(ttl=60)
+    loader = Loader()
+    assert cache.get(1, loader) == {"is_admin": False}
+    assert cache.get("1", loader) == {"is_admin": False}
+    cache.get(2, loader)
+    assert loader.calls == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 2}
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(claims_cache_module.time, "monotonic", lambda: now[0])
+    cache = ClaimsCache(ttl=60)
+    loader = Loader()
+    cache.get(1, loader)
+    now[0] += 59
+    cache.get(1, loader)
+    assert loader.calls == 1
+    now[0] += 1
+    cache.get(1, loader)
+    assert loader.calls == 2
+    assert cache.stats()["misses"] == 2
+
+def test_claims_loaded_before_an_invalidation_are_not_stored():
+    cache = ClaimsCache(ttl=60)
+
+    def loader(user_id) -> dict:
+        cache.invalidate(user_id)  # the role changes while the claims are being loaded
+        return {"is_admin": False}
+
+    cache.get(1, loader)
+    assert cache.stats()["size"] == 0
+
+def test_role_change_invalidates(client, api, admin):
+    customer = login(client, api, "customer@example.com")
+    assert client.get(f"{api}/role", headers=customer).status_code == 403
+    assert claims_cache.stats()["size"] == 2
+
+    res = client.post(f"{api}/user/2/role/1", headers=admin)
+    assert res.status_code == 200, res.get_json()
+    assert claims_cache.stats()["size"] == 1
+
+    promoted = login(client, api, "customer@example.com")
+    assert client.get(f"{api}/role", headers=promoted).status_code == 200
+
+def test_role_delete_clears(client, api, admin):
+    assert client.post(f"{api}/role", json={"name": "Staff"}, headers=admin).status_code == 201
+    assert claims_cache.stats()["size"] == 1
+    assert client.delete(f"{api}/role/3", headers=admin).status_code == 200
+    assert claims_cache.stats()["size"] == 0
+
+def test_user_update_invalidates(client, api, admin):
+    login(client, api, "customer@example.com")
+    res = client.put(f"{api}/user/2", headers=admin, json={
+        "first_name": "Some", "last_name": "Admin", "phone_number": "001",
+        "password": "password", "role_id": 1, "status": True,
+    })
+    assert res.status_code == 200, res.get_json()
+    assert claims_cache.stats()["size"] == 1
+
+    promoted = login(client, api, "customer@example.com")
+    assert client.get(f"{api}/role", headers=promoted).status_code == 200
+
+def test_user_delete_invalidates(client, api, admin):
+    login(client, api, "customer@example.com")
+    assert claims_cache.stats()["size"] == 2
+    assert client.delete(f"{api}/user/2", headers=admin).status_code == 200
+    assert claims_cache.stats()["size"] == 1
+
+@pytest.mark.parametrize("commit", [True, False])
+def test_invalidated_only_once_committed(app, client, api, commit):
+    login(client, api, "customer@example.com")
+
+    with app.app_context():
+        try:
+            with transaction():
+                user = db.session.get(UserModel, 2)
+                user.role_id = 1
+                user.save_to_db()
+                on_commit(lambda: claims_cache.invalidate(2))
+                assert claims_cache.stats()["size"] == 1
+                if not commit:
+                    raise RuntimeError("rolled back")
+        except RuntimeError:
+            pass
+
+    assert claims_cache.stats()["size"] == (0 if commit else 1)
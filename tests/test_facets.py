@@ -0,0 +1,27 @@
+from sqlalchemy import insert
+
+from db import db
+from models import ProductCategory, Variation, VariationFacet, VariationLine
+from utils.facets import apply_deltas
+
+def counts() -> dict:
+    return {(facet.category_id, facet.variation_line_id): facet.count for facet in VariationFacet.query.all()}
+
+def test_apply_deltas(app):
+    with app.app_context():
+        db.session.add(ProductCategory("Shirts"))
+        db.session.commit()
+        db.session.add(Variation(1, "Size"))
+        db.session.commit()
+        db.session.add_all([VariationLine(1, "S"), VariationLine(1, "M")])
+        db.session.commit()
+
+        apply_deltas(db.session, {(1, 1): 2})
+        db.session.commit()
+        # the first item of (1, 2) committed by another process meanwhile
+        with db.engine.begin() as connection:
+            connection.execute(insert(VariationFacet).values(category_id=1, variation_line_id=2, count=1))
+
+        apply_deltas(db.session, {(1, 1): -1, (1, 2): 3})
+        db.session.commit()
+        assert counts() == {(1, 1): 1, (1, 2): 4}
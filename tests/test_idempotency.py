@@ -0,0 +1,33 @@
+from db import db
+from models import Product, ProductCategory, ProductItem, IdempotencyKey
+
+def add_item(app, qty_in_stock: int) -> None:
+    with app.app_context():
+        db.session.add(ProductCategory("Shoes"))
+        db.session.commit()
+        db.session.add(Product(1, "Sneaker"))
+        db.session.commit()
+        db.session.add(ProductItem(1, 10.0, qty_in_stock=qty_in_stock))
+        db.session.commit()
+
+def test_failure_after_rollback_is_not_stored(app, client, api, customer):
+    add_item(app, qty_in_stock=0)
+    headers = {**customer, "Idempotency-Key": "add-sneaker"}
+
+    # the view rolls back on OutOfStock before answering 409
+    for _ in range(2):
+        res = client.post(f"{api}/cart/item", json={"product_item_id": 1, "qty": 1}, headers=headers)
+        assert res.status_code == 409, res.get_json()
+        assert "Idempotent-Replayed" not in res.headers
+    with app.app_context():
+        assert IdempotencyKey.query.count() == 0
+
+def test_success_is_replayed(app, client, api, customer):
+    add_item(app, qty_in_stock=5)
+    headers = {**customer, "Idempotency-Key": "add-sneaker"}
+
+    first = client.post(f"{api}/cart/item", json={"product_item_id": 1, "qty": 1}, headers=headers)
+    assert first.status_code == 201, first.get_json()
+    again = client.post(f"{api}/cart/item", json={"product_item_id": 1, "qty": 1}, headers=headers)
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
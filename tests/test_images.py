@@ -0,0 +1,136 @@
+import io
+import os
+import time
+
+import pytest
+from PIL import Image as PILImage
+
+import config
+from db import db
+from models import ImageBlob, Product, ProductCategory, ProductItem
+from app import create_app
+from resources import image as image_resource
+from utils import image_helper
+from utils.jobs import Worker
+
+def upload(client, api, color: str = "blue", **data) -> str:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (800, 600), color).save(buffer, "JPEG")
+    buffer.seek(0)
+    data["image"] = (buffer, "shoe.jpg")
+    res = client.post(f"{api}/upload-image", data=data, content_type="multipart/form-data")
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()["data"]["name"]
+
+def test_variant_fallback_is_not_immutable(app, client, api):
+    filename = upload(client, api)
+
+    original = client.get(f"{api}/image/{filename}")
+    assert original.cache_control.immutable
+
+    # the job making the variants hasn't run: the original is served, to be revalidated
+    fallback = client.get(f"{api}/image/{filename}?variant=thumbnail")
+    assert fallback.status_code == 200
+    assert fallback.cache_control.no_cache
+    assert not fallback.cache_control.immutable
+    assert fallback.get_etag() == original.get_etag()
+
+    assert Worker(app).run_once() == 1
+    variant = client.get(f"{api}/image/{filename}?variant=thumbnail")
+    assert variant.cache_control.immutable
+    assert not variant.cache_control.no_cache
+    assert variant.get_etag() != original.get_etag()
+
+def test_blob_reference_counting(app):
+    with app.app_context():
+        ImageBlob.acquire("a" * 64 + ".jpg")
+        ImageBlob.acquire("a" * 64 + ".jpg")
+        assert ImageBlob.find_by_filename("a" * 64 + ".jpg").ref_count == 2
+        assert not ImageBlob.release("a" * 64 + ".jpg")
+        assert ImageBlob.release("a" * 64 + ".jpg")
+        assert ImageBlob.find_by_filename("a" * 64 + ".jpg") is None
+
+def add_items(app, count: int) -> None:
+    with app.app_context():
+        db.session.add(ProductCategory("Shoes"))
+        db.session.commit()
+        db.session.add(Product(1, "Sneaker"))
+        db.session.commit()
+        db.session.add_all([ProductItem(1, 10.0) for _ in range(count)])
+        db.session.commit()
+
+def image_path(app, filename: str) -> str:
+    with app.app_context():
+        return image_helper.get_path(filename, image_helper.PRODUCT_IMAGE_FOLDER)
+
+def test_deleting_item_releases_its_images(app, client, api):
+    add_items(app, 2)
+    filename = upload(client, api, product_item_id="1")
+    shared = upload(client, api, product_item_id="1", color="red")
+    assert upload(client, api, product_item_id="2", color="red") == shared
+
+    with app.app_context():
+        assert ImageBlob.find_by_filename(shared).ref_count == 2
+        db.session.get(ProductItem, 1).delete_from_db()
+
+        assert ImageBlob.find_by_filename(filename) is None
+        assert not os.path.exists(image_path(app, filename))
+        assert ImageBlob.find_by_filename(shared).ref_count == 1
+        assert os.path.exists(image_path(app, shared))
+
+def test_upload_without_item_has_no_reference(app, client, api):
+    add_items(app, 1)
+    filename = upload(client, api)
+    with app.app_context():
+        assert ImageBlob.find_by_filename(filename) is None
+    assert upload(client, api, product_item_id="1") == filename
+    with app.app_context():
+        assert ImageBlob.find_by_filename(filename).ref_count == 1
+
+    # the item's image goes with the last reference
+    assert client.delete(f"{api}/image/{filename}").status_code == 200
+    with app.app_context():
+        assert ImageBlob.find_by_filename(filename) is None
+    assert not os.path.exists(image_path(app, filename))
+    assert client.delete(f"{api}/image/{filename}").status_code == 404
+
+    other = upload(client, api, color="green")
+    assert client.delete(f"{api}/image/{other}").status_code == 200
+    assert not os.path.exists(image_path(app, other))
+
+class BrokenStream(io.BytesIO):
+    def read(self, size=-1):
+        if self.tell():
+            raise ConnectionResetError()
+        return super().read(size)
+
+def test_failed_upload_leaves_no_temp_file(app):
+    with app.app_context():
+        tmp_folder = image_helper.IMAGE_SET.path(".tmp", image_helper.PRODUCT_IMAGE_FOLDER)
+        image = image_helper.FileStorage(BrokenStream(b"x" * 200_000), "shoe.jpg")
+        with pytest.raises(ConnectionResetError):
+            image_helper.save_content_addressed(image, image_helper.PRODUCT_IMAGE_FOLDER)
+        assert os.listdir(tmp_folder) == []
+
+def test_signed_images_are_private(app, client, api, monkeypatch):
+    filename = upload(client, api)
+    secret = "s" * 32
+    monkeypatch.setattr(image_resource, "IMAGE_URL_SIGNING", True)
+    monkeypatch.setattr(image_helper, "IMAGE_URL_SECRET", secret)
+
+    assert client.get(f"{api}/image/{filename}").status_code == 403
+    expires = int(time.time()) + 60
+    signature = image_helper.sign_image_url(filename, expires)
+    res = client.get(f"{api}/image/{filename}?expires={expires}&signature={signature}")
+    assert res.status_code == 200
+    assert res.cache_control.private and not res.cache_control.public
+    assert 0 < res.cache_control.max_age <= 60
+
+def test_signing_requires_a_secret(app, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_URL_SIGNING", True)
+    monkeypatch.setattr(config, "IMAGE_URL_SECRET", None)
+    with pytest.raises(RuntimeError):
+        create_app()
+    monkeypatch.setattr(config, "IMAGE_URL_SECRET", "change-me")
+    with pytest.raises(RuntimeError):
+        create_app()
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+from db import db
+from models import Job
+from models.job import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from utils.jobs import Worker, enqueue, task
+
+calls = []
+
+@task("test.succeed")
+def succeed(value: int) -> None:
+    calls.append(value)
+
+@task("test.fail", max_attempts=3)
+def fail() -> None:
+    raise ValueError("boom")
+
+@pytest.fixture(autouse=True)
+def backoff(monkeypatch):
+    monkeypatch.setattr(config, "JOB_RETRY_BACKOFF", 10)
+    calls.clear()
+
+def add_job(app, name: str, user_id: int = None, **payload) -> int:
+    with app.app_context():
+        return enqueue(name, user_id=user_id, **payload).id
+
+def get_job(app, id: int) -> Job:
+    with app.app_context():
+        job = db.session.get(Job, id)
+        db.session.expunge(job)
+        return job
+
+def make_due(app, id: int) -> None:
+    with app.app_context():
+        db.session.get(Job, id).run_at = datetime.utcnow()
+        db.session.commit()
+
+def test_success(app):
+    id = add_job(app, "test.succeed", value=42)
+    assert Worker(app).run_once() == 1
+    assert calls == [42]
+    job = get_job(app, id)
+    assert (job.status, job.attempts, job.finished_at is not None) == (JOB_DONE, 1, True)
+
+def test_retry_with_backoff_then_failed(app):
+    id = add_job(app, "test.fail")
+    worker = Worker(app)
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        before = datetime.utcnow()
+        assert worker.run_once() == 1
+        job = get_job(app, id)
+        assert (job.status, job.attempts) == (JOB_QUEUED, attempt)
+        assert "ValueError: boom" in job.last_error
+        assert before + timedelta(seconds=delay - 1) < job.run_at < datetime.utcnow() + timedelta(seconds=delay + 1)
+        assert worker.run_once() == 0  # not due yet
+        make_due(app, id)
+
+    assert worker.run_once() == 1
+    job = get_job(app, id)
+    assert (job.status, job.attempts) == (JOB_FAILED, 3)
+    make_due(app, id)
+    assert worker.run_once() == 0
+
+def test_stale_running_jobs(app):
+    retried = add_job(app, "test.succeed", value=1)
+    exhausted = add_job(app, "test.fail")
+    with app.app_context():
+        for id, attempts in ((retried, 1), (exhausted, 3)):
+            job = db.session.get(Job, id)
+            job.status, job.attempts = JOB_RUNNING, attempts
+            job.locked_by, job.locked_at = "dead-worker", datetime.utcnow() - timedelta(seconds=config.JOB_TIMEOUT + 1)
+        db.session.commit()
+
+    assert Worker(app).run_once() == 1
+    assert calls == [1]
+    assert (get_job(app, retried).status, get_job(app, retried).attempts) == (JOB_DONE, 2)
+    job = get_job(app, exhausted)
+    assert (job.status, job.attempts, job.locked_by) == (JOB_FAILED, 3, None)
+
+def test_retry_endpoint(app, client, api, admin, customer):
+    id = add_job(app, "test.fail")
+    with app.app_context():
+        job = db.session.get(Job, id)
+        job.status, job.attempts = JOB_FAILED, 3
+        db.session.commit()
+
+    assert client.post(f"{api}/job/{id}/retry", headers=customer).status_code == 403
+    res = client.post(f"{api}/job/{id}/retry", headers=admin)
+    assert res.status_code == 200, res.get_json()
+    job = get_job(app, id)
+    assert (job.status, job.attempts) == (JOB_QUEUED, 0)
+    assert client.post(f"{api}/job/{id}/retry", headers=admin).status_code == 409
+    assert client.post(f"{api}/job/{id + 1}/retry", headers=admin).status_code == 404
+
+def test_jobs_are_scoped_to_their_owner(app, client, api, admin, customer):
+    mine = add_job(app, "test.succeed", user_id=2, value=1)
+    theirs = add_job(app, "test.succeed", user_id=1, value=2)
+    anonymous = add_job(app, "test.succeed", value=3)
+
+    assert client.get(f"{api}/job/{mine}", headers=customer).status_code == 200
+    assert client.get(f"{api}/job/{theirs}", headers=customer).status_code == 404
+    assert client.get(f"{api}/job/{anonymous}", headers=customer).status_code == 404
+    for id in (mine, theirs, anonymous):
+        assert client.get(f"{api}/job/{id}", headers=admin).status_code == 200
+    assert client.get(f"{api}/job", headers=customer).status_code == 403
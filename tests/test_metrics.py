@@ -0,0 +1,33 @@
+import pytest
+from flask import Response as FlaskResponse
+
+import config
+from app import create_app
+
+@pytest.fixture
+def metrics_app(app, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_ENABLED", True)
+    return create_app()
+
+def test_streamed_response_is_not_buffered(metrics_app):
+    finished = []
+
+    def chunks():
+        yield "first"
+        yield "last"
+        finished.append(True)
+
+    metrics_app.add_url_rule("/stream", "stream", lambda: FlaskResponse(chunks()))
+    res = metrics_app.test_client().get("/stream", buffered=False)
+    assert not finished  # still streaming
+    assert b"".join(res.response) == b"firstlast"
+    res.close()
+
+def test_metrics_token(metrics_app, monkeypatch):
+    client = metrics_app.test_client()
+    assert client.get(config.METRICS_PATH).status_code == 200
+
+    monkeypatch.setattr(config, "METRICS_TOKEN", "secret")
+    assert client.get(config.METRICS_PATH).status_code == 403
+    assert client.get(config.METRICS_PATH, headers={"Authorization": "Bearer other"}).status_code == 403
+    assert client.get(config.METRICS_PATH, headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,30 @@
+from db import db
+from models import Image, Product, ProductCategory, ProductItem
+
+def add_items(app, count: int) -> None:
+    with app.app_context():
+        db.session.add(ProductCategory("Shoes"))
+        db.session.commit()
+        db.session.add(Product(1, "Sneaker"))
+        db.session.commit()
+        db.session.add_all([ProductItem(1, 10.0, qty_in_stock=5) for _ in range(count)])
+        db.session.commit()
+
+def test_delete_item_in_cart(app, client, api, admin, customer):
+    add_items(app, 2)
+    res = client.post(f"{api}/cart/item", json={"product_item_id": 1, "qty": 1}, headers=customer)
+    assert res.status_code == 201, res.get_json()
+
+    res = client.delete(f"{api}/product_item/1", headers=admin)
+    assert res.status_code == 409
+    assert "carts or orders" in res.get_json()["message"]
+
+    # images go with the item
+    with app.app_context():
+        db.session.add(Image(product_item_id=2, name="front.jpg"))
+        db.session.commit()
+    assert client.delete(f"{api}/product_item/2", headers=admin).status_code == 200
+    with app.app_context():
+        assert db.session.get(ProductItem, 1) is not None
+        assert db.session.get(ProductItem, 2) is None
+        assert Image.query.count() == 0
@@ -0,0 +1,82 @@
+"""
+The number of queries of an endpoint must not depend on the number of rows it returns
+(see the eager_loads of the schemas): each endpoint is counted with N and 10N related rows.
+"""
+import pytest
+
+import config
+from db import db
+from models import (
+    AddressModel,
+    CountryModel,
+    PaymentTypeModel,
+    ProductCategory,
+    UserModel,
+    UserPaymentMethodModel,
+    Variation,
+    VariationLine,
+)
+from utils.token_blocklist import token_blocklist
+
+N = 5
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    # a cached response or a blocklist sync would make the counts differ for other reasons
+    monkeypatch.setattr(config, "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(token_blocklist, "sync_interval", 3600)
+
+def add_user_rows(user_id: int, count: int) -> None:
+    """Addresses in as many countries, so that lazy loading them would cost a query each"""
+    user = db.session.get(UserModel, user_id)
+    if PaymentTypeModel.query.first() is None:
+        db.session.add(PaymentTypeModel("Card"))
+    start = CountryModel.query.count()
+    countries = [CountryModel(f"Country {start + index}") for index in range(count)]
+    db.session.add_all(countries)
+    db.session.flush()
+    for index, country in enumerate(countries):
+        user.addresses.append(AddressModel(str(index), "Street", "Phnom Penh", "PP", "12000", country.id))
+        db.session.add(UserPaymentMethodModel(user_id, 1, "Visa", f"4111{start + index:012d}", "12/30"))
+    db.session.commit()
+
+def add_variation_lines(variation_id: int, count: int) -> None:
+    start = VariationLine.query.filter_by(variation_id=variation_id).count()
+    db.session.add_all([VariationLine(variation_id, f"Value {start + index}") for index in range(count)])
+    db.session.commit()
+
+def add_sub_categories(category_id: int, count: int) -> None:
+    start = ProductCategory.query.filter_by(parent_category_id=category_id).count()
+    db.session.add_all([ProductCategory(f"Sub {start + index}", category_id) for index in range(count)])
+    db.session.commit()
+
+def assert_constant(app, client, count_queries, url: str, headers: dict, grow) -> None:
+    with app.app_context():
+        grow(N)
+    assert client.get(url, headers=headers).status_code == 200  # warm up (blocklist, category tree...)
+    small = count_queries(lambda: client.get(url, headers=headers))
+    with app.app_context():
+        grow(9 * N)
+    client.get(url, headers=headers)
+    large = count_queries(lambda: client.get(url, headers=headers))
+    assert small == large, f"{url}: {small} queries with {N} rows, {large} with {10 * N}"
+
+def test_user_detail(app, client, api, admin, count_queries):
+    assert_constant(app, client, count_queries, f"{api}/user/detail", admin, lambda count: add_user_rows(1, count))
+
+def test_user_by_id(app, client, api, admin, count_queries):
+    assert_constant(app, client, count_queries, f"{api}/user/2", admin, lambda count: add_user_rows(2, count))
+
+def test_variation(app, client, api, admin, count_queries):
+    with app.app_context():
+        db.session.add(ProductCategory("Shirts"))
+        db.session.commit()
+        db.session.add(Variation(1, "Size"))
+        db.session.commit()
+    assert_constant(app, client, count_queries, f"{api}/variation/1", admin, lambda count: add_variation_lines(1, count))
+
+def test_product_category(app, client, api, admin, count_queries):
+    with app.app_context():
+        db.session.add(ProductCategory("Shirts"))
+        db.session.commit()
+    assert_constant(app, client, count_queries, f"{api}/product_category/1", admin, lambda count: add_sub_categories(1, count))
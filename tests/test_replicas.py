@@ -0,0 +1,59 @@
+"""SQLite files standing in for a primary and its read replica"""
+import shutil
+import sqlite3
+
+import pytest
+
+import config
+from app import create_app
+from db import db, transaction
+from models import CountryModel
+
+def country_names() -> list:
+    return [country.country_name for country in CountryModel.query.order_by(CountryModel.id)]
+
+@pytest.fixture
+def replica_app(app, tmp_path, monkeypatch):
+    with app.app_context():
+        db.session.add(CountryModel("Cambodia"))
+        db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+    # the replica is a copy of the primary, lagging behind it by one row
+    replica = tmp_path / "replica.db"
+    shutil.copy(tmp_path / "test.db", replica)
+    with sqlite3.connect(replica) as connection:
+        connection.execute("INSERT INTO country (country_name) VALUES ('Only on the replica')")
+    monkeypatch.setattr(config, "SQLALCHEMY_REPLICA_URIS", [f"sqlite:///{replica}"])
+    replica_app = create_app()
+    with replica_app.app_context():
+        assert set(db.engines) == {None, "replica_0"}
+    yield replica_app
+    with replica_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def test_reads_go_to_the_replica(replica_app):
+    with replica_app.app_context():
+        assert country_names() == ["Cambodia", "Only on the replica"]
+        assert db.session.get(CountryModel, 2).country_name == "Only on the replica"
+
+def test_writes_and_later_reads_go_to_the_primary(replica_app):
+    with replica_app.app_context():
+        CountryModel("Laos").save_to_db()
+        assert country_names() == ["Cambodia", "Laos"]  # read your writes
+
+    with replica_app.app_context():  # another session
+        assert country_names() == ["Cambodia", "Only on the replica"]
+
+def test_transaction_reads_from_the_primary(replica_app):
+    with replica_app.app_context():
+        with transaction():
+            assert country_names() == ["Cambodia"]
+            CountryModel("Laos").save_to_db()
+            assert country_names() == ["Cambodia", "Laos"]
+
+def test_locking_reads_go_to_the_primary(replica_app):
+    with replica_app.app_context():
+        assert [country.country_name for country in CountryModel.query.with_for_update()] == ["Cambodia"]
@@ -0,0 +1,61 @@
+import io
+
+from utils.response_cache import response_cache
+
+def names(res) -> list:
+    return [row["name"] for row in res.get_json()["data"]]
+
+def test_miss_then_hit(client, api, admin):
+    first = client.get(f"{api}/role", headers=admin)
+    assert first.headers["X-Cache"] == "MISS"
+    second = client.get(f"{api}/role", headers=admin)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_json() == first.get_json()
+    assert second.get_etag() == first.get_etag()
+
+def test_not_modified(client, api, admin):
+    etag, _ = client.get(f"{api}/role", headers=admin).get_etag()
+    res = client.get(f"{api}/role", headers={**admin, "If-None-Match": f'"{etag}"'})
+    assert res.status_code == 304
+    assert res.data == b""
+
+def test_invalidated_by_writes(client, api, admin):
+    assert names(client.get(f"{api}/role", headers=admin)) == ["Administrator", "Customer"]
+
+    res = client.post(f"{api}/role", json={"name": "Staff"}, headers=admin)
+    assert res.status_code == 201, res.get_json()
+    res = client.get(f"{api}/role", headers=admin)
+    assert res.headers["X-Cache"] == "MISS"
+    assert names(res) == ["Administrator", "Customer", "Staff"]
+
+    assert client.delete(f"{api}/role/3", headers=admin).status_code == 200
+    res = client.get(f"{api}/role", headers=admin)
+    assert res.headers["X-Cache"] == "MISS"
+    assert names(res) == ["Administrator", "Customer"]
+
+def test_scopes_are_separate(client, api, admin, customer):
+    assert client.get(f"{api}/variation", headers=admin).headers["X-Cache"] == "MISS"
+    assert client.get(f"{api}/variation", headers=customer).headers["X-Cache"] == "MISS"
+    assert client.get(f"{api}/variation", headers=admin).headers["X-Cache"] == "HIT"
+    assert client.get(f"{api}/variation", headers=customer).headers["X-Cache"] == "HIT"
+
+def test_errors_are_not_stored(client, api, admin, customer):
+    for _ in range(2):
+        res = client.get(f"{api}/role", headers=customer)
+        assert res.status_code == 403
+        assert "X-Cache" not in res.headers
+        res = client.get(f"{api}/role/42", headers=admin)
+        assert res.status_code == 404
+        assert "X-Cache" not in res.headers
+    assert len(response_cache.backend._entries) == 0
+
+def test_invalidated_by_import(client, api, admin):
+    assert client.post(f"{api}/product_category", json={"name": "Shirts"}, headers=admin).status_code == 201
+    assert names(client.get(f"{api}/variation", headers=admin)) == []
+
+    body = io.BytesIO(b'{"category": "Shirts", "name": "Size"}\n')
+    res = client.post(f"{api}/import/variation", data=body, headers=admin)
+    assert res.get_json()["data"]["inserted"] == 1
+    res = client.get(f"{api}/variation", headers=admin)
+    assert res.headers["X-Cache"] == "MISS"
+    assert names(res) == ["Size"]
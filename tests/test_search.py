@@ -0,0 +1,14 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from db import db
+from utils.search import include_object, search_index
+
+def test_autogenerate_keeps_search_tables(app):
+    with app.app_context():
+        assert search_index.backend.name == "fts5"
+        with db.engine.connect() as connection:
+            context = MigrationContext.configure(connection, opts={"include_object": include_object})
+            diff = compare_metadata(context, db.metadata)
+    removed = [change[1].name for change in diff if change[0] == "remove_table"]
+    assert not [name for name in removed if name.startswith("product_search")]
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from utils.security import PasswordHasher, PasswordHasherBusy, password_hasher
+
+def test_timeout_is_busy():
+    hasher = PasswordHasher(rounds=1000, timeout=0.05)
+    with pytest.raises(PasswordHasherBusy):
+        hasher._submit(time.sleep, 0.5)
+
+def test_busy_hasher_is_503(client, api, customer, monkeypatch):
+    def busy(password):
+        raise PasswordHasherBusy()
+    monkeypatch.setattr(password_hasher, "hash", busy)
+
+    user = {
+        "first_name": "New",
+        "last_name": "User",
+        "email_address": "new@example.com",
+        "phone_number": "002",
+        "password": "password",
+    }
+    res = client.post(f"{api}/user/register", json=user)
+    assert res.status_code == 503
+    assert res.get_json()["status"] == "Service Unavailable"
+
+    res = client.put(
+        f"{api}/user/change-password",
+        json={"old_password": "password", "new_password": "other"},
+        headers=customer,
+    )
+    assert res.status_code == 503
+
+def test_plaintext():
+    hasher = PasswordHasher(rounds=1000)
+    assert hasher.verify("secret", "secret")[0]
+    assert hasher.is_legacy("secret")
+    assert not hasher.is_legacy(hasher.hash("secret"))
+
+    strict = PasswordHasher(rounds=1000, accept_plaintext=False)
+    assert strict.verify("secret", "secret") == (False, None)
+    assert strict.verify("secret", strict.hash("secret"))[0]
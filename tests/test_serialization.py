@@ -0,0 +1,15 @@
+import json
+
+import pytest
+
+import config
+from utils.serialization import FastJSONProvider
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_provider_sorts_keys(app, monkeypatch, fast):
+    monkeypatch.setattr(config, "JSON_FAST_ENCODER", fast)
+    provider = FastJSONProvider(app)
+    provider.sort_keys = True
+    assert list(json.loads(provider.dumps({"b": 1, "a": 2}))) == ["a", "b"]
+    provider.sort_keys = False
+    assert list(json.loads(provider.dumps({"b": 1, "a": 2}))) == ["b", "a"]
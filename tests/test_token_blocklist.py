@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+import config
+from db import db
+from models import TokenModel
+from utils.token_blocklist import TokenBlocklist
+
+def revoke_elsewhere(app, jti: str) -> None:
+    """A logout done by another process"""
+    with app.app_context():
+        TokenModel(jti=jti, token_type="access", expires_at=datetime.utcnow() + timedelta(hours=1)).save_to_db()
+
+def test_revocation_after_purge_of_last_row(app, monkeypatch):
+    monkeypatch.setattr(config, "TOKEN_BLOCKLIST_SYNC_OVERLAP", 0)
+    blocklist = TokenBlocklist(sync_interval=0)
+    revoke_elsewhere(app, "first")
+    revoke_elsewhere(app, "second")
+    with app.app_context():
+        assert blocklist.is_revoked("second")
+
+        # the highest row purged, then another logout: its id must not be the purged one
+        db.session.execute(delete(TokenModel).where(TokenModel.jti == "second"))
+        db.session.commit()
+    revoke_elsewhere(app, "third")
+    with app.app_context():
+        assert blocklist.is_revoked("third")
+
+def test_logout_revokes_the_token(client, api):
+    res = client.post(f"{api}/login", json={"email": "customer@example.com", "password": "password"})
+    tokens = res.get_json()["data"]
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    assert client.get(f"{api}/user/detail", headers=access).status_code == 200
+
+    assert client.post(f"{api}/logout", headers=access).status_code == 200
+    assert client.get(f"{api}/user/detail", headers=access).status_code == 401
+    assert client.post(f"{api}/logout", headers=access).status_code == 401
+    assert client.get(f"{api}/refresh", headers=refresh).status_code == 200
+
+    assert client.post(f"{api}/logout", headers=refresh).status_code == 200
+    assert client.get(f"{api}/refresh", headers=refresh).status_code == 401
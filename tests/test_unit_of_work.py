@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import func, insert, select
+
+from db import db, on_commit, transaction
+from models import CountryModel
+
+def committed_countries(app) -> int:
+    """Read from another connection: only what was committed"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(CountryModel)).scalar()
+
+@pytest.fixture
+def routes(app):
+    def add(status: int):
+        CountryModel("Cambodia").save_to_db()  # commit() only flushes inside the unit of work
+        return {"status": status}, status
+
+    def fail():
+        CountryModel("Cambodia").save_to_db()
+        raise RuntimeError("boom")
+
+    app.add_url_rule("/test/add/<int:status>", "test_add", add, methods=["POST"])
+    app.add_url_rule("/test/fail", "test_fail", fail, methods=["POST"])
+    return app
+
+@pytest.mark.parametrize("status, kept", [(200, 1), (201, 1), (404, 0), (409, 0), (500, 0)])
+def test_request_commits_only_on_success(routes, client, status, kept):
+    assert client.post(f"/test/add/{status}").status_code == status
+    assert committed_countries(routes) == kept
+
+def test_request_rolls_back_on_exception(routes, client):
+    with pytest.raises(RuntimeError):
+        client.post("/test/fail")
+    assert committed_countries(routes) == 0
+
+def test_on_commit_runs_after_commit(app):
+    calls = []
+    with app.app_context():
+        on_commit(lambda: calls.append("now"))  # nothing pending
+        assert calls == ["now"]
+
+        db.session.add(CountryModel("Cambodia"))
+        on_commit(lambda: calls.append("orm"))
+        db.session.flush()
+        assert calls == ["now"]
+        db.session.commit()
+        assert calls == ["now", "orm"]
+
+        # written with session.execute(): nothing in session.new/dirty/deleted
+        db.session.execute(insert(CountryModel).values(country_name="Laos"))
+        on_commit(lambda: calls.append("core"))
+        assert calls == ["now", "orm"]
+        db.session.commit()
+        assert calls == ["now", "orm", "core"]
+
+def test_on_commit_dropped_on_rollback(app):
+    calls = []
+    with app.app_context():
+        db.session.execute(insert(CountryModel).values(country_name="Laos"))
+        on_commit(lambda: calls.append("core"))
+        db.session.rollback()
+        db.session.add(CountryModel("Cambodia"))
+        db.session.commit()
+    assert calls == []
+    assert committed_countries(app) == 1
+
+def test_nested_transaction_joins_outer(app):
+    calls = []
+    with app.app_context():
+        with transaction():
+            CountryModel("Cambodia").save_to_db()
+            with transaction():
+                CountryModel("Laos").save_to_db()
+                on_commit(lambda: calls.append("inner"))
+            assert calls == []
+            assert committed_countries(app) == 0
+        assert calls == ["inner"]
+        assert committed_countries(app) == 2
+
+        with pytest.raises(RuntimeError):
+            with transaction():
+                CountryModel("Vietnam").save_to_db()
+                with transaction():
+                    CountryModel("Thailand").save_to_db()
+                raise RuntimeError("boom")
+    assert committed_countries(app) == 2
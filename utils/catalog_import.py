@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+
+from itertools import islice
+from marshmallow import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from typing import IO, Iterable, Iterator, Optional, Tuple
+
+import config
+from db import db
+from models.product import Product
+from models.product_category import ProductCategory
+from models.product_item import ProductItem
+from models.variation import Variation
+from models.variation_line import VariationLine, product_variation
+from utils.facets import apply_deltas
+from utils.response_cache import response_cache
+from utils.search import search_index
+from schemas.catalog_import_schema import (
+    VariationImportSchema,
+    VariationLineImportSchema,
+    ProductImportSchema,
+    ProductItemImportSchema,
+    ProductVariationImportSchema,
+)
+
+# (row number, raw row, parse error)
+RawRow = Tuple[int, Optional[dict], Optional[str]]
+
+def read_rows(stream: IO[bytes], format: str) -> Iterator[RawRow]:
+    """Read an uploaded file row by row, without loading it all in memory"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            # empty cells are missing values, not empty strings
+            yield number, {key: value for key, value in row.items() if key and value not in (None, "")}, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as err:
+            yield number, None, f"Invalid JSON: {err}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Each line must be a JSON object."
+            continue
+        yield number, row, None
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+class CatalogImporter:
+    """
+    Bulk import of one kind of catalog rows.
+    Rows are validated a chunk at a time, foreign keys are resolved by natural key
+    (category name, variation name, sku...) from lookup maps loaded once, and every
+    chunk is written with a single multi-row INSERT and committed on its own.
+    Invalid rows are reported and skipped, they never abort the import.
+    """
+    SCHEMAS = {
+        "variation": VariationImportSchema,
+        "variation_line": VariationLineImportSchema,
+        "product": ProductImportSchema,
+        "product_item": ProductItemImportSchema,
+        "product_variation": ProductVariationImportSchema,
+    }
+    TARGETS = {
+        "variation": Variation,
+        "variation_line": VariationLine,
+        "product": Product,
+        "product_item": ProductItem,
+        "product_variation": product_variation,
+    }
+
+    def __init__(self, kind: str, chunk_size: int = config.IMPORT_CHUNK_SIZE) -> None:
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.schema = self.SCHEMAS[kind](many=True)
+        self.target = self.TARGETS[kind]
+        self.resolve = getattr(self, f"_resolve_{kind}")
+        self.result = {
+            "kind": kind,
+            "total": 0,
+            "inserted": 0,
+            "failed": 0,
+            "errors": [],
+        }
+        self._load_maps()
+
+    def run(self, rows: Iterable[RawRow]) -> dict:
+        for chunk in _chunks(rows, self.chunk_size):
+            self._import_chunk(chunk)
+        return self.result
+
+    def _import_chunk(self, chunk: list) -> None:
+        self.result["total"] += len(chunk)
+        try:
+            loaded = self.schema.load([row for _, row, error in chunk if error is None])
+            messages = {}
+        except ValidationError as err:
+            loaded, messages = err.valid_data, err.messages
+
+        mappings, numbers, keys = [], [], {}
+        index = -1
+        for number, _, error in chunk:
+            if error is not None:
+                self._fail(number, {"_row": [error]})
+                continue
+            index += 1  # position in the loaded rows
+            if index in messages:
+                self._fail(number, messages[index])
+                continue
+            mapping, key, error = self.resolve(loaded[index])
+            if error is None and (key in self.keys or key in keys):
+                error = "Already exists."
+            if error is not None:
+                self._fail(number, {"_row": [error]})
+                continue
+            mappings.append(mapping)
+            numbers.append(number)
+            keys[key] = number
+
+        if not mappings:
+            return
+        try:
+            if self.kind == "product":
+                product_ids = db.session.scalars(insert(Product).returning(Product.id), mappings).all()
+            else:
+                db.session.execute(insert(self.target), mappings)
+                product_ids = [mapping["product_id"] for mapping in mappings] if self.kind == "product_item" else []
+            # bulk inserts skip the flush events, index the chunk in the same transaction
+            search_index.reindex(db.session, product_ids)
+            if self.kind == "product_variation":
+                apply_deltas(db.session, self._facet_deltas(mappings))
+            db.session.commit()
+        except SQLAlchemyError as err:
+            db.session.rollback()
+            for number in numbers:
+                self._fail(number, {"_row": [f"Database error: {getattr(err, 'orig', err)}"]})
+            return
+
+        if self.kind in ("variation", "variation_line"):
+            # once committed: a GET in between would cache the old rows under the new version
+            response_cache.invalidate("variation")
+        self.keys.update(keys)
+        self.result["inserted"] += len(mappings)
+
+    def _facet_deltas(self, mappings: list) -> dict:
+        categories = {id: category_id for id, category_id in self.items.values()}
+        deltas = {}
+        for mapping in mappings:
+            key = (categories[mapping["product_item_id"]], mapping["variation_line_id"])
+            deltas[key] = deltas.get(key, 0) + 1
+        return deltas
+
+    def _fail(self, number: int, errors: dict) -> None:
+        self.result["failed"] += 1
+        if len(self.result["errors"]) < config.IMPORT_MAX_ERRORS:
+            self.result["errors"].append({"row": number, "errors": errors})
+
+    """
+    Lookup maps, only the columns we need
+    """
+    def _rows(self, *columns) -> list:
+        return db.session.execute(select(*columns)).all()
+
+    def _load_maps(self) -> None:
+        self.categories = {name: id for id, name in self._rows(ProductCategory.id, ProductCategory.name)}
+        if self.kind == "variation":
+            self.keys = {
+                (category_id, name): id
+                for id, category_id, name in self._rows(Variation.id, Variation.category_id, Variation.name)
+            }
+        elif self.kind == "variation_line":
+            self.variations = {
+                (category_id, name): id
+                for id, category_id, name in self._rows(Variation.id, Variation.category_id, Variation.name)
+            }
+            self.keys = {
+                (variation_id, name): id
+                for id, variation_id, name in self._rows(VariationLine.id, VariationLine.variation_id, VariationLine.name)
+            }
+        elif self.kind == "product":
+            self.keys = {
+                (category_id, name): id
+                for id, category_id, name in self._rows(Product.id, Product.category_id, Product.name)
+            }
+        elif self.kind == "product_item":
+            self.products = {
+                (category_id, name): id
+                for id, category_id, name in self._rows(Product.id, Product.category_id, Product.name)
+            }
+            self.keys = {sku: id for id, sku in self._rows(ProductItem.id, ProductItem.sku) if sku}
+        elif self.kind == "product_variation":
+            # product items by sku, with the category their variations belong to
+            self.items = {
+                sku: (id, category_id)
+                for id, sku, category_id in db.session.execute(
+                    select(ProductItem.id, ProductItem.sku, Product.category_id)
+                    .join(Product, ProductItem.product_id == Product.id)
+                ).all()
+                if sku
+            }
+            # variation lines of a category, by (variation name, line name)
+            self.lines = {
+                (category_id, variation, name): id
+                for id, name, variation, category_id in db.session.execute(
+                    select(VariationLine.id, VariationLine.name, Variation.name, Variation.category_id)
+                    .join(Variation, VariationLine.variation_id == Variation.id)
+                ).all()
+            }
+            self.keys = {
+                (item_id, line_id): None
+                for item_id, line_id in self._rows(
+                    product_variation.c.product_item_id, product_variation.c.variation_line_id
+                )
+            }
+
+    """
+    Row resolvers: return (insert mapping, natural key, error)
+    """
+    def _category_id(self, data: dict) -> Optional[int]:
+        return self.categories.get(data["category"])
+
+    def _resolve_variation(self, data: dict):
+        category_id = self._category_id(data)
+        if category_id is None:
+            return None, None, f"Unknown category '{data['category']}'."
+        mapping = {"category_id": category_id, "name": data["name"]}
+        return mapping, (category_id, data["name"]), None
+
+    def _resolve_variation_line(self, data: dict):
+        category_id = self._category_id(data)
+        if category_id is None:
+            return None, None, f"Unknown category '{data['category']}'."
+        variation_id = self.variations.get((category_id, data["variation"]))
+        if variation_id is None:
+            return None, None, f"Unknown variation '{data['variation']}' in category '{data['category']}'."
+        mapping = {"variation_id": variation_id, "name": data["name"]}
+        return mapping, (variation_id, data["name"]), None
+
+    def _resolve_product(self, data: dict):
+        category_id = self._category_id(data)
+        if category_id is None:
+            return None, None, f"Unknown category '{data['category']}'."
+        mapping = {
+            "category_id": category_id,
+            "name": data["name"],
+            "description": data.get("description"),
+        }
+        return mapping, (category_id, data["name"]), None
+
+    def _resolve_product_item(self, data: dict):
+        category_id = self._category_id(data)
+        if category_id is None:
+            return None, None, f"Unknown category '{data['category']}'."
+        product_id = self.products.get((category_id, data["product"]))
+        if product_id is None:
+            return None, None, f"Unknown product '{data['product']}' in category '{data['category']}'."
+        mapping = {
+            "product_id": product_id,
+            "sku": data["sku"],
+            "price": data["price"],
+            "qty_in_stock": data["qty_in_stock"],
+        }
+        return mapping, data["sku"], None
+
+    def _resolve_product_variation(self, data: dict):
+        item = self.items.get(data["sku"])
+        if item is None:
+            return None, None, f"Unknown sku '{data['sku']}'."
+        item_id, category_id = item
+        line_id = self.lines.get((category_id, data["variation"], data["value"]))
+        if line_id is None:
+            return None, None, f"Unknown variation '{data['variation']}: {data['value']}' for sku '{data['sku']}'."
+        mapping = {"product_item_id": item_id, "variation_line_id": line_id}
+        return mapping, (item_id, line_id), None
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from typing import Dict, List, Tuple
+
+from db import db
+from models.product_category import ProductCategory
+import config
+
+class _Snapshot:
+    """Every lookup of the category tree precomputed from one query"""
+    def __init__(self, rows: list) -> None:
+        self.nodes: Dict[int, dict] = {
+            row.id: {"id": row.id, "name": row.name, "parent_category_id": row.parent_category_id}
+            for row in rows
+        }
+        self.children: Dict[int, List[int]] = {id: [] for id in self.nodes}
+        for node in self.nodes.values():
+            parent_id = node["parent_category_id"]
+            if parent_id in self.children:
+                self.children[parent_id].append(node["id"])
+
+        self.breadcrumbs: Dict[int, Tuple[dict, ...]] = {}
+        for id in self.nodes:
+            self.breadcrumbs[id] = tuple(self.nodes[ancestor] for ancestor in self._ancestors(id))
+
+        descendants: Dict[int, List[int]] = {id: [] for id in self.nodes}
+        for id, breadcrumb in self.breadcrumbs.items():
+            for ancestor in breadcrumb[:-1]:
+                descendants[ancestor["id"]].append(id)
+        self.descendants: Dict[int, Tuple[int, ...]] = {id: tuple(ids) for id, ids in descendants.items()}
+
+    def _ancestors(self, id: int) -> List[int]:
+        """Ids from the root down to id (included)"""
+        ids = []
+        seen = set()
+        while id is not None and id in self.nodes and id not in seen:
+            seen.add(id)
+            ids.append(id)
+            id = self.nodes[id]["parent_category_id"]
+        return ids[::-1]
+
+class CategoryTree:
+    """
+    Process level cache of the whole product category tree.
+    Rebuilt lazily after invalidate() or once the TTL has passed, so writes from
+    other processes are picked up eventually. A category missing from the tree is
+    looked up in the database before being called unknown, and the tree is rebuilt
+    if it's there: a category created by another process is usable right away.
+    """
+    def __init__(self, ttl: int = config.CATEGORY_TREE_TTL) -> None:
+        self.ttl = ttl
+        self._snapshot = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _get_snapshot(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires_at:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or time.monotonic() >= self._expires_at:
+                rows = db.session.query(
+                    ProductCategory.id,
+                    ProductCategory.name,
+                    ProductCategory.parent_category_id,
+                ).all()
+                self._snapshot = _Snapshot(rows)
+                self._expires_at = time.monotonic() + self.ttl
+            return self._snapshot
+
+    def _get_snapshot_with(self, id: int) -> _Snapshot:
+        """Snapshot that has id if the category exists, rebuilt if it was added after it was taken"""
+        snapshot = self._get_snapshot()
+        if id in snapshot.nodes:
+            return snapshot
+        # one primary key lookup, unknown ids don't trigger a rebuild
+        if db.session.query(ProductCategory.id).filter_by(id=id).first() is None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._snapshot = None
+        return self._get_snapshot()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def exists(self, id: int) -> bool:
+        return id in self._get_snapshot_with(id).nodes
+
+    def get(self, id: int) -> dict:
+        return self._get_snapshot_with(id).nodes.get(id)
+
+    def children(self, id: int) -> List[dict]:
+        snapshot = self._get_snapshot_with(id)
+        return [snapshot.nodes[child] for child in snapshot.children.get(id, ())]
+
+    def descendant_ids(self, id: int) -> Tuple[int, ...]:
+        """Ids of every category below id (id itself excluded)"""
+        return self._get_snapshot_with(id).descendants.get(id, ())
+
+    def descendants(self, id: int) -> List[dict]:
+        snapshot = self._get_snapshot_with(id)
+        return [snapshot.nodes[descendant] for descendant in snapshot.descendants.get(id, ())]
+
+    def breadcrumb(self, id: int) -> List[dict]:
+        """Categories from the root down to id"""
+        return list(self._get_snapshot_with(id).breadcrumbs.get(id, ()))
+
+category_tree = CategoryTree()
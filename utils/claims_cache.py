@@ -0,0 +1,61 @@
+import threading
+import time
+
+from typing import Any, Callable, Dict, Tuple
+
+import config
+
+class ClaimsCache:
+    """
+    Keep the additional JWT claims of each user in memory so issuing a token
+    (login / refresh) does not need to query the user and role tables every time.
+    Entries expire after `ttl` seconds and must be invalidated whenever the role
+    of a user changes.
+    """
+    def __init__(self, ttl: int = config.CLAIMS_CACHE_TTL) -> None:
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+        self._generation = 0  # bumped on every invalidation
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Any, loader: Callable[[Any], dict]) -> dict:
+        """Return cached claims of user_id, calling loader(user_id) on a miss"""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        claims = loader(user_id)
+
+        with self._lock:
+            # Do not store claims that were loaded before an invalidation happened
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, claims)
+        return claims
+
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+claims_cache = ClaimsCache()
@@ -0,0 +1,174 @@
+import csv
+import io
+import json
+import zlib
+
+from flask import Response as FlaskResponse, stream_with_context
+from sqlalchemy import select
+from typing import Iterable, Iterator, List, Tuple
+
+import config
+from db import db
+from models import (
+    UserModel,
+    RoleModel,
+    AddressModel,
+    CountryModel,
+    Product,
+    ProductItem,
+    ProductCategory,
+    Variation,
+    VariationLine,
+)
+from models.variation_line import product_variation
+
+EXPORT_DATASETS = ("users", "addresses", "products")
+EXPORT_FORMATS = ("csv", "ndjson")
+
+"""
+Sources: return the columns of a dataset and its rows as lists of dicts, one list per database round-trip.
+Only the exported columns are selected (no ORM objects) and the result is read with
+yield_per, so a chunk is all we ever hold in memory.
+"""
+def _columns(statement) -> List[str]:
+    return [column.key for column in statement.selected_columns]
+
+def _chunks(statement, chunk_size: int) -> Iterator[List[dict]]:
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+def _users(chunk_size: int) -> Tuple[List[str], Iterator[List[dict]]]:
+    statement = (
+        select(
+            UserModel.id,
+            UserModel.first_name,
+            UserModel.last_name,
+            UserModel.email_address,
+            UserModel.phone_number,
+            UserModel.status,
+            RoleModel.name.label("role"),
+        )
+        .join(RoleModel, UserModel.role_id == RoleModel.id)
+        .order_by(UserModel.id)
+    )
+    return _columns(statement), _chunks(statement, chunk_size)
+
+def _addresses(chunk_size: int) -> Tuple[List[str], Iterator[List[dict]]]:
+    statement = (
+        select(
+            AddressModel.id,
+            AddressModel.street_number,
+            AddressModel.address_line1,
+            AddressModel.city,
+            AddressModel.postal_code,
+            CountryModel.country_name.label("country"),
+        )
+        .join(CountryModel, AddressModel.country_id == CountryModel.id)
+        .order_by(AddressModel.id)
+    )
+    return _columns(statement), _chunks(statement, chunk_size)
+
+def _products(chunk_size: int) -> Tuple[List[str], Iterator[List[dict]]]:
+    """One row per product item (or per product without items), with its variations"""
+    statement = (
+        select(
+            Product.id.label("product_id"),
+            ProductCategory.name.label("category"),
+            Product.name.label("product"),
+            Product.description,
+            ProductItem.id.label("product_item_id"),
+            ProductItem.sku,
+            ProductItem.price,
+            ProductItem.qty_in_stock,
+        )
+        .join(ProductCategory, Product.category_id == ProductCategory.id)
+        .outerjoin(ProductItem, ProductItem.product_id == Product.id)
+        .order_by(Product.id, ProductItem.id)
+    )
+    return _columns(statement) + ["variations"], _with_variations(_chunks(statement, chunk_size))
+
+def _with_variations(chunks: Iterator[List[dict]]) -> Iterator[List[dict]]:
+    for chunk in chunks:
+        # one query for the variations of the whole chunk
+        item_ids = [row["product_item_id"] for row in chunk if row["product_item_id"] is not None]
+        variations = {}
+        if item_ids:
+            lines = db.session.execute(
+                select(product_variation.c.product_item_id, Variation.name, VariationLine.name)
+                .join(VariationLine, product_variation.c.variation_line_id == VariationLine.id)
+                .join(Variation, VariationLine.variation_id == Variation.id)
+                .where(product_variation.c.product_item_id.in_(item_ids))
+                .order_by(Variation.name, VariationLine.name)
+            )
+            for item_id, variation, value in lines:
+                variations.setdefault(item_id, []).append({"variation": variation, "value": value})
+        for row in chunk:
+            row["variations"] = variations.get(row["product_item_id"], [])
+        yield chunk
+
+SOURCES = {
+    "users": _users,
+    "addresses": _addresses,
+    "products": _products,
+}
+
+"""
+Encoders: turn the chunks of rows into text, one piece per chunk
+"""
+def _csv_value(value):
+    if isinstance(value, list):
+        return ";".join(f"{item['variation']}={item['value']}" for item in value)  # e.g: Size=M;Color=Red
+    return value
+
+def encode_csv(columns: List[str], chunks: Iterable[List[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for chunk in chunks:
+        for row in chunk:
+            writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # header of an empty export
+
+def encode_ndjson(columns: List[str], chunks: Iterable[List[dict]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk)
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+}
+
+def gzip_chunks(pieces: Iterable[str], level: int = config.EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress a stream of text piece by piece into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip header
+    for piece in pieces:
+        data = compressor.compress(piece.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(dataset: str, format: str, gzip: bool = True, chunk_size: int = config.EXPORT_CHUNK_SIZE) -> FlaskResponse:
+    """
+    Download a whole dataset as CSV or NDJSON (optionally gzipped).
+    source -> encoder -> gzip is a chain of generators: memory stays flat whatever the size
+    of the export, and rows are sent as soon as they are read.
+    """
+    columns, chunks = SOURCES[dataset](chunk_size)
+    pieces = ENCODERS[format](columns, chunks)
+    filename = f"{dataset}.{format}"
+    mimetype = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        pieces = gzip_chunks(pieces)
+        filename += ".gz"
+        mimetype = "application/gzip"
+
+    return FlaskResponse(
+        stream_with_context(pieces),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,153 @@
+from collections import defaultdict
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from typing import Dict, Iterable, Tuple
+
+from db import db, increment, RoutingSession
+from models.product import Product
+from models.product_item import ProductItem
+from models.variation_facet import VariationFacet
+from models.variation_line import VariationLine, product_variation
+
+# (category id, variation line id) -> change of the number of product items
+Deltas = Dict[Tuple[int, int], int]
+
+facet_table = VariationFacet.__table__
+
+def apply_deltas(session, deltas: Deltas) -> None:
+    """Add the deltas to the facet counts, in the current transaction of session"""
+    connection = session.connection()
+    for (category_id, line_id), delta in deltas.items():
+        if not delta or category_id is None or line_id is None:
+            continue
+        if delta > 0:
+            # upsert: two transactions adding the first item of a facet must not both insert it
+            increment(connection, facet_table, {"category_id": category_id, "variation_line_id": line_id}, "count", delta)
+        else:
+            connection.execute(
+                update(facet_table)
+                .where(facet_table.c.category_id == category_id, facet_table.c.variation_line_id == line_id)
+                .values(count=facet_table.c.count + delta)
+            )
+
+def count_all(connection) -> Deltas:
+    """Facet counts computed from scratch"""
+    rows = connection.execute(
+        select(Product.category_id, product_variation.c.variation_line_id, func.count())
+        .select_from(product_variation)
+        .join(ProductItem, product_variation.c.product_item_id == ProductItem.id)
+        .join(Product, ProductItem.product_id == Product.id)
+        .group_by(Product.category_id, product_variation.c.variation_line_id)
+    )
+    return {(category_id, line_id): count for category_id, line_id, count in rows}
+
+def repair(connection) -> int:
+    """Compare the stored counts with a full recount, fix the rows that drifted and return how many"""
+    expected = count_all(connection)
+    stored = {
+        (category_id, line_id): count
+        for category_id, line_id, count in connection.execute(
+            select(facet_table.c.category_id, facet_table.c.variation_line_id, facet_table.c.count)
+        )
+    }
+    fixed = 0
+    for key, count in stored.items():
+        if key not in expected and count == 0:
+            continue  # left at 0 by the deltas, same as no row
+        if key not in expected:
+            connection.execute(
+                delete(facet_table)
+                .where(facet_table.c.category_id == key[0], facet_table.c.variation_line_id == key[1])
+            )
+            fixed += 1
+        elif expected[key] != count:
+            connection.execute(
+                update(facet_table)
+                .where(facet_table.c.category_id == key[0], facet_table.c.variation_line_id == key[1])
+                .values(count=expected[key])
+            )
+            fixed += 1
+    missing = [
+        {"category_id": key[0], "variation_line_id": key[1], "count": count}
+        for key, count in expected.items() if key not in stored
+    ]
+    if missing:
+        connection.execute(insert(facet_table), missing)
+    return fixed + len(missing)
+
+"""
+Session hooks: the changes of product_variation are worked out before the flush
+(from the relationship history and, for deleted items, from the rows about to go)
+and written right after it, in the same transaction.
+"""
+def _category_id(session, item: ProductItem):
+    # product_id first, the relationship isn't refreshed when only the foreign key is set
+    product = item.product if item.product_id is None else session.get(Product, item.product_id)
+    return product.category_id if product is not None else None
+
+def _stored_lines(session, item_ids: Iterable[int]) -> list:
+    """(item id, line id, category id) of items as they are in the database"""
+    return session.connection().execute(
+        select(product_variation.c.product_item_id, product_variation.c.variation_line_id, Product.category_id)
+        .join(ProductItem, product_variation.c.product_item_id == ProductItem.id)
+        .join(Product, ProductItem.product_id == Product.id)
+        .where(product_variation.c.product_item_id.in_(list(item_ids)))
+    ).all()
+
+def _before_flush(session, flush_context, instances) -> None:
+    deltas = defaultdict(int)  # (category id, VariationLine or line id) -> delta
+    moved = set()  # items changing category, their stored lines move along
+
+    for obj in session.dirty:
+        if isinstance(obj, Product) and inspect(obj).attrs.category_id.history.deleted:
+            moved.update(item.id for item in obj.product_items if item.id is not None)
+        elif isinstance(obj, ProductItem) and inspect(obj).attrs.product_id.history.deleted:
+            moved.add(obj.id)
+
+    items = {obj.id: obj for obj in session.identity_map.values() if isinstance(obj, ProductItem)}
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, ProductItem)}
+    if moved or deleted:
+        for item_id, line_id, stored_category_id in _stored_lines(session, moved | deleted):
+            item = items.get(item_id)
+            if item_id in moved:
+                deltas[(stored_category_id, line_id)] -= 1
+                deltas[(_category_id(session, item), line_id)] += 1
+            if item_id in deleted:
+                # current category, after any move in the same flush
+                deltas[(_category_id(session, item) if item is not None else stored_category_id, line_id)] -= 1
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, ProductItem) and obj not in session.deleted:
+            history = inspect(obj).attrs.variation_lines.history
+            for line in history.added or ():
+                deltas[(_category_id(session, obj), line)] += 1
+            for line in history.deleted or ():
+                deltas[(_category_id(session, obj), line)] -= 1
+
+    session.info["facet_deltas"] = deltas
+    session.info["facet_deleted_lines"] = [
+        obj.id for obj in session.deleted if isinstance(obj, VariationLine)
+    ]
+
+def _after_flush(session, flush_context) -> None:
+    deltas = defaultdict(int)
+    for (category_id, line), delta in session.info.pop("facet_deltas", {}).items():
+        # new lines have their id now
+        deltas[(category_id, line.id if isinstance(line, VariationLine) else line)] += delta
+    apply_deltas(session, deltas)
+
+    deleted_lines = session.info.pop("facet_deleted_lines", None)
+    if deleted_lines:
+        session.connection().execute(delete(facet_table).where(facet_table.c.variation_line_id.in_(deleted_lines)))
+
+def init_facets(app) -> None:
+    """Hook the session events and register the repair command"""
+    if not event.contains(RoutingSession, "before_flush", _before_flush):
+        event.listen(RoutingSession, "before_flush", _before_flush)
+        event.listen(RoutingSession, "after_flush", _after_flush)
+
+    @app.cli.command("facets-rebuild")
+    def facets_rebuild():
+        """Recount the variation facets from scratch and fix the stored counts"""
+        with db.engine.begin() as connection:
+            fixed = repair(connection)
+        print(f"Variation facets rebuilt, {fixed} counts fixed.")
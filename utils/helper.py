@@ -1,5 +1,7 @@
 import socket
 
+from utils.pagination import encode_cursor
+
 DEFAULT_ERROR_MESSAGE = "An unexpected error occurred."
 DEFAULT_SUCCESS_MESSAGE = "Query Successful"
 
@@ -15,15 +17,19 @@ class Response:
         self.status = status
         self.data = data
         self.message = message
+        self.next_cursor = None
 
     @property
     def json(self) -> dict:
-        return {
+        res = {
             "code": self.code,
             "status": self.status,
             "message": self.message,
             "data": self.data
         }
+        if self.next_cursor is not None:
+            res["next_cursor"] = self.next_cursor
+        return res
 
     def without_data(self) -> dict:
         return {
@@ -41,6 +47,13 @@ class Response:
         )
         return res, 201
 
+    @classmethod
+    def page(cls, rows: list, next_id: int = None, message: str = DEFAULT_SUCCESS_MESSAGE) -> "Response":
+        """Response for one page returned by Model.find_page()"""
+        res = cls(data=rows, message=message)
+        res.next_cursor = encode_cursor(next_id)
+        return res
+
     @classmethod
     def unimplemented(cls) -> "Response":
         res = cls(
@@ -85,3 +98,21 @@ class Response:
             message="Permission denied. Please contact admin."
         )
         return res, 403
+
+    @classmethod
+    def service_unavailable(cls, message: str = DEFAULT_ERROR_MESSAGE) -> "Response":
+        res = cls(
+            code=503,
+            status="Service Unavailable",
+            message=message,
+        )
+        return res, 503
+
+    @classmethod
+    def conflict(cls, message: str = DEFAULT_ERROR_MESSAGE) -> "Response":
+        res = cls(
+            code=409,
+            status="Conflict",
+            message=message,
+        )
+        return res, 409
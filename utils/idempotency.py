@@ -0,0 +1,121 @@
+import hashlib
+import itertools
+
+from functools import wraps
+from flask import Response as FlaskResponse, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from typing import Callable, Optional, Tuple
+
+import config
+from db import db
+from models.idempotency_key import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+_stored = itertools.count(1)
+
+def _sha256(value: bytes) -> str:
+    return hashlib.sha256(value).hexdigest()
+
+def _owner() -> str:
+    """Keys are per user, two users can't see each other's responses"""
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:  # route without @jwt_required()
+        return ""
+    return "" if identity is None else str(identity)
+
+def _error(code: int, status: str, message: str) -> FlaskResponse:
+    response = jsonify({"code": code, "status": status, "message": message})
+    response.status_code = code
+    return response
+
+def _replay(record: IdempotencyKey, fingerprint: str) -> FlaskResponse:
+    if record.fingerprint != fingerprint:
+        return _error(422, "Unprocessable Entity", f"{HEADER} was already used for a different request.")
+    if record.status_code is None:
+        return _error(409, "Conflict", f"A request with this {HEADER} is still being processed.")
+    response = FlaskResponse(record.body, status=record.status_code, mimetype=record.mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def _claim(key: str, fingerprint: str) -> Tuple[Optional[IdempotencyKey], Optional[FlaskResponse]]:
+    """Insert the key for this request, or return the response to give if it's already there"""
+    for _ in range(2):
+        record = IdempotencyKey.find_by_key(key)
+        if record is not None and record.expired:
+            db.session.delete(record)
+            db.session.flush()
+            record = None
+        if record is not None:
+            return None, _replay(record, fingerprint)
+
+        record = IdempotencyKey(key=key, fingerprint=fingerprint)
+        db.session.add(record)
+        try:
+            db.session.flush()
+            return record, None
+        except IntegrityError:
+            # the same key sent concurrently, committed by now: look again
+            db.session.rollback()
+    return None, _error(409, "Conflict", f"A request with this {HEADER} is still being processed.")
+
+def _discard(record: IdempotencyKey) -> None:
+    """Forget the key of a request that didn't succeed, so that its retry runs again"""
+    session = db.session()
+    if session.info.get("deferred"):
+        # unit of work: rolled back with the request unless the response was successful.
+        # Gone already if the view rolled back itself (e.g: on OutOfStock)
+        if session.is_active and inspect(record).persistent:
+            session.delete(record)
+            session.flush()
+        return
+    session.rollback()
+    session.query(IdempotencyKey).filter_by(key=record.key).delete()
+    session.commit()
+
+def idempotent(view: Callable) -> Callable:
+    """
+    Decorator for a POST view, put it right under @jwt_required() (above @blp.arguments() otherwise).
+    A request with an Idempotency-Key header runs once: retries with the same key and body get the
+    stored response back in one lookup, for IDEMPOTENCY_KEY_TTL. The key is stored in the same
+    transaction as the changes of the request, so either both are kept or neither is.
+    Only successful responses are stored, a failed request can be retried with the same key.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        value = request.headers.get(HEADER)
+        if not value:
+            return view(*args, **kwargs)
+        if len(value) > config.IDEMPOTENCY_KEY_MAX_LENGTH:
+            return _error(400, "Bad Request", f"{HEADER} is too long.")
+
+        key = _sha256(f"{_owner()}\n{request.method}\n{request.path}\n{value}".encode("utf-8"))
+        record, response = _claim(key, _sha256(request.get_data()))
+        if response is not None:
+            return response
+
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            _discard(record)
+            raise
+        if (
+            not isinstance(response, FlaskResponse)
+            or response.status_code >= 400
+            or response.is_streamed
+            or not db.session.is_active
+        ):
+            _discard(record)
+            return response
+
+        record.status_code = response.status_code
+        record.mimetype = response.mimetype
+        record.body = response.get_data()
+        if next(_stored) % config.IDEMPOTENCY_PURGE_EVERY == 0:
+            IdempotencyKey.purge_expired()
+        db.session.commit()
+        return response
+    return wrapper
@@ -1,14 +1,27 @@
+import base64
+import hashlib
+import hmac
 import os
 import re
 import socket
+import tempfile
+import threading
+import time
 
-from typing import Union
+from collections import OrderedDict
+from typing import Tuple, Union
+from urllib.parse import urlencode
+from sqlalchemy import event, select
 from werkzeug.datastructures import FileStorage
-from flask_uploads import UploadSet, IMAGES
+from flask_uploads import UploadSet, UploadNotAllowed, IMAGES
 
 from config import *
+from db import db, on_commit
+from models.image import Image
+from models.image_blob import ImageBlob
 
 IMAGE_SET = UploadSet("images", IMAGES)  # set name and allowed extensions
+PRODUCT_IMAGE_FOLDER = "product_images"  # static/images/product_images
 
 def save_image(image: FileStorage, folder: str=None, name: str=None) -> str:
     """Takes FileStorage and saves it to a folder"""
@@ -16,8 +29,106 @@ def save_image(image: FileStorage, folder: str=None, name: str=None) -> str:
 
 def get_path(filename: str=None, folder: str=None):
     """Take image name and folder and return full path"""
+    if filename and is_content_addressed(filename):
+        filename = shard_path(filename)
     return IMAGE_SET.path(filename, folder)
 
+def shard_path(filename: str) -> str:
+    """
+    Content addressed files are spread over sub folders named after the hash.
+    e.g: shard_path('3f9a...e1.jpg') returns '3f/9a/3f9a...e1.jpg'
+    """
+    return os.path.join(filename[:2], filename[2:4], filename)
+
+def save_content_addressed(image: FileStorage, folder: str) -> Tuple[str, bool]:
+    """
+    Save the upload under the sha256 of its content, hashing while it is written to disk.
+    Return the filename and whether the content was new (False if the file already existed).
+    """
+    filename, tmp_path = write_temporary(image, folder)
+    return filename, place_temporary(tmp_path, filename, folder)
+
+def write_temporary(image: FileStorage, folder: str) -> Tuple[str, str]:
+    """
+    First half of save_content_addressed(): write the upload to a temporary file while hashing it.
+    Return the content addressed filename and the temporary path, to give to place_temporary().
+    """
+    basename = get_basename(image)
+    if not IMAGE_SET.file_allowed(image, basename):
+        raise UploadNotAllowed()
+    extension = get_extension(basename)[1:].lower()
+
+    tmp_folder = IMAGE_SET.path(".tmp", folder)
+    os.makedirs(tmp_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=tmp_folder, delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: image.stream.read(64 * 1024), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            # client gone, disk full...
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return f"{digest.hexdigest()}.{extension}", tmp.name
+
+def place_temporary(tmp_path: str, filename: str, folder: str) -> bool:
+    """
+    Second half of save_content_addressed(): move the temporary file to its content addressed path,
+    or drop it if the content is already there. Return whether the content was new.
+    Take the reference to the file (the Image row) before: the last reference given back
+    in between would remove the file found here.
+    """
+    path = get_path(filename, folder)
+    if os.path.isfile(path):
+        os.remove(tmp_path)
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    store_etag(path, os.path.splitext(filename)[0])
+    return True
+
+def discard_temporary(tmp_path: str) -> None:
+    if os.path.isfile(tmp_path):
+        os.remove(tmp_path)
+
+def remove_image(path: str) -> None:
+    """Delete an image with its variants and ETags"""
+    if os.path.isfile(path):
+        os.remove(path)
+    forget_etag(path)
+    remove_variants(path)
+
+@event.listens_for(Image, "after_insert")
+def _acquire_image_blob(mapper, connection, target) -> None:
+    """
+    Every Image row holds a reference to its file, taken in the transaction inserting the row.
+    Files uploaded without a product item have no reference, they are removed by DELETE /image.
+    """
+    if is_content_addressed(target.name):
+        ImageBlob.acquire(target.name, connection=connection)
+
+@event.listens_for(Image, "after_delete")
+def _release_image_blob(mapper, connection, target) -> None:
+    """
+    The reference is given back when the row is deleted (directly or with its ProductItem).
+    The last one removes the file once committed.
+    """
+    if is_content_addressed(target.name) and ImageBlob.release(target.name, connection=connection):
+        filename = target.name
+        on_commit(lambda: _remove_unreferenced(filename))
+
+def _remove_unreferenced(filename: str) -> None:
+    # unless an upload of the same content took a new reference since
+    with db.engine.connect() as connection:
+        referenced = connection.execute(
+            select(ImageBlob.id).where(ImageBlob.filename == filename)
+        ).first() is not None
+    if not referenced:
+        remove_image(get_path(filename, PRODUCT_IMAGE_FOLDER))
+
 def find_image_any_format(filename: str, folder: str) -> Union[str, None]:
     """Takes a filename and returns an image on any of the accepted formats."""
     for _format in IMAGES:
@@ -27,6 +138,125 @@ def find_image_any_format(filename: str, folder: str) -> Union[str, None]:
             return image_path
     return None
 
+def derivative_name(filename: str, variant: str, format: str = None) -> str:
+    """
+    Return the filename of a resized variant.
+    e.g: derivative_name('shoe.jpg', 'thumbnail', 'webp') returns 'shoe_thumbnail.webp'
+    """
+    stem, extension = os.path.splitext(filename)
+    extension = f".{format}" if format else extension
+    return f"{stem}_{variant}{extension}"
+
+def find_variant(path: str, variant: str = None, format: str = None) -> str:
+    """
+    Return the path of a generated variant of the image if it exists, else the original path.
+    A missing variant only means the background pipeline did not produce it (yet).
+    """
+    if variant is None:
+        return path
+    folder, filename = os.path.split(path)
+    candidate = os.path.join(folder, derivative_name(filename, variant, format))
+    if os.path.isfile(candidate):
+        return candidate
+    return path
+
+def remove_variants(path: str) -> None:
+    """Delete every generated variant of an image"""
+    folder, filename = os.path.split(path)
+    for variant in IMAGE_DERIVATIVES:
+        for format in (None, IMAGE_COMPACT_FORMAT):
+            candidate = os.path.join(folder, derivative_name(filename, variant, format))
+            if os.path.isfile(candidate):
+                os.remove(candidate)
+            forget_etag(candidate)
+
+# ETags are content hashes computed once (at upload) and stored next to the file
+# in "<image>.etag". The most recent ones are also kept in memory so that
+# revalidation requests are answered without touching the disk.
+ETAG_EXTENSION = ".etag"
+_etags = OrderedDict()  # path -> etag
+_etags_lock = threading.Lock()
+
+def _remember_etag(path: str, etag: str) -> None:
+    with _etags_lock:
+        _etags[path] = etag
+        _etags.move_to_end(path)
+        while len(_etags) > IMAGE_ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+
+def compute_etag(path: str) -> str:
+    """sha256 of the file content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store_etag(path: str, etag: str = None) -> str:
+    """Save the ETag of an image next to it and return it"""
+    etag = etag or compute_etag(path)
+    with open(path + ETAG_EXTENSION, "w") as file:
+        file.write(etag)
+    _remember_etag(path, etag)
+    return etag
+
+def get_etag(path: str) -> str:
+    """
+    Return the ETag of an image from memory, else from its ".etag" file.
+    Images uploaded before ETags existed get one computed and stored now.
+    Raise FileNotFoundError if the image does not exist.
+    """
+    with _etags_lock:
+        etag = _etags.get(path)
+    if etag is not None:
+        return etag
+    try:
+        with open(path + ETAG_EXTENSION) as file:
+            etag = file.read().strip()
+        _remember_etag(path, etag)
+        return etag
+    except FileNotFoundError:
+        return store_etag(path)
+
+def forget_etag(path: str) -> None:
+    with _etags_lock:
+        _etags.pop(path, None)
+    if os.path.isfile(path + ETAG_EXTENSION):
+        os.remove(path + ETAG_EXTENSION)
+
+CONTENT_ADDRESSED_REGEX = re.compile(r"^[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$")
+
+def is_content_addressed(filename: str) -> bool:
+    """Whether the name is a content hash, i.e: the file behind it can never change"""
+    return CONTENT_ADDRESSED_REGEX.match(filename) is not None
+
+def set_cache_headers(response, filename: str, fallback: bool = False, expires: int = None):
+    """
+    Long lived caching, immutable when the name is derived from the content.
+    fallback: the original is served in place of a variant that is not generated yet,
+    caches must revalidate it (its ETag changes once the variant exists).
+    expires: the request was authorized by a signed URL valid until then, only the client
+    may keep the response, and not after the signature expired.
+    """
+    response.cache_control.no_cache = None
+    if expires is None:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    if fallback:
+        response.cache_control.no_cache = True
+        return response
+
+    if is_content_addressed(filename):
+        max_age = IMAGE_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        max_age = IMAGE_CACHE_MAX_AGE_MUTABLE
+    if expires is not None:
+        max_age = min(max_age, max(0, expires - int(time.time())))
+    response.cache_control.max_age = max_age
+    return response
+
 def _retrieve_filename(file: Union[str, FileStorage]) -> str:
     """Take FileStorage and return the filename"""
     if isinstance(file, FileStorage):
@@ -68,11 +298,55 @@ def get_extension(file: Union[str, FileStorage]) -> str:
     filename = _retrieve_filename(file)
     return os.path.splitext(filename)[1]
 
+# Resolved once by configure_image_urls() instead of on every request
+_image_base_url = None
+_serve_from_storage = False
+
+def configure_image_urls(base_url: str = None) -> str:
+    """
+    Set the base of the image URLs.
+    base_url is a static file server / CDN origin serving the product image folder as-is;
+    without it the images are served by this API and the host address is looked up once.
+    """
+    global _image_base_url, _serve_from_storage
+    if base_url:
+        _image_base_url = base_url.rstrip("/")
+        _serve_from_storage = True
+    else:
+        #  get IP_ADDRESS
+        hostname = socket.gethostname()
+        ip_addr = socket.gethostbyname(hostname)
+        _image_base_url = f"{ip_addr}:{PORT}{API_PREFIX}/{API_VERSION}/image"
+        _serve_from_storage = False
+    return _image_base_url
+
+def check_image_url_secret(signing: bool, secret: str) -> None:
+    """Signatures are only as good as their secret: refuse to start signing without a real one"""
+    if signing and (not secret or len(secret) < 32):
+        raise RuntimeError("IMAGE_URL_SIGNING is on: set IMAGE_URL_SECRET to 32+ random characters")
+
+def sign_image_url(filename: str, expires: int) -> str:
+    message = f"{filename}:{expires}".encode()
+    digest = hmac.new(IMAGE_URL_SECRET.encode(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+def verify_image_signature(filename: str, expires: int, signature: str) -> bool:
+    if expires is None or signature is None or expires < time.time():
+        return False
+    return hmac.compare_digest(sign_image_url(filename, expires), signature)
+
 def get_image_url(filename: str) -> str:
-    #  get IP_ADDRESS
-    hostname = socket.gethostname()
-    ip_addr = socket.gethostbyname(hostname)
+    if _image_base_url is None:
+        configure_image_urls(IMAGE_BASE_URL)
+
+    path = filename
+    if _serve_from_storage and is_content_addressed(filename):
+        path = shard_path(filename).replace(os.sep, "/")
+    image_url = f"{_image_base_url}/{path}"
 
-    image_url = f"{ip_addr}:{PORT}{API_PREFIX}/{API_VERSION}/image/{filename}"
+    if IMAGE_URL_SIGNING:
+        expires = int(time.time()) + IMAGE_URL_TTL
+        query = urlencode({"expires": expires, "signature": sign_image_url(filename, expires)})
+        image_url = f"{image_url}?{query}"
 
     return image_url
\ No newline at end of file
@@ -0,0 +1,65 @@
+import os
+
+from flask import current_app
+from typing import List, Tuple
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:  # Pillow is optional, uploads then keep only the original
+    PILImage = None
+
+from config import *
+from utils.image_helper import derivative_name, store_etag
+from utils.jobs import task
+
+def _save(image, path: str, format: str) -> None:
+    if format in ("jpeg", "jpg") and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if format == IMAGE_COMPACT_FORMAT:
+        image.save(path, format=format, quality=IMAGE_COMPACT_QUALITY, method=4)
+    else:
+        image.save(path, optimize=True)
+
+def generate_derivatives(path: str) -> List[Tuple[str, str]]:
+    """
+    Write every size in IMAGE_DERIVATIVES next to the original image, in the
+    original format and in IMAGE_COMPACT_FORMAT.
+    Return a list of (variant, path) of the generated files.
+    """
+    if PILImage is None:
+        return []
+
+    folder, filename = os.path.split(path)
+    extension = os.path.splitext(filename)[1][1:].lower()
+    generated = []
+    with PILImage.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        for variant, size in IMAGE_DERIVATIVES.items():
+            resized = original.copy()
+            resized.thumbnail((size, size))
+            for format in (extension, IMAGE_COMPACT_FORMAT):
+                name = derivative_name(filename, variant, None if format == extension else format)
+                derivative_path = os.path.join(folder, name)
+                # already generated for an earlier upload of the same content
+                if not os.path.isfile(derivative_path):
+                    _save(resized, derivative_path, format)
+                    store_etag(derivative_path)
+                generated.append((variant, derivative_path))
+    return generated
+
+@task("image.derivatives")
+def process_derivatives(path: str, image_id: int = None) -> None:
+    """Job: generate the derivatives of an uploaded image and record them on its Image"""
+    from db import db
+    from models import ImageLine
+
+    generated = generate_derivatives(path)
+    if image_id is None:
+        return
+    # stored relative to the upload folder, like the names returned by IMAGE_SET.save
+    destination = os.path.abspath(current_app.config['UPLOADED_IMAGES_DEST'])
+    ImageLine.query.filter_by(image_id=image_id).delete()  # left by an earlier attempt
+    for variant, derivative_path in generated:
+        image_path = os.path.relpath(os.path.abspath(derivative_path), destination)
+        db.session.add(ImageLine(image_id=image_id, image_path=image_path, variant=variant))
+    db.session.commit()
@@ -0,0 +1,144 @@
+import itertools
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import traceback
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Tuple
+
+import config
+from db import db, on_commit
+from models.job import Job
+
+"""
+Background jobs without a broker: jobs are rows of the job table, added in the transaction
+of the request that wants them (nothing runs for a request that is rolled back) and taken
+by workers polling the table: `flask jobs-worker` processes, or a few threads of the web
+process itself (JOB_IN_PROCESS_WORKERS).
+"""
+TASKS: Dict[str, Tuple[Callable, int]] = {}  # name -> (function, max attempts)
+
+_wake = threading.Event()
+_worker_ids = itertools.count(1)
+_in_process_lock = threading.Lock()
+_in_process_started = False
+
+def task(name: str, max_attempts: int = config.JOB_MAX_ATTEMPTS) -> Callable:
+    """Register a function as a job, enqueue(name, **kwargs) runs it on a worker with kwargs"""
+    def decorator(func: Callable) -> Callable:
+        TASKS[name] = (func, max_attempts)
+        return func
+    return decorator
+
+def enqueue(name: str, user_id: int = None, delay: float = 0, **payload) -> Job:
+    """
+    Add a job (payload must be JSON), committed like save_to_db(): with the rest of the
+    request when it is a unit of work. Return the Job, its id can be given to the client.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown job '{name}'.")
+    _, max_attempts = TASKS[name]
+    run_at = datetime.utcnow() + timedelta(seconds=delay) if delay else None
+    job = Job(name=name, payload=payload, max_attempts=max_attempts, run_at=run_at, user_id=user_id)
+    job.save_to_db()
+    if config.JOB_IN_PROCESS_WORKERS:
+        from flask import current_app
+        start_in_process_workers(current_app._get_current_object())
+    on_commit(_wake.set)
+    return job
+
+def run(job_id: int) -> None:
+    """Run a claimed job, in the current app context"""
+    job = db.session.get(Job, job_id)
+    func, _ = TASKS.get(job.name, (None, None))
+    try:
+        if func is None:
+            raise KeyError(f"Unknown job '{job.name}'.")
+        func(**job.payload)
+    except Exception:
+        db.session.rollback()
+        job.fail(traceback.format_exc())
+    else:
+        job.finish()
+
+class Worker:
+    def __init__(self, app, name: str = None) -> None:
+        self.app = app
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{next(_worker_ids)}"
+        self.stopping = threading.Event()
+
+    def run_once(self) -> int:
+        """Claim and run one batch of due jobs, return how many"""
+        with self.app.app_context():
+            job_ids = Job.claim(self.name, limit=config.JOB_BATCH_SIZE)
+        for job_id in job_ids:
+            # a session per job, what one job leaves behind doesn't leak into the next
+            with self.app.app_context():
+                run(job_id)
+        return len(job_ids)
+
+    def run_forever(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                done = self.run_once()
+            except Exception:  # e.g: database unavailable, try again on the next poll
+                traceback.print_exc()
+                done = 0
+            if not done:
+                _wake.wait(config.JOB_POLL_INTERVAL)
+                _wake.clear()
+
+def _run_threads(app, threads: int) -> None:
+    workers = [Worker(app) for _ in range(threads)]
+
+    def stop(signum, frame):
+        # the jobs being run are finished first
+        for worker in workers:
+            worker.stopping.set()
+        _wake.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    running = [threading.Thread(target=worker.run_forever, name=f"jobs-{index}") for index, worker in enumerate(workers)]
+    for thread in running:
+        thread.start()
+    for thread in running:
+        thread.join()
+
+def _run_child(app, threads: int) -> None:
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # the connections of the parent process can't be shared
+    _run_threads(app, threads)
+
+def run_workers(app, processes: int = 1, threads: int = 1) -> None:
+    """Worker pool of processes x threads, until SIGINT (Ctrl+C) or SIGTERM"""
+    if processes <= 1:
+        _run_threads(app, threads)
+        return
+    context = multiprocessing.get_context("fork")
+    children = [context.Process(target=_run_child, args=(app, threads)) for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    def stop(signum, frame):
+        for child in children:
+            child.terminate()  # SIGTERM: each child stops once its running jobs are done
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for child in children:
+        child.join()
+
+def start_in_process_workers(app) -> None:
+    """Worker threads in this process, for deployments without a jobs-worker"""
+    global _in_process_started
+    with _in_process_lock:
+        if _in_process_started:
+            return
+        _in_process_started = True
+    for index in range(config.JOB_IN_PROCESS_WORKERS):
+        threading.Thread(target=Worker(app).run_forever, name=f"jobs-in-process-{index}", daemon=True).start()
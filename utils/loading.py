@@ -0,0 +1,46 @@
+from functools import lru_cache
+from sqlalchemy.orm import ColumnProperty, defaultload, joinedload, selectinload
+from typing import Optional, Tuple
+
+LOADERS = {
+    "joined": joinedload,  # many-to-one, fetched in the same query
+    "selectin": selectinload,  # collections, one extra query per relationship
+}
+
+@lru_cache(maxsize=None)
+def loader_options(model, schema) -> tuple:
+    """
+    Build SQLAlchemy loader options from the `eager_loads` declared on a schema.
+    e.g: eager_loads = (("role", "joined"), ("addresses.country", "joined"))
+    """
+    options = []
+    for path, strategy in getattr(schema, "eager_loads", ()):
+        names = path.split(".")
+        option = None
+        cls = model
+        for index, name in enumerate(names):
+            attr = getattr(cls, name)
+            # only the last relationship of the path gets the declared strategy
+            loader = LOADERS[strategy] if index == len(names) - 1 else defaultload
+            if option is None:
+                option = loader(attr)
+            else:
+                option = getattr(option, loader.__name__)(attr)
+            cls = attr.property.mapper.class_
+        options.append(option)
+    return tuple(options)
+
+@lru_cache(maxsize=None)
+def column_names(model, schema) -> Optional[Tuple[str, ...]]:
+    """
+    Attributes to select for a schema made only of columns of the model (the Plain*Schema shape),
+    None when it needs anything else (relationships, computed fields).
+    """
+    names = []
+    for name, field in schema().dump_fields.items():
+        attribute = field.attribute or name
+        prop = model.__mapper__.attrs.get(attribute)
+        if not isinstance(prop, ColumnProperty):
+            return None
+        names.append(attribute)
+    return tuple(names)
@@ -0,0 +1,264 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+
+from flask import Response as FlaskResponse, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Dict, Tuple
+
+import config
+from utils.claims_cache import claims_cache
+from utils.response_cache import response_cache
+from utils.token_blocklist import token_blocklist
+
+"""
+Opt-in instrumentation (METRICS_ENABLED): wall time, SQL queries and their duration,
+serialization time and response size of every request, aggregated per endpoint and
+exposed in the Prometheus text format on METRICS_PATH. The numbers are per process,
+every worker process is scraped on its own. PROFILE_SAMPLE_RATE of the requests also
+run under cProfile, their profile is written to PROFILE_DIR.
+"""
+
+class RequestStats:
+    """What one request spent, kept in flask.g while it runs"""
+    __slots__ = ("start", "queries", "sql_seconds", "serialization_seconds", "profiler")
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.profiler = None
+
+def _current() -> "RequestStats":
+    if not has_request_context():  # job workers, CLI commands...
+        return None
+    return g.get("_metrics")
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class EndpointSeries:
+    __slots__ = ("duration", "queries", "sql_seconds", "serialization_seconds", "response_bytes")
+
+    def __init__(self) -> None:
+        self.duration = Histogram(config.METRICS_DURATION_BUCKETS)
+        self.queries = Histogram(config.METRICS_QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.response_bytes = 0
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    def __init__(self) -> None:
+        self.profiles = 0
+        self._requests: Dict[Tuple[str, str, int], int] = {}  # (method, endpoint, status) -> count
+        self._series: Dict[Tuple[str, str], EndpointSeries] = {}  # (method, endpoint) -> totals
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, endpoint: str, status: int, stats: RequestStats, duration: float, size: int) -> None:
+        with self._lock:
+            key = (method, endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            series = self._series.get((method, endpoint))
+            if series is None:
+                series = self._series[(method, endpoint)] = EndpointSeries()
+            series.duration.observe(duration)
+            series.queries.observe(stats.queries)
+            series.sql_seconds += stats.sql_seconds
+            series.serialization_seconds += stats.serialization_seconds
+            series.response_bytes += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._series.clear()
+            self.profiles = 0
+
+    def render(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help: str) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            metric("http_requests_total", "counter", "Requests handled.")
+            for (method, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",endpoint="{_label(endpoint)}",status="{status}"}} {count}'
+                )
+            series = sorted(self._series.items())
+            labels = {key: f'method="{key[0]}",endpoint="{_label(key[1])}"' for key, _ in series}
+
+            metric("http_request_duration_seconds", "histogram", "Wall time of the requests, commit included.")
+            for key, totals in series:
+                lines.extend(totals.duration.lines("http_request_duration_seconds", labels[key]))
+            metric("http_request_sql_queries", "histogram", "SQL queries run per request.")
+            for key, totals in series:
+                lines.extend(totals.queries.lines("http_request_sql_queries", labels[key]))
+            for name, attribute, help in (
+                ("http_request_sql_duration_seconds_total", "sql_seconds", "Time spent running SQL queries."),
+                ("http_request_serialization_seconds_total", "serialization_seconds", "Time spent dumping response schemas."),
+                ("http_response_size_bytes_total", "response_bytes", "Bytes of the response bodies (streamed ones not counted)."),
+            ):
+                metric(name, "counter", help)
+                for key, totals in series:
+                    lines.append(f"{name}{{{labels[key]}}} {getattr(totals, attribute)}")
+            metric("profiles_written_total", "counter", "Sampled requests profiled to PROFILE_DIR.")
+            lines.append(f"profiles_written_total {self.profiles}")
+
+        caches = {"claims": claims_cache.stats(), "response": response_cache.stats()}
+        metric("cache_hits_total", "counter", "Lookups answered from memory.")
+        for cache, stats in caches.items():
+            lines.append(f'cache_hits_total{{cache="{cache}"}} {stats["hits"]}')
+        metric("cache_misses_total", "counter", "Lookups that had to load the value.")
+        for cache, stats in caches.items():
+            lines.append(f'cache_misses_total{{cache="{cache}"}} {stats["misses"]}')
+        metric("cache_entries", "gauge", "Entries held in memory.")
+        lines.append(f'cache_entries{{cache="claims"}} {caches["claims"]["size"]}')
+
+        blocklist = token_blocklist.stats()
+        metric("token_blocklist_rejected_total", "counter", "Requests turned down with a revoked token.")
+        lines.append(f"token_blocklist_rejected_total {blocklist['hits']}")
+        metric("token_blocklist_syncs_total", "counter", "Reads of the revoked_token table.")
+        lines.append(f"token_blocklist_syncs_total {blocklist['syncs']}")
+        metric("token_blocklist_entries", "gauge", "Revoked tokens held in memory.")
+        lines.append(f"token_blocklist_entries {blocklist['size']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+_profiling = threading.Lock()  # one profiled request at a time, cProfile can't nest
+
+def observe_serialization(start: float) -> None:
+    """Count the time since start as serialization of the current request"""
+    if config.METRICS_ENABLED:
+        stats = _current()
+        if stats is not None:
+            stats.serialization_seconds += time.perf_counter() - start
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - conn.info["metrics_query_start"]
+
+def _endpoint() -> str:
+    # the route, not the path: /product/<int:product_id> is one series
+    return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+def _begin() -> None:
+    stats = g._metrics = RequestStats()
+    if config.PROFILE_SAMPLE_RATE and random.random() < config.PROFILE_SAMPLE_RATE and _profiling.acquire(blocking=False):
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+
+def _write_profile(stats: RequestStats, duration: float) -> None:
+    stats.profiler.disable()
+    try:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9]+", "_", _endpoint()).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{name}-{duration * 1000:.0f}ms-{os.getpid()}.prof"
+        stats.profiler.dump_stats(os.path.join(config.PROFILE_DIR, filename))
+        metrics.profiles += 1
+    finally:
+        stats.profiler = None
+        _profiling.release()
+
+def _finish(status: int, size: int) -> RequestStats:
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return None
+    duration = time.perf_counter() - stats.start
+    if stats.profiler is not None:
+        _write_profile(stats, duration)
+    metrics.observe(request.method, _endpoint(), status, stats, duration, size)
+    return stats
+
+def _end(response: FlaskResponse) -> FlaskResponse:
+    # the length of a streamed response isn't known, computing it would buffer the whole stream
+    size = 0 if response.is_streamed else response.calculate_content_length() or 0
+    stats = _finish(response.status_code, size)
+    if stats is not None and config.METRICS_SERVER_TIMING:
+        total = (time.perf_counter() - stats.start) * 1000
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.queries} queries", '
+            f"serialize;dur={stats.serialization_seconds * 1000:.2f}, total;dur={total:.2f}"
+        )
+    return response
+
+def _teardown(error) -> None:
+    # after_request doesn't run when the exception is propagated (PROPAGATE_EXCEPTIONS)
+    _finish(500, 0)
+
+def _can_read_metrics() -> bool:
+    """
+    remote_addr is the peer of this process: behind a reverse proxy on the same host every
+    request comes from 127.0.0.1, which is why METRICS_TOKEN can be required as well.
+    """
+    if request.remote_addr not in config.METRICS_ALLOWED_IPS:
+        return False
+    if config.METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {config.METRICS_TOKEN}")
+    return True
+
+def metrics_view():
+    if not _can_read_metrics():
+        res = {
+            "code": 403,
+            "status": "Access Denied.",
+            "message": "Permission denied. Please contact admin.",
+        }
+        return (jsonify(res), 403)
+    return FlaskResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def init_metrics(app) -> None:
+    """
+    Register the instrumentation when METRICS_ENABLED is set. Call it before the other
+    request hooks, so that the time measured includes them (e.g: the commit of the request).
+    """
+    if not config.METRICS_ENABLED:
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_begin)
+    app.after_request(_end)
+    app.teardown_request(_teardown)
+    app.add_url_rule(config.METRICS_PATH, "metrics", metrics_view)
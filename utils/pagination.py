@@ -0,0 +1,27 @@
+import base64
+import binascii
+
+from typing import Optional
+
+CURSOR_PREFIX = "id:"
+
+def encode_cursor(after_id: Optional[int]) -> Optional[str]:
+    """Turn the last seen primary key into an opaque cursor"""
+    if after_id is None:
+        return None
+    raw = f"{CURSOR_PREFIX}{after_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Return the primary key stored in the cursor.
+    Raise ValueError if the cursor was not created by encode_cursor.
+    """
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not raw.startswith(CURSOR_PREFIX):
+        raise ValueError("Invalid cursor")
+    return int(raw[len(CURSOR_PREFIX):])
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import threading
+import time
+
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import Response as FlaskResponse, request
+from flask_jwt_extended import get_jwt
+from typing import Callable, Optional
+
+import config
+
+CachedResponse = namedtuple("CachedResponse", ("status", "mimetype", "etag", "body"))
+
+def _dumps(entry: CachedResponse) -> bytes:
+    head = json.dumps({"status": entry.status, "mimetype": entry.mimetype, "etag": entry.etag})
+    return head.encode("utf-8") + b"\n" + entry.body
+
+def _loads(value: bytes) -> CachedResponse:
+    head, body = value.split(b"\n", 1)
+    return CachedResponse(body=body, **json.loads(head))
+
+class MemoryBackend:
+    """Per process LRU with a TTL"""
+    def __init__(self, max_entries: int = config.RESPONSE_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires at, CachedResponse)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, entry: CachedResponse, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> None:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+class RedisBackend:
+    """
+    Shared between processes. client is anything with the get/set/incr of redis-py,
+    e.g: redis.Redis.from_url(...) or fakeredis.FakeRedis() as a local stand-in.
+    """
+    def __init__(self, client, prefix: str = "response:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        import redis  # optional dependency, only needed for this backend
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.client.get(self.prefix + key)
+        return _loads(value) if value is not None else None
+
+    def set(self, key: str, entry: CachedResponse, ttl: int) -> None:
+        self.client.set(self.prefix + key, _dumps(entry), ex=ttl)
+
+    def version(self, namespace: str) -> int:
+        return int(self.client.get(f"{self.prefix}version:{namespace}") or 0)
+
+    def bump(self, namespace: str) -> None:
+        self.client.incr(f"{self.prefix}version:{namespace}")
+
+def auth_scope() -> str:
+    """Part of the key telling apart what different kinds of users may see"""
+    try:
+        claims = get_jwt()
+    except RuntimeError:  # route without @jwt_required()
+        return "public"
+    if not claims:
+        return "public"
+    return "admin" if claims.get("is_admin") else "user"
+
+class ResponseCache:
+    """
+    Cache of whole GET responses of read-mostly endpoints, keyed by route + query + auth scope.
+    Every namespace has a version in the backend: invalidate() bumps it, which orphans every
+    cached response of the namespace at once (they expire with their TTL).
+    """
+    def __init__(self, backend=None, ttl: int = config.RESPONSE_CACHE_TTL) -> None:
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, backend) -> None:
+        self.backend = backend
+
+    def invalidate(self, namespace: str) -> None:
+        self.backend.bump(namespace)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _key(self, namespace: str) -> str:
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        version = self.backend.version(namespace)
+        return f"{namespace}:{version}:{request.path}?{query}:{auth_scope()}"
+
+    def _respond(self, entry: CachedResponse, state: str) -> FlaskResponse:
+        if entry.etag in request.if_none_match:
+            response = FlaskResponse(status=304)
+        else:
+            response = FlaskResponse(entry.body, status=entry.status, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        # depends on the token: only the client may keep it, and must revalidate (ETag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.headers["X-Cache"] = state
+        return response
+
+    def cached(self, namespace: str) -> Callable:
+        """
+        Decorator for a GET view, put it right under @jwt_required().
+        Only successful responses are stored.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not config.RESPONSE_CACHE_ENABLED:
+                    return view(*args, **kwargs)
+
+                key = self._key(namespace)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return self._respond(entry, "HIT")
+                self.misses += 1
+
+                response = view(*args, **kwargs)
+                if not isinstance(response, FlaskResponse) or response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(
+                    status=response.status_code,
+                    mimetype=response.mimetype,
+                    etag=hashlib.sha1(body).hexdigest(),
+                    body=body,
+                )
+                self.backend.set(key, entry, self.ttl)
+                return self._respond(entry, "MISS")
+            return wrapper
+        return decorator
+
+response_cache = ResponseCache()
+
+def configure_response_cache() -> None:
+    """Use the shared backend when RESPONSE_CACHE_URL is set"""
+    if config.RESPONSE_CACHE_URL:
+        response_cache.configure(RedisBackend.from_url(config.RESPONSE_CACHE_URL))
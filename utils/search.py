@@ -0,0 +1,305 @@
+import bisect
+import math
+import re
+import threading
+import time
+
+from collections import defaultdict
+from itertools import chain
+from sqlalchemy import bindparam, column, event, func, inspect, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from db import db, RoutingSession
+from models.product import Product
+from models.product_item import ProductItem
+
+FIELDS = ("name", "description", "skus")
+PREFIX_PENALTY = 0.8  # score of a prefix match relative to an exact one (in-memory index)
+
+# (product ids in rank order, number of matches, {category_id: number of matches})
+SearchResult = Tuple[List[int], int, Dict[int, int]]
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Same rules as the FTS5 unicode61 tokenizer: lowercase runs of letters and digits"""
+    return re.findall(r"\w+", (value or "").lower())
+
+def load_documents(connection, ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+    """What gets indexed for each product, None for the products that no longer exist"""
+    ids = list(ids)
+    documents = dict.fromkeys(ids)
+    rows = connection.execute(
+        select(Product.id, Product.category_id, Product.name, Product.description).where(Product.id.in_(ids))
+    )
+    for id, category_id, name, description in rows:
+        documents[id] = {"category_id": category_id, "name": name, "description": description or "", "skus": []}
+    skus = connection.execute(
+        select(ProductItem.product_id, ProductItem.sku).where(ProductItem.product_id.in_(ids), ProductItem.sku.isnot(None))
+    )
+    for product_id, sku in skus:
+        if documents.get(product_id) is not None:
+            documents[product_id]["skus"].append(sku)
+    for document in documents.values():
+        if document is not None:
+            document["skus"] = " ".join(document["skus"])
+    return documents
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Alembic hook (migrations/env.py): the FTS5 table and its shadow tables (product_search_data...)
+    are created by init_search(), autogenerate must not drop them for lack of a model.
+    """
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith("product_search"))
+
+class Fts5Backend:
+    """SQLite FTS5 table kept in the same transaction as the products it indexes"""
+    name = "fts5"
+    _table = table("product_search", column("rowid"), column("category_id"))
+
+    def create(self, connection) -> bool:
+        """Create the FTS table, return True if it didn't exist (raises if FTS5 isn't compiled in)"""
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'")
+        ).first()
+        if exists:
+            return False
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE product_search USING fts5("
+            "name, description, skus, category_id UNINDEXED, "
+            "tokenize = 'unicode61', prefix = '2 3')"
+        ))
+        return True
+
+    def write(self, session, documents: Dict[int, Optional[dict]]) -> None:
+        connection = session.connection()
+        connection.execute(
+            text("DELETE FROM product_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(documents)},
+        )
+        rows = [{"rowid": id, **document} for id, document in documents.items() if document is not None]
+        if rows:
+            connection.execute(
+                text(
+                    "INSERT INTO product_search (rowid, name, description, skus, category_id) "
+                    "VALUES (:rowid, :name, :description, :skus, :category_id)"
+                ),
+                rows,
+            )
+
+    def rebuild(self, connection) -> None:
+        connection.execute(text("DELETE FROM product_search"))
+        connection.execute(text(
+            "INSERT INTO product_search (rowid, name, description, skus, category_id) "
+            "SELECT product.id, product.name, coalesce(product.description, ''), "
+            "coalesce((SELECT group_concat(sku, ' ') FROM product_item WHERE product_item.product_id = product.id), ''), "
+            "product.category_id FROM product"
+        ))
+
+    def search(self, terms: List[str], category_ids: Optional[Tuple[int, ...]], limit: int, offset: int) -> SearchResult:
+        # "term"* is a prefix query, terms are ANDed
+        match = text("product_search MATCH :query").bindparams(query=" ".join(f'"{term}"*' for term in terms))
+        weights = [config.SEARCH_FIELD_WEIGHTS[field] for field in FIELDS]
+        rank = func.bm25(literal_column("product_search"), *weights)
+
+        facets = dict(db.session.execute(
+            select(self._table.c.category_id, func.count()).where(match).group_by(self._table.c.category_id)
+        ).all())
+
+        statement = select(self._table.c.rowid).where(match)
+        if category_ids is not None:
+            statement = statement.where(self._table.c.category_id.in_(category_ids))
+            total = sum(count for category_id, count in facets.items() if category_id in category_ids)
+        else:
+            total = sum(facets.values())
+        ids = db.session.scalars(statement.order_by(rank).limit(limit).offset(offset)).all()  # bm25: lower is better
+        return ids, total, facets
+
+class InvertedIndexBackend:
+    """
+    In-memory inverted index for databases without FTS5.
+    Process level: built from the database on first use, then updated after each commit
+    of this process (set SEARCH_INDEX_TTL to pick up writes of other processes).
+    """
+    name = "memory"
+
+    def __init__(self, ttl: Optional[int] = config.SEARCH_INDEX_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)  # token -> {product id: weight}
+        self._documents: Dict[int, Tuple[int, Tuple[str, ...]]] = {}  # product id -> (category id, tokens)
+        self._vocabulary: List[str] = []  # sorted tokens, for prefix lookups
+        self._built_at = None
+
+    def create(self, connection) -> bool:
+        return False
+
+    def _ensure_built(self) -> None:
+        if self._built_at is not None and (self.ttl is None or time.monotonic() - self._built_at < self.ttl):
+            return
+        with db.engine.connect() as connection:
+            self.rebuild(connection)
+
+    def rebuild(self, connection) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary = []
+            ids = connection.execute(select(Product.id).execution_options(yield_per=config.STREAM_CHUNK_SIZE))
+            for chunk in ids.scalars().partitions():
+                self._apply(load_documents(connection, chunk), sort=False)
+            self._vocabulary = sorted(self._postings)
+            self._built_at = time.monotonic()
+
+    def write(self, session, documents: Dict[int, Optional[dict]]) -> None:
+        # applied once committed, the index can't be rolled back
+        session.info.setdefault("search_documents", {}).update(documents)
+
+    def apply(self, documents: Dict[int, Optional[dict]]) -> None:
+        if self._built_at is None:
+            return  # not built yet, will read the committed data
+        with self._lock:
+            self._apply(documents, sort=True)
+
+    def _apply(self, documents: Dict[int, Optional[dict]], sort: bool) -> None:
+        for id, document in documents.items():
+            _, tokens = self._documents.pop(id, (None, ()))
+            for token in tokens:
+                self._postings[token].pop(id, None)
+            if document is None:
+                continue
+
+            weights = defaultdict(float)
+            for field in FIELDS:
+                for token in tokenize(document[field]):
+                    weights[token] += config.SEARCH_FIELD_WEIGHTS[field]
+            for token, weight in weights.items():
+                if sort and token not in self._postings:
+                    bisect.insort(self._vocabulary, token)
+                self._postings[token][id] = weight
+            self._documents[id] = (document["category_id"], tuple(weights))
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        tokens = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def search(self, terms: List[str], category_ids: Optional[Tuple[int, ...]], limit: int, offset: int) -> SearchResult:
+        self._ensure_built()
+        with self._lock:
+            count = len(self._documents) or 1
+            scores = None
+            for term in terms:
+                # best matching token of the prefix, weighted by how rare it is (idf)
+                term_scores = {}
+                for token in self._expand(term):
+                    postings = self._postings[token]
+                    idf = math.log(1 + count / (1 + len(postings)))
+                    if token != term:
+                        idf *= PREFIX_PENALTY  # "p1" ranks P1 before P10
+                    for id, weight in postings.items():
+                        score = weight * idf
+                        if score > term_scores.get(id, 0):
+                            term_scores[id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {id: score + term_scores[id] for id, score in scores.items() if id in term_scores}
+                if not scores:
+                    return [], 0, {}
+
+            facets = defaultdict(int)
+            for id in scores:
+                facets[self._documents[id][0]] += 1
+            if category_ids is not None:
+                scores = {id: score for id, score in scores.items() if self._documents[id][0] in category_ids}
+
+        ranked = sorted(scores, key=lambda id: (-scores[id], id))
+        return ranked[offset:offset + limit], len(ranked), dict(facets)
+
+class SearchIndex:
+    """
+    Product search, kept in sync with Product/ProductItem writes by session events.
+    Backed by SQLite FTS5 when available, by an in-memory inverted index otherwise.
+    """
+    def __init__(self) -> None:
+        self.backend = None
+
+    def search(
+        self,
+        query: str,
+        category_ids: Tuple[int, ...] = None,
+        limit: int = config.SEARCH_DEFAULT_LIMIT,
+        offset: int = 0,
+    ) -> SearchResult:
+        terms = tokenize(query)
+        if not terms:
+            return [], 0, {}
+        return self.backend.search(terms, category_ids, limit, offset)
+
+    def reindex(self, session, ids: Iterable[int]) -> None:
+        """Refresh the products in the current transaction of session (e.g: after a bulk insert)"""
+        ids = set(ids)
+        if self.backend is None or not ids:
+            return
+        self.backend.write(session, load_documents(session.connection(), ids))
+
+    def rebuild(self) -> None:
+        with db.engine.begin() as connection:
+            self.backend.rebuild(connection)
+
+search_index = SearchIndex()
+
+def _changed_products(session) -> set:
+    ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Product):
+            ids.add(obj.id)
+        elif isinstance(obj, ProductItem):
+            ids.add(obj.product_id)
+            history = inspect(obj).attrs.product_id.history
+            ids.update(history.deleted or ())  # item moved to another product
+    ids.discard(None)
+    return ids
+
+def _after_flush(session, flush_context) -> None:
+    search_index.reindex(session, _changed_products(session))
+
+def _after_commit(session) -> None:
+    documents = session.info.pop("search_documents", None)
+    if documents and isinstance(search_index.backend, InvertedIndexBackend):
+        search_index.backend.apply(documents)
+
+def _after_rollback(session) -> None:
+    session.info.pop("search_documents", None)
+
+def init_search(app) -> None:
+    """Pick the backend (config.SEARCH_BACKEND), create the FTS table and hook the session events"""
+    with app.app_context():
+        backend = None
+        if config.SEARCH_BACKEND in ("auto", "fts5") and db.engine.dialect.name == "sqlite":
+            try:
+                backend = Fts5Backend()
+                with db.engine.begin() as connection:
+                    if backend.create(connection):
+                        backend.rebuild(connection)  # index the existing catalog
+            except OperationalError:
+                if config.SEARCH_BACKEND == "fts5":
+                    raise
+                backend = None  # SQLite built without FTS5
+        search_index.backend = backend or InvertedIndexBackend()
+
+    if not event.contains(RoutingSession, "after_flush", _after_flush):
+        event.listen(RoutingSession, "after_flush", _after_flush)
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+
+    @app.cli.command("search-rebuild")
+    def search_rebuild():
+        """Rebuild the product search index from the database"""
+        search_index.rebuild()
+        print(f"Rebuilt the {search_index.backend.name} product search index.")
@@ -0,0 +1,83 @@
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+import config
+
+# Schemes that can still be verified (and upgraded) if PASSWORD_HASH_SCHEME changes
+KNOWN_SCHEMES = ("argon2", "bcrypt", "pbkdf2_sha256")
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already waiting for a worker, or took too long"""
+
+class PasswordHasher:
+    """
+    Hash and verify passwords with passlib on a bounded thread pool so that the
+    CPU cost of the hash does not pile up on the request threads.
+    Passwords hashed with other parameters still verify and are flagged for rehashing,
+    so do passwords stored in plain text (before hashing was introduced) while
+    PASSWORD_ACCEPT_PLAINTEXT is on.
+    """
+    def __init__(
+        self,
+        scheme: str = config.PASSWORD_HASH_SCHEME,
+        rounds: int = config.PASSWORD_HASH_ROUNDS,
+        workers: int = config.PASSWORD_HASH_WORKERS,
+        max_pending: int = config.PASSWORD_HASH_MAX_PENDING,
+        timeout: float = config.PASSWORD_HASH_TIMEOUT,
+        accept_plaintext: bool = config.PASSWORD_ACCEPT_PLAINTEXT,
+    ) -> None:
+        schemes = [scheme] + [known for known in KNOWN_SCHEMES if known != scheme]
+        if accept_plaintext:
+            schemes.append("plaintext")
+        self.context = CryptContext(
+            schemes=schemes,
+            deprecated="auto",  # everything except `scheme` gets rehashed on login
+            **{
+                f"{scheme}__default_rounds": rounds,
+                f"{scheme}__min_rounds": rounds,
+                f"{scheme}__max_rounds": rounds,
+            },
+        )
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("Too many pending password hash operations.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy("Password hash operation timed out.")
+
+    def hash(self, password: str) -> str:
+        return self._submit(self.context.hash, password)
+
+    def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Return whether the password matches and, when the stored hash is outdated,
+        the new hash to store (None otherwise).
+        """
+        return self._submit(self._verify_and_update, password, hashed)
+
+    def _verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        try:
+            return self.context.verify_and_update(password, hashed)
+        except ValueError:  # not a hash of a known scheme (plain text, once it's not accepted)
+            return False, None
+
+    def is_legacy(self, hashed: str) -> bool:
+        """Whether hashed is a password stored in plain text"""
+        return self.context.identify(hashed) in (None, "plaintext")
+
+password_hasher = PasswordHasher()
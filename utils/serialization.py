@@ -0,0 +1,114 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields, missing
+from typing import Any, Callable
+
+try:
+    import orjson  # optional, a lot faster than the json module
+except ImportError:
+    orjson = None
+
+import config
+
+"""
+Compiled dumpers: the fields of a schema are looked at once and turned into a list of
+(key, attribute, converter), so dumping an object is a loop over plain function calls
+instead of marshmallow's per field machinery. Same output as Schema.dump() for the
+fields used in this repo, anything else goes through the field's own serialize().
+"""
+def _identity(value):
+    return value
+
+def _nullable(convert: Callable) -> Callable:
+    return lambda value: None if value is None else convert(value)
+
+SCALARS = (
+    (fields.Integer, _nullable(int)),
+    (fields.Float, _nullable(float)),
+    (fields.String, _nullable(str)),  # Str, Email, Url...
+    (fields.Boolean, _identity),
+    (fields.Raw, _identity),
+)
+
+def _get(obj, attribute: str):
+    if isinstance(obj, dict):
+        return obj.get(attribute, missing)
+    return getattr(obj, attribute, missing)
+
+def _nested_converter(field) -> Callable:
+    schema = field.schema
+    many = field.many or schema.many
+    dump = compile_dumper(schema)
+    if many:
+        return lambda value: None if value is None else [dump(item) for item in value]
+    return lambda value: None if value is None else dump(value)
+
+def _converter(field) -> Callable:
+    """Converter of a field value, None if the field needs marshmallow"""
+    if isinstance(field, fields.Nested):
+        return _nested_converter(field)
+    if isinstance(field, fields.List) and isinstance(field.inner, fields.Nested):
+        inner = _nested_converter(field.inner)
+        return lambda value: None if value is None else [inner(item) for item in value]
+    if type(field) in (fields.Function, fields.Method) or getattr(field, "as_string", False):
+        return None
+    for field_class, convert in SCALARS:
+        # subclasses too, unless they change how the value is serialized
+        if isinstance(field, field_class) and type(field)._serialize is field_class._serialize:
+            return convert
+    return None
+
+def compile_dumper(schema: Schema) -> Callable[[Any], dict]:
+    """Dumper of one object for a schema instance, cached on the instance"""
+    dumper = schema.__dict__.get("_compiled_dumper")
+    if dumper is not None:
+        return dumper
+
+    plan = []
+    for name, field in schema.dump_fields.items():
+        key = field.data_key or name
+        attribute = field.attribute or name
+        convert = _converter(field)
+        if convert is None:
+            # let marshmallow do it
+            plan.append((key, None, lambda obj, field=field, attribute=attribute: field.serialize(attribute, obj)))
+        else:
+            plan.append((key, attribute, convert))
+
+    def dumper(obj) -> dict:
+        result = {}
+        for key, attribute, convert in plan:
+            if attribute is None:
+                value = convert(obj)
+            else:
+                value = _get(obj, attribute)
+                if value is not missing:
+                    value = convert(value)
+            if value is not missing:
+                result[key] = value
+        return result
+
+    schema.__dict__["_compiled_dumper"] = dumper
+    return dumper
+
+def fast_dump(schema: Schema, obj, many: bool = None):
+    """Drop-in for schema.dump(obj, many=many)"""
+    dump = compile_dumper(schema)
+    if many if many is not None else schema.many:
+        return [dump(item) for item in obj]
+    return dump(obj)
+
+def dumps(data, sort_keys: bool = False) -> str:
+    """Compact JSON, with orjson when it is installed"""
+    if orjson is not None and config.JSON_FAST_ENCODER:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, default=str, option=option).decode("utf-8")
+    return json.dumps(data, default=str, separators=(",", ":"), sort_keys=sort_keys)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (used by jsonify and flask-smorest) writing with orjson"""
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=self.sort_keys)
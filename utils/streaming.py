@@ -0,0 +1,41 @@
+import json
+
+from flask import Response as FlaskResponse, stream_with_context
+from marshmallow import Schema
+
+from utils.helper import Response
+import config
+
+def _envelope_head(res: Response) -> str:
+    """Opening part of the response envelope up to the start of the data list"""
+    head = json.dumps(res.without_data())
+    return head[:-1] + ', "data": ['
+
+def stream_json(query, schema: Schema, res: Response = None, chunk_size: int = config.STREAM_CHUNK_SIZE) -> FlaskResponse:
+    """
+    Stream the {code,status,message,data:[...]} envelope while iterating the query
+    with a server side cursor, so memory stays flat regardless of the number of rows.
+    """
+    res = res or Response()
+    if isinstance(schema, type):
+        schema = schema()
+
+    def generate():
+        yield _envelope_head(res)
+        separator = ""
+        buffer = []
+        for row in query.yield_per(chunk_size):
+            buffer.append(separator + json.dumps(schema.dump(row)))
+            separator = ","
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+        if buffer:
+            yield "".join(buffer)
+        yield "]}"
+
+    return FlaskResponse(
+        stream_with_context(generate()),
+        status=res.code,
+        mimetype="application/json",
+    )
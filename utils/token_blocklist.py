@@ -0,0 +1,113 @@
+import heapq
+import itertools
+import threading
+import time
+
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import config
+from db import db, on_commit
+from models.token import TokenModel
+
+NEVER = datetime(9999, 12, 31)  # expiry of a token without "exp"
+
+_revoked = itertools.count(1)
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+class TokenBlocklist:
+    """
+    Revoked token ids (jti) kept in memory, so checking the token of every @jwt_required()
+    request is a dict lookup instead of a query. The revoked_token table is the source of truth:
+    at most every `sync_interval` seconds the rows added after the last one seen (the watermark)
+    are read, so a logout done in another process is seen here within that time. A logout done
+    in this process is seen as soon as it's committed. Entries are dropped once their token
+    expires, an expired token is turned down before the blocklist is checked anyway.
+    """
+    def __init__(self, sync_interval: float = config.TOKEN_BLOCKLIST_SYNC_INTERVAL) -> None:
+        self.sync_interval = sync_interval
+        self.hits = 0  # revoked tokens turned down
+        self.syncs = 0
+        self._entries: Dict[str, float] = {}  # jti -> expires at (unix time)
+        self._expiry: List[Tuple[float, str]] = []  # heap of (expires at, jti), to drop them in order
+        self._watermark = 0  # highest revoked_token.id seen
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        if jti in self._entries:
+            self.hits += 1
+            return True
+        return False
+
+    def sync(self) -> None:
+        """Read the tokens revoked since the watermark (all the unexpired ones the first time)"""
+        with self._sync_lock:
+            if time.monotonic() < self._next_sync:
+                return  # done by another thread while this one was waiting
+            # ids are given when the row is inserted, not committed: read the last few ones
+            # again in case a revocation with a lower id was committed after a higher one
+            after_id = max(0, self._watermark - config.TOKEN_BLOCKLIST_SYNC_OVERLAP)
+            with db.engine.connect() as connection:
+                rows = TokenModel.find_since(connection, after_id)
+            with self._lock:
+                for id, jti, expires_at in rows:
+                    self._add(jti, _timestamp(expires_at))
+                    self._watermark = max(self._watermark, id)
+                self._prune()
+                self.syncs += 1
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def _add(self, jti: str, expires_at: float) -> None:
+        if jti not in self._entries:
+            self._entries[jti] = expires_at
+            heapq.heappush(self._expiry, (expires_at, jti))
+
+    def _prune(self) -> None:
+        now = time.time()
+        while self._expiry and self._expiry[0][0] < now:
+            _, jti = heapq.heappop(self._expiry)
+            self._entries.pop(jti, None)
+
+    def revoke(self, jwt_payload: dict) -> None:
+        """Revoke the token of jwt_payload, in the current transaction"""
+        jti = jwt_payload["jti"]
+        expires_at = datetime.utcfromtimestamp(jwt_payload["exp"]) if jwt_payload.get("exp") else NEVER
+        if TokenModel.find_by_jti(jti) is None:  # already revoked by another process otherwise
+            if next(_revoked) % config.TOKEN_BLOCKLIST_PURGE_EVERY == 0:
+                TokenModel.purge_expired()
+            token = TokenModel(
+                jti=jti,
+                token_type=jwt_payload.get("type", "access"),
+                expires_at=expires_at,
+                user_id=jwt_payload.get("sub"),
+            )
+            token.save_to_db()
+
+        def add() -> None:
+            with self._lock:
+                self._add(jti, _timestamp(expires_at))
+        on_commit(add)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self._watermark = 0
+            self._next_sync = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "syncs": self.syncs,
+                "size": len(self._entries),
+                "watermark": self._watermark,
+            }
+
+token_blocklist = TokenBlocklist()